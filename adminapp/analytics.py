@@ -0,0 +1,101 @@
+"""
+Booking time series for the analytics endpoint.
+
+Series are read from the per-day booking rollup with one grouped query, so
+the cost depends on the number of rollup rows in the range (at most one per
+doctor, day and consultation mode) and never on booking history. The range
+is capped at ``MAX_BUCKETS`` buckets and every bucket is returned, with 0
+for buckets that had no bookings.
+"""
+
+from datetime import timedelta
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+from doctors.models import BookingRollup
+
+MAX_BUCKETS = 400
+
+METRICS = ("revenue", "appointments", "cancellations", "refunds", "refund_amount")
+
+GRANULARITIES = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+    "year": TruncYear,
+}
+
+DEFAULT_BUCKETS = {"day": 30, "week": 12, "month": 12, "year": 5}
+
+
+def bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == "day":
+        return day + timedelta(days=1)
+    if granularity == "week":
+        return day + timedelta(weeks=1)
+    if granularity == "month":
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day.replace(year=day.year + 1)
+
+
+def buckets(start, end, granularity):
+    """Start dates of the buckets covering ``start`` to ``end``."""
+    bucket = bucket_start(start, granularity)
+    while bucket <= end:
+        yield bucket
+        bucket = next_bucket(bucket, granularity)
+
+
+def default_start(end, granularity):
+    start = bucket_start(end, granularity)
+    for _ in range(DEFAULT_BUCKETS.get(granularity, 1) - 1):
+        start = bucket_start(start - timedelta(days=1), granularity)
+    return start
+
+
+def booking_series(
+    metric, granularity, start, end, doctor=None, department=None, mode=None
+):
+    """
+    ``[{"period": date, "value": total}]`` of ``metric`` per ``granularity``
+    bucket between ``start`` and ``end``, both included. Raises ValueError for
+    an unknown metric or granularity, or a range over ``MAX_BUCKETS`` buckets.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}.")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}.")
+    if start > end:
+        raise ValueError("start must not be after end.")
+    periods = []
+    for period in buckets(start, end, granularity):
+        periods.append(period)
+        if len(periods) > MAX_BUCKETS:
+            raise ValueError(
+                f"The range spans more than {MAX_BUCKETS} {granularity} buckets."
+            )
+
+    rollups = BookingRollup.objects.filter(day__gte=start, day__lte=end)
+    if doctor:
+        rollups = rollups.filter(doctor_id=doctor)
+    if department:
+        rollups = rollups.filter(doctor__department=department)
+    if mode:
+        rollups = rollups.filter(consultation_mode=mode)
+    totals = {
+        row["period"]: row["value"]
+        for row in rollups.annotate(period=GRANULARITIES[granularity]("day"))
+        .values("period")
+        .annotate(value=Sum(metric))
+        .order_by()
+    }
+    return [{"period": period, "value": totals.get(period) or 0} for period in periods]
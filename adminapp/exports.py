@@ -0,0 +1,90 @@
+"""
+Streaming booking exports.
+
+Rows are read with ``values_list().iterator()`` so Postgres serves them from
+a server-side cursor ``EXPORT_CHUNK_SIZE`` at a time, and each row is
+encoded and handed to the response as soon as it is read. Memory use does
+not grow with the number of bookings exported.
+"""
+
+import csv
+from datetime import date
+from django.core.serializers.json import DjangoJSONEncoder
+from doctors.models import Booking
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = {
+    "id": "id",
+    "booked_day": "booked_day",
+    "time_slot": "time_slot",
+    "slot": "slot",
+    "consultation_mode": "consultation_mode",
+    "booking_status": "booking_status",
+    "payment_status": "payment_status",
+    "payment_mode": "payment_mode",
+    "amount": "amount",
+    "date_of_booking": "date_of_booking",
+    "razorpay_payment_id": "razorpay_payment_id",
+    "doc_id": "doctor_id",
+    "doctor": "doctor__name",
+    "department": "doctor__department__dept_name",
+    "patient": "patient_id",
+    "booked_by": "booked_by__email",
+}
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class Echo:
+    """A file-like object whose ``write`` returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_columns(columns):
+    """The requested column names, all of them if ``columns`` is empty."""
+    if not columns:
+        return list(EXPORT_COLUMNS)
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"Unknown columns: {', '.join(unknown)}. "
+            f"Choose from {', '.join(EXPORT_COLUMNS)}."
+        )
+    return columns
+
+
+def export_bookings(params):
+    """Bookings matching the ``start``/``end``/``doc_id``/``status`` filters."""
+    bookings = Booking.objects.all()
+    if params.get("start"):
+        bookings = bookings.filter(booked_day__gte=date.fromisoformat(params["start"]))
+    if params.get("end"):
+        bookings = bookings.filter(booked_day__lte=date.fromisoformat(params["end"]))
+    if params.get("doc_id"):
+        bookings = bookings.filter(doctor_id=params["doc_id"])
+    if params.get("status"):
+        bookings = bookings.filter(booking_status__iexact=params["status"])
+    if params.get("payment_status"):
+        bookings = bookings.filter(payment_status__iexact=params["payment_status"])
+    return bookings
+
+
+def export_rows(bookings, columns, output):
+    """Encoded lines of ``columns`` for ``bookings``, starting with a CSV header."""
+    rows = (
+        bookings.order_by("id")
+        .values_list(*[EXPORT_COLUMNS[column] for column in columns])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    if output == "ndjson":
+        encoder = DjangoJSONEncoder()
+        for row in rows:
+            yield encoder.encode(dict(zip(columns, row))) + "\n"
+        return
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
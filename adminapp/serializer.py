@@ -1,17 +1,22 @@
+import html
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 from rest_framework import serializers
 from .models import Department, BlogAdditionalImage, Blogs, CancelBooking
 from doctors.models import Doctor, Booking, Notification
 from doctors.serializer import DoctorSerializer
+from heydoc.serializers import SparseFieldsMixin
+from heydoc.values import ValuesSerializer
 
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Department
         fields = "__all__"
 
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     doc_email = serializers.EmailField(required=True)
     email = serializers.EmailField(required=False)
     phone = serializers.CharField(required=False)
@@ -29,12 +34,18 @@ class DoctorSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
 
         representation.pop("password", None)
-        if instance.department:
+        if "department" in representation and instance.department:
             representation["department"] = instance.department.dept_name
 
         return representation
 
 
+class DoctorValuesSerializer(ValuesSerializer):
+    serializer_class = DoctorSerializer
+    sources = {"department": "department__dept_name"}
+    exclude = ("password",)
+
+
 class BlogAdditionalImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = BlogAdditionalImage
@@ -59,7 +70,36 @@ class BlogsSerializer(serializers.ModelSerializer):
         ]
 
 
-class AdminBookingSerializer(serializers.ModelSerializer):
+BLOG_EXCERPT_LENGTH = 280
+
+
+class BlogFeedSerializer(serializers.ModelSerializer):
+    """
+    A blog in the feed: the article is replaced by a plain-text excerpt,
+    computed from the ``content_head`` prefix annotated by the feed query.
+    """
+
+    additional_images = BlogAdditionalImageSerializer(many=True, read_only=True)
+    excerpt = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Blogs
+        fields = [
+            "id",
+            "title",
+            "excerpt",
+            "author",
+            "image",
+            "date",
+            "additional_images",
+        ]
+
+    def get_excerpt(self, blog):
+        text = " ".join(html.unescape(strip_tags(blog.content_head or "")).split())
+        return Truncator(text).chars(BLOG_EXCERPT_LENGTH)
+
+
+class AdminBookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     doctor = DoctorSerializer()
 
     class Meta:
@@ -67,6 +107,11 @@ class AdminBookingSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class AdminBookingValuesSerializer(ValuesSerializer):
+    serializer_class = AdminBookingSerializer
+    nested = {"doctor": DoctorValuesSerializer}
+
+
 class CancelBookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = CancelBooking
@@ -1,3 +1,400 @@
+import csv
+import io
+import json
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from doctors.models import Booking
+from doctors.tests import ClinicData
+from heydoc.renderers import FastJSONRenderer
+from heydoc.serializers import SparseFieldset
+from .exports import EXPORT_COLUMNS
+from .models import Blogs
+from .serializer import AdminBookingSerializer, AdminBookingValuesSerializer
+from .views import BlogFeedView
 
-# Create your tests here.
+
+class DashBoardViewTests(ClinicData, TestCase):
+    url = "/api/admins/dashboard/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.other_doctor = cls.create_doctor("Bob Bone")
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        self.book(self.doctor, self.patient, self.today - timedelta(days=1), time(9, 0))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        for n in range(2, 200):
+            day = self.today - timedelta(days=n)
+            self.book(self.doctor, self.patient, day, time(9, 0))
+            self.book(
+                self.other_doctor,
+                self.patient,
+                day,
+                time(9, 0),
+                consultation_mode="Online",
+            )
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data["total_appointments"], 397)
+        self.assertEqual(
+            response.data["online_consultations"]["total"], Decimal("39600.00")
+        )
+        self.assertEqual(
+            [doctor["total_bookings"] for doctor in response.data["top_doctors"]],
+            [199, 198],
+        )
+
+
+class AnalyticsViewTests(ClinicData, TestCase):
+    url = "/api/admins/analytics/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.bones = cls.create_department("Bones")
+        cls.other_doctor = cls.create_doctor("Bob Bone", cls.bones)
+        other_patient = cls.create_patient("Pam")
+        cls.book(cls.doctor, cls.patient, date(2026, 1, 5), time(9, 0))
+        cls.book(
+            cls.doctor,
+            other_patient,
+            date(2026, 1, 5),
+            time(9, 15),
+            consultation_mode="Online",
+        )
+        cls.book(cls.doctor, cls.patient, date(2026, 1, 7), time(9, 0))
+        cls.book(
+            cls.doctor,
+            other_patient,
+            date(2026, 1, 7),
+            time(9, 30),
+            booking_status="cancelled",
+        )
+        cls.book(cls.doctor, cls.patient, date(2026, 2, 3), time(9, 0))
+        cls.book(
+            cls.other_doctor,
+            cls.patient,
+            date(2026, 1, 14),
+            time(9, 0),
+            consultation_mode="Online",
+        )
+        cls.book(cls.other_doctor, cls.patient, date(2026, 3, 10), time(9, 0))
+
+    def series(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [(row["period"], row["value"]) for row in response.json()["series"]]
+
+    def months(self, **params):
+        params = {"metric": "appointments", "granularity": "month", **params}
+        series = self.series(start="2026-01-01", end="2026-03-31", **params)
+        return [value for _, value in series]
+
+    def test_buckets_by_day_week_and_month(self):
+        params = {"metric": "appointments", "start": "2026-01-05"}
+        self.assertEqual(
+            self.series(granularity="day", end="2026-01-08", **params),
+            [
+                ("2026-01-05", 2),
+                ("2026-01-06", 0),
+                ("2026-01-07", 1),
+                ("2026-01-08", 0),
+            ],
+        )
+        params["start"] = "2026-01-01"
+        self.assertEqual(
+            self.series(granularity="week", end="2026-01-18", **params),
+            [("2025-12-29", 0), ("2026-01-05", 3), ("2026-01-12", 1)],
+        )
+        self.assertEqual(
+            self.series(granularity="month", end="2026-03-31", **params),
+            [("2026-01-01", 4), ("2026-02-01", 1), ("2026-03-01", 1)],
+        )
+
+    def test_defaults_to_twelve_months_of_revenue(self):
+        response = self.client.get(self.url, {"end": "2026-03-15"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["metric"], data["granularity"]), ("revenue", "month"))
+        self.assertEqual((data["start"], data["end"]), ("2025-04-01", "2026-03-15"))
+        self.assertEqual(len(data["series"]), 12)
+        self.assertEqual(
+            [row["value"] for row in data["series"][-3:]],
+            [800.0, 200.0, 200.0],
+        )
+
+    def test_filters_by_doctor_department_and_consultation_mode(self):
+        self.assertEqual(self.months(), [4, 1, 1])
+        self.assertEqual(self.months(doc_id=self.other_doctor.doc_id), [1, 0, 1])
+        self.assertEqual(self.months(department="cardiology"), [3, 1, 0])
+        self.assertEqual(self.months(department=self.bones.dept_id), [1, 0, 1])
+        self.assertEqual(self.months(consultation_mode="Online"), [2, 0, 0])
+        self.assertEqual(self.months(metric="cancellations"), [1, 0, 0])
+
+    def test_invalid_parameters_are_a_bad_request(self):
+        for params in (
+            {"start": "2026-02-30"},
+            {"end": "03/01/2026"},
+            {"start": "2026-03-01", "end": "2026-01-01"},
+            {"granularity": "hour"},
+            {"metric": "profit"},
+            {"granularity": "day", "start": "2025-01-01", "end": "2026-03-01"},
+            {"department": "Dentistry"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        params = {"start": "2025-01-01", "end": "2026-03-31", "department": "Bones"}
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, params)
+
+        for n in range(100):
+            self.book(
+                self.other_doctor,
+                self.patient,
+                date(2025, 1, 1) + timedelta(n),
+                time(9, 0),
+            )
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(self.client.get(self.url, params).status_code, 200)
+        self.assertEqual(len(queries), 2)
+
+
+class BookingExportViewTests(ClinicData, TestCase):
+    url = "/api/admins/bookings/export/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.other_doctor = cls.create_doctor("Bob Bone", cls.create_department("Bones"))
+        cls.bookings = [
+            cls.book(cls.doctor, cls.patient, date(2026, 1, 5), time(9, 0)),
+            cls.book(
+                cls.doctor,
+                cls.patient,
+                date(2026, 1, 6),
+                time(9, 15),
+                booking_status="Cancelled",
+                payment_status="Completed",
+                razorpay_payment_id="pay_1",
+            ),
+            cls.book(cls.other_doctor, cls.patient, date(2026, 1, 7), time(9, 30)),
+            cls.book(cls.doctor, cls.patient, date(2026, 2, 3), time(10, 0)),
+        ]
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def exported_ids(self, **params):
+        _, content = self.export(columns="id", **params)
+        return [int(line) for line in content.splitlines()[1:]]
+
+    def test_exports_every_column_as_csv(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="bookings.csv"'
+        )
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], list(EXPORT_COLUMNS))
+        self.assertEqual(
+            [row[0] for row in rows[1:]], [str(b.id) for b in self.bookings]
+        )
+        cancelled = dict(zip(rows[0], rows[2]))
+        self.assertEqual(cancelled["booked_day"], "2026-01-06")
+        self.assertEqual(cancelled["time_slot"], "09:15:00")
+        self.assertEqual(cancelled["amount"], "200.00")
+        self.assertEqual(cancelled["razorpay_payment_id"], "pay_1")
+        self.assertEqual(cancelled["doc_id"], self.doctor.doc_id)
+        self.assertEqual(cancelled["department"], "Cardiology")
+        self.assertEqual(cancelled["booked_by"], "patient@example.com")
+
+    def test_exports_selected_columns_as_ndjson(self):
+        response, content = self.export(
+            output="ndjson", columns="id,doctor,amount,booked_day"
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            rows[2],
+            {
+                "id": self.bookings[2].id,
+                "doctor": "Bob Bone",
+                "amount": "200.00",
+                "booked_day": "2026-01-07",
+            },
+        )
+        self.assertEqual(len(rows), 4)
+
+    def test_filters(self):
+        ids = [booking.id for booking in self.bookings]
+        self.assertEqual(
+            self.exported_ids(start="2026-01-06", end="2026-01-31"), ids[1:3]
+        )
+        self.assertEqual(self.exported_ids(doc_id=self.other_doctor.doc_id), ids[2:3])
+        self.assertEqual(self.exported_ids(status="booked"), [ids[0], *ids[2:]])
+        self.assertEqual(self.exported_ids(payment_status="completed"), ids[1:2])
+
+    def test_invalid_parameters_are_a_bad_request(self):
+        for params in (
+            {"output": "xlsx"},
+            {"columns": "id,password"},
+            {"start": "2026-02-30"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_rows_are_streamed_from_one_query(self):
+        for n in range(40):
+            self.book(
+                self.other_doctor,
+                self.patient,
+                date(2025, 1, 1) + timedelta(n),
+                time(9, 0),
+            )
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"output": "ndjson"})
+        with mock.patch("adminapp.exports.EXPORT_CHUNK_SIZE", 10):
+            with self.assertNumQueries(1):
+                lines = list(response.streaming_content)
+        self.assertEqual(len(lines), 44)
+
+
+class BlogFeedViewTests(TestCase):
+    url = "/api/admins/blogs/feed/"
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(5):
+            Blogs.objects.create(title=f"Blog {n}", content="Text", author="Editor")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_other_query_params_share_the_cached_page(self):
+        with mock.patch.object(
+            BlogFeedView, "feed", autospec=True, side_effect=BlogFeedView.feed
+        ) as feed:
+            for n in range(3):
+                response = self.client.get(self.url, {"page_size": 2, "junk": n})
+                self.assertEqual(response.status_code, 200)
+            response = self.client.get(self.url, {"page_size": 500})
+            self.client.get(self.url, {"page_size": 100})
+
+        self.assertEqual(feed.call_count, 2)
+        self.assertEqual(len(response.data["blogs"]), 5)
+
+    def test_links_follow_the_request_and_walk_the_feed(self):
+        self.client.get(self.url, {"page_size": 2})
+        response = self.client.get(self.url, {"page_size": 2}, HTTP_HOST="localhost")
+        self.assertTrue(response.data["next"].startswith("http://localhost/"))
+        self.assertIsNone(response.data["previous"])
+
+        titles = []
+        while response.data["next"]:
+            titles += [blog["title"] for blog in response.data["blogs"]]
+            response = self.client.get(response.data["next"])
+        titles += [blog["title"] for blog in response.data["blogs"]]
+
+        self.assertEqual(titles, [f"Blog {n}" for n in reversed(range(5))])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.url, {"cursor": "junk"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AdminBookingValuesSerializerTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.doctor.doc_image = "doc_images/alice.jpg"
+        cls.doctor.save()
+        other_doctor = cls.create_doctor("Bob Bone", cls.create_department("Bones"))
+        day = cls.today - timedelta(days=2)
+        cls.book(cls.doctor, cls.patient, day, time(9, 0), payment_status="Completed")
+        cls.book(other_doctor, cls.patient, day, time(9, 0))
+
+    def assertRendersLikeSerializer(self, sparse=None):
+        bookings = Booking.objects.order_by("id")
+        values = AdminBookingValuesSerializer(sparse=sparse)
+        expected = AdminBookingSerializer(bookings, many=True, sparse=sparse).data
+        renderer = FastJSONRenderer()
+        self.assertEqual(
+            renderer.render(values.render(values.values(bookings))),
+            renderer.render(expected),
+        )
+
+    def test_renders_like_the_model_serializer(self):
+        self.assertRendersLikeSerializer()
+
+    def test_renders_sparse_fieldsets_like_the_model_serializer(self):
+        self.assertRendersLikeSerializer(
+            SparseFieldset.from_names(["id", "amount", "doctor"])
+        )
+        self.assertRendersLikeSerializer(
+            SparseFieldset.from_names(
+                ["time_slot", "doctor.name", "doctor.department", "doctor.doc_image"]
+            )
+        )
+
+
+class DoctorViewTests(ClinicData, TestCase):
+    url = "/api/admins/doctors/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.create_doctor("Bob Bone")
+
+    def get_sql(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query["sql"] for query in queries]
+
+    def test_sparse_fields_select_only_their_columns(self):
+        response, sql = self.get_sql(fields="name")
+
+        self.assertEqual(
+            response.data["doctors"], [{"name": "Alice Heart"}, {"name": "Bob Bone"}]
+        )
+        self.assertEqual(len(sql), 1)
+        self.assertNotIn("JOIN", sql[0])
+        self.assertEqual(
+            sql[0].split(" FROM ")[0],
+            'SELECT "doctors_doctor"."customuser_ptr_id", "doctors_doctor"."name"',
+        )
+
+    def test_requested_relations_are_joined_or_prefetched(self):
+        response, sql = self.get_sql(fields="name,department")
+        self.assertEqual(response.data["doctors"][0]["department"], "Cardiology")
+        self.assertEqual(len(sql), 1)
+        self.assertEqual(sql[0].count("JOIN"), 1)
+        self.assertIn('JOIN "adminapp_department"', sql[0])
+        self.assertNotIn('"users_customuser"', sql[0])
+
+        response, sql = self.get_sql(fields="name,groups")
+        self.assertEqual(response.data["doctors"][0]["groups"], [])
+        self.assertEqual(len(sql), 2)
+        self.assertNotIn("JOIN", sql[0])
+        self.assertEqual(sql[1].count("JOIN"), 1)
+        self.assertIn('JOIN "users_customuser_groups"', sql[1])
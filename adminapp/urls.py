@@ -6,8 +6,12 @@ from adminapp.views import (
     DoctorView,
     UsersView,
     BlogView,
+    BlogFeedView,
+    BlogDetailView,
     BookingsListView,
+    BookingExportView,
     DashBoardView,
+    AnalyticsView,
 )
 
 urlpatterns = [
@@ -19,7 +23,10 @@ urlpatterns = [
     path("users/", UsersView.as_view(), name="users"),
     path("blogs/", BlogView.as_view(), name="blogs"),
     path("edit_blog/<int:id>", BlogView.as_view(), name="edit_blog"),
+    path("blogs/feed/", BlogFeedView.as_view(), name="blog_feed"),
+    path("blogs/<int:id>/", BlogDetailView.as_view(), name="blog_detail"),
     path("bookings/", BookingsListView.as_view(), name="bookings"),
+    path("bookings/export/", BookingExportView.as_view(), name="bookings_export"),
     path(
         "cancel_appointment/",
         CancelAppointmentView.as_view(),
@@ -27,4 +34,5 @@ urlpatterns = [
     ),
     path("dashboard/", DashBoardView.as_view(), name="dashboard"),
     path("dashboard/<int:id>/", DashBoardView.as_view(), name="dashboard_notification"),
+    path("analytics/", AnalyticsView.as_view(), name="analytics"),
 ]
@@ -7,24 +7,42 @@ from rest_framework import status
 from .serializer import (
     DoctorSerializer,
     BlogsSerializer,
-    AdminBookingSerializer,
+    BlogFeedSerializer,
+    BLOG_EXCERPT_LENGTH,
+    AdminBookingValuesSerializer,
     CancelBookingSerializer,
     NotificationSerializer,
 )
 from rest_framework.views import APIView
 from django.contrib.auth.hashers import make_password
-from doctors.models import Doctor, Booking, Notification
+from doctors.models import Doctor, Booking, BookingRollup, Notification
 from django.shortcuts import get_object_or_404
 from .models import CancelBooking, BlogAdditionalImage, Blogs
 from django.utils import timezone
 from users.models import CustomUser
 from users.serializer import CustomUserSerializer
+import json
 import os
 from doctors.tasks import send_mail_task
+from doctors.snapshots import (
+    BLOG_SCOPE,
+    GLOBAL_SCOPE,
+    cached_snapshot,
+    snapshot_etag,
+)
+from heydoc.conditional import etag
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from .analytics import booking_series, default_start
+from .exports import EXPORT_FORMATS, export_bookings, export_columns, export_rows
+from django.http import StreamingHttpResponse
+from heydoc.pagination import KeysetPagination
+from heydoc.serializers import SparseFieldset
+from datetime import date
 from doctors.models import Patient
-from django.db.models import Sum, Count
+from django.db.models import Sum
 from django.utils.timezone import now
-from django.db.models.functions import TruncMonth, TruncYear
+from django.db.models.functions import Left, TruncMonth, TruncYear
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
 
@@ -268,7 +286,7 @@ class CancelAppointmentView(APIView):
                 subject = "Booking Cancelled sucessfully!"
 
                 email_from = os.getenv("EMAIL_HOST_USER")
-                recipient_list = list(user.email)
+                recipient_list = [user.email]
 
                 if refund == "Refund Applicable":
                     Notification.objects.create(
@@ -338,7 +356,7 @@ class CancelAppointmentView(APIView):
             email_to = [booking.cancelled_by.email]
             print(email_to)
             email_from = os.getenv("EMAIL_HOST_USER")
-            send_mail_task(subject, message, email_from, email_to)
+            send_mail_task.delay(subject, message, email_from, email_to)
             return Response(
                 {
                     "message": "Refund Status Updated Successfully",
@@ -355,8 +373,9 @@ class DoctorView(APIView):
 
     def get(self, request):
         try:
-            doctors = Doctor.objects.all()
-            serializer = DoctorSerializer(doctors, many=True)
+            sparse = SparseFieldset.from_request(request)
+            doctors = sparse.project(Doctor.objects.all(), DoctorSerializer)
+            serializer = DoctorSerializer(doctors, many=True, sparse=sparse)
             return Response(
                 {
                     "message": "Doctor Informations retrieved successfully!",
@@ -508,117 +527,218 @@ class BlogView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BlogFeedView(APIView):
+
+    @etag(snapshot_etag(BLOG_SCOPE))
+    def get(self, request):
+        try:
+            paginator = KeysetPagination(ordering=("-date", "-id"), page_size=10)
+            cursor = paginator.decode_cursor(request)
+            # Only what selects the page goes in the cache key, so other query
+            # parameters cannot create more snapshots. The links depend on the
+            # request URL and are built for each request.
+            page_size = paginator.get_page_size(request)
+            variant = json.dumps(
+                [page_size, cursor and cursor["p"], cursor and cursor["r"]],
+                separators=(",", ":"),
+            )
+            feed = cached_snapshot(
+                BLOG_SCOPE, lambda: self.feed(paginator, request), variant=variant
+            )
+            paginator.set_positions(request, feed["positions"])
+            response = Response(
+                {
+                    "message": "Blogs retrieved successfully",
+                    **paginator.get_links(),
+                    "blogs": feed["blogs"],
+                }
+            )
+            patch_cache_control(
+                response, public=True, max_age=settings.BLOG_CACHE_MAX_AGE
+            )
+            return response
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def feed(self, paginator, request):
+        blogs = paginator.paginate_queryset(
+            Blogs.objects.defer("content")
+            .annotate(content_head=Left("content", BLOG_EXCERPT_LENGTH * 4))
+            .prefetch_related("additional_images"),
+            request,
+            view=self,
+        )
+        serializer = BlogFeedSerializer(blogs, many=True)
+        return {"positions": paginator.get_positions(), "blogs": serializer.data}
+
+
+class BlogDetailView(APIView):
+
+    @etag(snapshot_etag(BLOG_SCOPE))
+    def get(self, request, id):
+        try:
+            response = Response(
+                cached_snapshot(
+                    BLOG_SCOPE, lambda: self.article(id), variant=f"article:{id}"
+                )
+            )
+            patch_cache_control(
+                response, public=True, max_age=settings.BLOG_CACHE_MAX_AGE
+            )
+            return response
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def article(self, id):
+        blog = get_object_or_404(
+            Blogs.objects.prefetch_related("additional_images"), id=id
+        )
+        return {
+            "message": "Blog retrieved successfully",
+            "blog": BlogsSerializer(blog).data,
+        }
+
+
 class BookingsListView(APIView):
     permission_class = IsAuthenticated
 
     def get(self, request):
         try:
-            bookings = (
-                Booking.objects.select_related("doctor")
-                .all()
-                .order_by("-date_of_booking")
+            values = AdminBookingValuesSerializer(
+                sparse=SparseFieldset.from_request(request)
+            )
+            paginator = KeysetPagination(ordering=("-date_of_booking", "-id"))
+            bookings = paginator.paginate_queryset(
+                values.values(Booking.objects.all(), "date_of_booking", "id"),
+                request,
+                view=self,
             )
-
-            serializer = AdminBookingSerializer(bookings, many=True)
 
             return Response(
                 {
                     "Message": "Bookings Information retreived Successfully",
-                    "bookings": serializer.data,
+                    "bookings": values.render(bookings),
+                    **paginator.get_links(),
                 }
             )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DashBoardView(APIView):
+class BookingExportView(APIView):
     permission_class = IsAuthenticated
 
     def get(self, request):
+        output = request.query_params.get("output", "csv")
         try:
-            notifications_objs = Notification.objects.filter(is_seen=False).order_by(
-                "created_at"
-            )[:5]
-            notifications = NotificationSerializer(notifications_objs, many=True)
-            total_earning = Booking.objects.filter(booking_status="Booked").aggregate(
-                total=Sum("amount")
-            )
-            total_appointments = Booking.objects.filter(booking_status="Booked").count()
-            doctors_count = Doctor.objects.filter(is_active=True).count()
-            users_count = CustomUser.objects.filter(is_active=True).count()
-            total_yearly = (
-                Booking.objects.filter(booking_status="Booked")
-                .annotate(year=TruncYear("booked_day"))
-                .values("year")
-                .annotate(total=Sum("amount"))
-                .order_by("year")
-            )
-            total_monthly = (
-                Booking.objects.filter(
-                    booking_status="Booked", booked_day__year=now().year
+            if output not in EXPORT_FORMATS:
+                return Response(
+                    {"error": f"output must be one of {', '.join(EXPORT_FORMATS)}."},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                .annotate(month=TruncMonth("booked_day"))
-                .values("month")
-                .annotate(total=Sum("amount"))
-                .order_by("month")
-            )
-            online_consultations_earning = Booking.objects.filter(
-                consultation_mode="Online"
-            ).aggregate(total=Sum("amount"))
-            offline_consultations_earning = Booking.objects.filter(
-                consultation_mode="Offline"
-            ).aggregate(total=Sum("amount"))
-
-            patients_count = Patient.objects.all().count()
-            total_monthly_list = list(total_monthly)
-
-            current_month_total = (
-                total_monthly_list[-1]["total"] if len(total_monthly_list) > 0 else 0
-            )
-            previous_month_total = (
-                total_monthly_list[-2]["total"] if len(total_monthly_list) > 1 else 0
+            columns = export_columns(
+                [
+                    column
+                    for column in request.query_params.get("columns", "").split(",")
+                    if column
+                ]
             )
-            monthly_difference = current_month_total - previous_month_total
-
-            total_yearly_list = list(total_yearly)
-            current_year_total = (
-                total_yearly_list[-1]["total"] if len(total_yearly_list) > 0 else 0
+            bookings = export_bookings(request.query_params)
+            response = StreamingHttpResponse(
+                export_rows(bookings, columns, output),
+                content_type=EXPORT_FORMATS[output],
             )
-            previous_year_total = (
-                total_yearly_list[-2]["total"] if len(total_yearly_list) > 1 else 0
+            response["Content-Disposition"] = (
+                f'attachment; filename="bookings.{output}"'
             )
-            yearly_difference = current_year_total - previous_year_total
+            return response
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            top_doctors = (
-                Booking.objects.filter(booking_status="Booked")
-                .values("doctor__name")
-                .annotate(total_bookings=Count("doctor"))
-                .order_by("-total_bookings")[:5]
-            )
 
-            return Response(
-                {
-                    "notifications": notifications.data,
-                    "total_earning": total_earning,
-                    "total_appointments": total_appointments,
-                    "doctors_count": doctors_count,
-                    "users_count": users_count,
-                    "total_monthly": total_monthly,
-                    "online_consultations": online_consultations_earning,
-                    "offline_consultations": offline_consultations_earning,
-                    "patients_count": patients_count,
-                    "monthly_difference": monthly_difference,
-                    "yearly_difference": yearly_difference,
-                    "current_month_total": current_month_total,
-                    "current_year": current_year_total,
-                    "total_yearly": total_yearly,
-                    "top_doctors": top_doctors,
-                }
-            )
+class DashBoardView(APIView):
+    permission_class = IsAuthenticated
 
+    def get(self, request):
+        try:
+            return Response(cached_snapshot(GLOBAL_SCOPE, self.snapshot))
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def snapshot(self):
+        notifications_objs = Notification.objects.filter(is_seen=False).order_by(
+            "created_at"
+        )[:5]
+        notifications = NotificationSerializer(notifications_objs, many=True)
+        rollups = BookingRollup.objects.filter(appointments__gt=0)
+        total_earning = rollups.aggregate(total=Sum("revenue"))
+        total_appointments = rollups.aggregate(total=Sum("appointments"))["total"] or 0
+        doctors_count = Doctor.objects.filter(is_active=True).count()
+        users_count = CustomUser.objects.filter(is_active=True).count()
+        total_yearly = (
+            rollups.annotate(year=TruncYear("day"))
+            .values("year")
+            .annotate(total=Sum("revenue"))
+            .order_by("year")
+        )
+        total_monthly = (
+            rollups.filter(day__year=now().year)
+            .annotate(month=TruncMonth("day"))
+            .values("month")
+            .annotate(total=Sum("revenue"))
+            .order_by("month")
+        )
+        online_consultations_earning = rollups.filter(
+            consultation_mode="Online"
+        ).aggregate(total=Sum("revenue"))
+        offline_consultations_earning = rollups.filter(
+            consultation_mode="Offline"
+        ).aggregate(total=Sum("revenue"))
+
+        patients_count = Patient.objects.all().count()
+        total_monthly_list = list(total_monthly)
+
+        current_month_total = (
+            total_monthly_list[-1]["total"] if len(total_monthly_list) > 0 else 0
+        )
+        previous_month_total = (
+            total_monthly_list[-2]["total"] if len(total_monthly_list) > 1 else 0
+        )
+        monthly_difference = current_month_total - previous_month_total
+
+        total_yearly_list = list(total_yearly)
+        current_year_total = (
+            total_yearly_list[-1]["total"] if len(total_yearly_list) > 0 else 0
+        )
+        previous_year_total = (
+            total_yearly_list[-2]["total"] if len(total_yearly_list) > 1 else 0
+        )
+        yearly_difference = current_year_total - previous_year_total
+
+        top_doctors = (
+            rollups.values("doctor__name")
+            .annotate(total_bookings=Sum("appointments"))
+            .order_by("-total_bookings")[:5]
+        )
+
+        return {
+            "notifications": list(notifications.data),
+            "total_earning": total_earning,
+            "total_appointments": total_appointments,
+            "doctors_count": doctors_count,
+            "users_count": users_count,
+            "total_monthly": total_monthly_list,
+            "online_consultations": online_consultations_earning,
+            "offline_consultations": offline_consultations_earning,
+            "patients_count": patients_count,
+            "monthly_difference": monthly_difference,
+            "yearly_difference": yearly_difference,
+            "current_month_total": current_month_total,
+            "current_year": current_year_total,
+            "total_yearly": total_yearly_list,
+            "top_doctors": list(top_doctors),
+        }
+
     def patch(self, request, id):
         try:
             notification = get_object_or_404(Notification, id=id)
@@ -630,3 +750,47 @@ class DashBoardView(APIView):
             )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AnalyticsView(APIView):
+    permission_class = IsAuthenticated
+
+    def get(self, request):
+        params = request.query_params
+        metric = params.get("metric", "revenue")
+        granularity = params.get("granularity", "month")
+        try:
+            end = (
+                date.fromisoformat(params["end"]) if params.get("end") else now().date()
+            )
+            start = (
+                date.fromisoformat(params["start"])
+                if params.get("start")
+                else default_start(end, granularity)
+            )
+            department = params.get("department")
+            if department:
+                department = get_object_or_404(
+                    Department, Q(dept_id=department) | Q(dept_name__iexact=department)
+                )
+            series = booking_series(
+                metric,
+                granularity,
+                start,
+                end,
+                doctor=params.get("doc_id"),
+                department=department,
+                mode=params.get("consultation_mode"),
+            )
+            return Response(
+                {
+                    "metric": metric,
+                    "granularity": granularity,
+                    "start": start,
+                    "end": end,
+                    "series": series,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from adminapp.models import CancelBooking
+from .models import Booking, BookingRollup, DailyBookedSlots
+from .utils import push_slot_event
+from .snapshots import GLOBAL_SCOPE, invalidate_snapshots
+from .versions import bump_schedule_version
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def create_booking(data):
+    """
+    Book a slot in one short transaction.
+
+    ``data`` holds Booking field values with model instances for the
+    relations, e.g. a BookingSerializer's ``validated_data``. The doctor's
+    row in the booked-slot index is locked while the slot is checked and the
+    booking inserted, and the partial unique constraint on
+    (doctor, booked_day, time_slot) backs this up on databases without row
+    locks. Raises ``SlotUnavailable`` when the slot is already taken.
+    """
+    doctor = data["doctor"]
+    booked_day = data["booked_day"]
+    time_slot = data["time_slot"]
+    with transaction.atomic():
+        booked_slots, _ = DailyBookedSlots.objects.select_for_update().get_or_create(
+            doctor=doctor, booked_day=booked_day
+        )
+        if booked_slots.is_taken(time_slot):
+            raise SlotUnavailable(
+                "This slot is already booked. Please choose another slot."
+            )
+        try:
+            with transaction.atomic():
+                booking = Booking.objects.create(**data)
+        except IntegrityError:
+            if Booking.objects.filter(
+                doctor=doctor,
+                booked_day=booked_day,
+                time_slot=time_slot,
+                booking_status="Booked",
+            ).exists():
+                raise SlotUnavailable(
+                    "This slot is already booked. Please choose another slot."
+                )
+            raise
+        if booking.payment_status.lower() == "completed":
+            booking.patient.doctor.add(doctor)
+    return booking
+
+
+def cancel_bookings(bookings, reason="Doctor Not Available"):
+    """
+    Cancel every booked row of ``bookings`` set-wise: one UPDATE for the
+    statuses, one bulk insert of CancelBooking rows with the refund decided
+    from the payment status, and one index and rollup refresh per doctor.
+    Returns the distinct emails of the users whose bookings were cancelled.
+    """
+    with transaction.atomic():
+        rows = list(
+            bookings.filter(booking_status="Booked").values(
+                "id",
+                "doctor_id",
+                "booked_day",
+                "time_slot",
+                "payment_status",
+                "booked_by_id",
+                "booked_by__email",
+                "patient__id",
+                "doctor__id",
+            )
+        )
+        if not rows:
+            return []
+        Booking.objects.filter(id__in=[row["id"] for row in rows]).update(
+            booking_status="cancelled"
+        )
+        CancelBooking.objects.bulk_create(
+            [
+                CancelBooking(
+                    booking_id=row["id"],
+                    cancelled_by_id=row["booked_by_id"],
+                    doctor_id=row["doctor__id"],
+                    patient_id=row["patient__id"],
+                    reason=reason,
+                    refund=(
+                        "Refund Applicable"
+                        if row["payment_status"].lower() == "completed"
+                        else "No Refund"
+                    ),
+                )
+                for row in rows
+            ],
+            ignore_conflicts=True,
+        )
+        booked_days = defaultdict(set)
+        freed_slots = defaultdict(list)
+        for row in rows:
+            booked_days[row["doctor_id"]].add(row["booked_day"])
+            freed_slots[row["doctor_id"]].append(
+                {"date": str(row["booked_day"]), "time_slot": str(row["time_slot"])}
+            )
+        for doctor_id, days in booked_days.items():
+            DailyBookedSlots.refresh_days(doctor_id, days)
+            BookingRollup.refresh_days(doctor_id, days)
+            bump_schedule_version(doctor_id)
+            push_slot_event(doctor_id, "slots_freed", slots=freed_slots[doctor_id])
+        invalidate_snapshots(GLOBAL_SCOPE, *booked_days)
+    return sorted({row["booked_by__email"] for row in rows if row["booked_by__email"]})
@@ -0,0 +1,20 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+
+def slot_group(doc_id):
+    return f"doctor_slots_{doc_id}"
+
+
+class SlotConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes slot taken / freed and availability changes for one doctor."""
+
+    async def connect(self):
+        self.group_name = slot_group(self.scope["url_route"]["kwargs"]["doc_id"])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def slot_event(self, event):
+        await self.send_json(event["data"])
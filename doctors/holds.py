@@ -0,0 +1,164 @@
+"""
+Short-lived slot holds taken while a patient is in the payment sheet.
+
+Each hold is one cache key per (doctor, date, time) created with
+``cache.add`` so only one holder can win it. A per-doctor registry of held
+slots, each with its expiry, lets the slot picker hide them without scanning
+the cache; the registry is only a hint and every entry is re-checked against
+its hold key.
+
+On Redis the registry is a sorted set scored by expiry, changed with single
+ZADD / ZREM commands so concurrent holds on one doctor cannot overwrite each
+other. Other cache backends keep it as one cache value updated under a
+short ``cache.add`` lock.
+"""
+
+import time as clock
+from datetime import date, time
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from .versions import bump_schedule_version
+
+# seconds the registry lock of a non-Redis cache is held at most
+REGISTRY_LOCK_TIMEOUT = 5
+
+
+def _slot(booked_day, time_slot):
+    if isinstance(booked_day, str):
+        booked_day = date.fromisoformat(booked_day)
+    if isinstance(time_slot, str):
+        time_slot = time.fromisoformat(time_slot)
+    return booked_day.isoformat(), time_slot.isoformat()
+
+
+def _hold_key(doc_id, booked_day, time_slot):
+    return f"slot_hold:{doc_id}:{booked_day}:{time_slot}"
+
+
+def _registry_key(doc_id):
+    return f"slot_hold_registry:{doc_id}"
+
+
+def _member(booked_day, time_slot):
+    return f"{booked_day} {time_slot}"
+
+
+def _redis():
+    """The raw Redis client behind the cache, or None for other backends."""
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:
+        return None
+
+
+def _update_registry(doc_id, member, expires):
+    """Set the expiry of ``member`` in the registry, or remove it if None."""
+    now = clock.time()
+    client = _redis()
+    if client is not None:
+        key = cache.make_key(_registry_key(doc_id))
+        pipe = client.pipeline()
+        pipe.zremrangebyscore(key, "-inf", now)
+        if expires is None:
+            pipe.zrem(key, member)
+        else:
+            pipe.zadd(key, {member: expires})
+        pipe.execute()
+        return
+
+    lock = f"{_registry_key(doc_id)}:lock"
+    while not cache.add(lock, True, REGISTRY_LOCK_TIMEOUT):
+        clock.sleep(0.005)
+    try:
+        registry = {
+            entry: entry_expires
+            for entry, entry_expires in cache.get(_registry_key(doc_id), {}).items()
+            if entry_expires > now
+        }
+        if expires is None:
+            registry.pop(member, None)
+        else:
+            registry[member] = expires
+        if registry:
+            timeout = max(registry.values()) - now
+            cache.set(_registry_key(doc_id), registry, timeout)
+        else:
+            cache.delete(_registry_key(doc_id))
+    finally:
+        cache.delete(lock)
+
+
+def hold_registry(doctor_ids):
+    """``{doc_id: {(date, time): expiry}}`` of unexpired registry entries."""
+    now = clock.time()
+    client = _redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        for doc_id in doctor_ids:
+            pipe.zrangebyscore(
+                cache.make_key(_registry_key(doc_id)), now, "+inf", withscores=True
+            )
+        registries = {
+            doc_id: {
+                (member.decode() if isinstance(member, bytes) else member): expires
+                for member, expires in entries
+            }
+            for doc_id, entries in zip(doctor_ids, pipe.execute())
+        }
+    else:
+        found = cache.get_many([_registry_key(doc_id) for doc_id in doctor_ids])
+        registries = {
+            doc_id: found.get(_registry_key(doc_id), {}) for doc_id in doctor_ids
+        }
+    return {
+        doc_id: {
+            tuple(member.split(" ")): expires
+            for member, expires in registry.items()
+            if expires > now
+        }
+        for doc_id, registry in registries.items()
+        if registry
+    }
+
+
+def hold_slot(doc_id, booked_day, time_slot, holder, ttl=None):
+    """Hold a slot for ``holder``. Returns False if someone else holds it."""
+    ttl = ttl or settings.SLOT_HOLD_TTL
+    booked_day, time_slot = _slot(booked_day, time_slot)
+    key = _hold_key(doc_id, booked_day, time_slot)
+    holder = str(holder)
+    if not cache.add(key, holder, ttl):
+        if cache.get(key) != holder:
+            return False
+        cache.touch(key, ttl)
+    _update_registry(doc_id, _member(booked_day, time_slot), clock.time() + ttl)
+    bump_schedule_version(doc_id)
+    return True
+
+
+def release_hold(doc_id, booked_day, time_slot, holder):
+    booked_day, time_slot = _slot(booked_day, time_slot)
+    key = _hold_key(doc_id, booked_day, time_slot)
+    if cache.get(key) == str(holder):
+        cache.delete(key)
+        _update_registry(doc_id, _member(booked_day, time_slot), None)
+        bump_schedule_version(doc_id)
+
+
+def held_slots(doctor_ids, exclude_holder=None):
+    """``{doc_id: {date: {time, ...}}}`` of live holds, in two cache round trips."""
+    keys = {
+        _hold_key(doc_id, booked_day, time_slot): (doc_id, booked_day, time_slot)
+        for doc_id, registry in hold_registry(doctor_ids).items()
+        for booked_day, time_slot in registry
+    }
+    holds = {}
+    for key, holder in cache.get_many(list(keys)).items():
+        if exclude_holder is not None and holder == str(exclude_holder):
+            continue
+        doc_id, booked_day, time_slot = keys[key]
+        holds.setdefault(doc_id, {}).setdefault(
+            date.fromisoformat(booked_day), set()
+        ).add(time.fromisoformat(time_slot))
+    return holds
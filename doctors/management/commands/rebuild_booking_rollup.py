@@ -0,0 +1,34 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from doctors.models import Booking, BookingRollup
+from doctors.snapshots import GLOBAL_SCOPE, invalidate_snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-doctor daily booking rollup used by the dashboards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--doctor", help="Only rebuild this doctor's rollup.")
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.filter(doctor__isnull=False)
+        rollups = BookingRollup.objects.all()
+        if options["doctor"]:
+            bookings = bookings.filter(doctor_id=options["doctor"])
+            rollups = rollups.filter(doctor_id=options["doctor"])
+        days = defaultdict(set)
+        for doctor_id, booked_day in (
+            bookings.values_list("doctor_id", "booked_day").distinct().order_by()
+        ):
+            days[doctor_id].add(booked_day)
+        with transaction.atomic():
+            # dashboards of doctors whose rollup rows go away must be dropped too
+            doctor_ids = set(rollups.values_list("doctor_id", flat=True)) | set(days)
+            rollups.delete()
+            for doctor_id, booked_days in days.items():
+                BookingRollup.refresh_days(doctor_id, booked_days)
+            invalidate_snapshots(GLOBAL_SCOPE, *doctor_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt booking rollup for {len(days)} doctor(s).")
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from doctors.search import index_doctors
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text doctor search index."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            index_doctors()
+        self.stdout.write(self.style.SUCCESS("Rebuilt doctor search index."))
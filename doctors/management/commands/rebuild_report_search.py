@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from doctors.report_search import index_reports
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text report search index."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            index_reports()
+        self.stdout.write(self.style.SUCCESS("Rebuilt report search index."))
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.14 on 2026-10-18 13:31
+
+from collections import defaultdict
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_booked_slots(apps, schema_editor):
+    Booking = apps.get_model("doctors", "Booking")
+    DailyBookedSlots = apps.get_model("doctors", "DailyBookedSlots")
+    slots = defaultdict(list)
+    bookings = (
+        Booking.objects.filter(booking_status="Booked", doctor__isnull=False)
+        .values_list("doctor_id", "booked_day", "time_slot")
+        .order_by("doctor_id", "booked_day", "time_slot")
+    )
+    for doctor_id, booked_day, time_slot in bookings.iterator():
+        slots[(doctor_id, booked_day)].append(time_slot.isoformat())
+    DailyBookedSlots.objects.bulk_create(
+        [
+            DailyBookedSlots(
+                doctor_id=doctor_id, booked_day=booked_day, time_slots=times
+            )
+            for (doctor_id, booked_day), times in slots.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("doctors", "0004_doctor_active"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyBookedSlots",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("booked_day", models.DateField()),
+                ("time_slots", models.JSONField(default=list)),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="booked_slots",
+                        to="doctors.doctor",
+                        to_field="doc_id",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("doctor", "booked_day")},
+            },
+        ),
+        migrations.RunPython(build_booked_slots, migrations.RunPython.noop),
+    ]
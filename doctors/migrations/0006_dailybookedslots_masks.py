@@ -0,0 +1,46 @@
+# Generated by Django 4.2.14 on 2026-10-18 13:40
+
+from datetime import time
+from django.db import migrations, models
+
+
+def slot_bit(time_slot, start):
+    minutes = (time_slot.hour * 60 + time_slot.minute) - start.hour * 60
+    if 0 <= minutes < 240 and not minutes % 15:
+        return 1 << (minutes // 15)
+    return 0
+
+
+def time_slots_to_masks(apps, schema_editor):
+    DailyBookedSlots = apps.get_model("doctors", "DailyBookedSlots")
+    for booked_slots in DailyBookedSlots.objects.all().iterator():
+        for value in booked_slots.time_slots:
+            time_slot = time.fromisoformat(value)
+            booked_slots.morning_mask |= slot_bit(time_slot, time(9, 0))
+            booked_slots.evening_mask |= slot_bit(time_slot, time(14, 0))
+        booked_slots.save(update_fields=["morning_mask", "evening_mask"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("doctors", "0005_dailybookedslots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailybookedslots",
+            name="evening_mask",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="dailybookedslots",
+            name="morning_mask",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(time_slots_to_masks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="dailybookedslots",
+            name="time_slots",
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.14 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+def cancel_double_bookings(apps, schema_editor):
+    """
+    Keep the earliest Booked row of every doubly booked slot and cancel the
+    others, recording a CancelBooking with a refund when they were paid.
+    """
+    Booking = apps.get_model("doctors", "Booking")
+    CancelBooking = apps.get_model("adminapp", "CancelBooking")
+    booked = Booking.objects.filter(booking_status="Booked")
+    slots = (
+        booked.order_by()
+        .values("doctor_id", "booked_day", "time_slot")
+        .annotate(first=models.Min("id"), bookings=models.Count("id"))
+        .filter(bookings__gt=1)
+    )
+    duplicates = []
+    for slot in slots:
+        duplicates += (
+            booked.select_related("doctor", "patient")
+            .filter(
+                doctor_id=slot["doctor_id"],
+                booked_day=slot["booked_day"],
+                time_slot=slot["time_slot"],
+            )
+            .exclude(id=slot["first"])
+        )
+    if not duplicates:
+        return
+    Booking.objects.filter(id__in=[booking.id for booking in duplicates]).update(
+        booking_status="cancelled"
+    )
+    CancelBooking.objects.bulk_create(
+        [
+            CancelBooking(
+                booking_id=booking.id,
+                cancelled_by_id=booking.booked_by_id,
+                doctor_id=booking.doctor.pk,
+                patient_id=booking.patient.pk,
+                reason="Other",
+                refund=(
+                    "Refund Applicable"
+                    if booking.payment_status.lower() == "completed"
+                    else "No Refund"
+                ),
+            )
+            for booking in duplicates
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("adminapp", "0002_initial"),
+        ("doctors", "0006_dailybookedslots_masks"),
+    ]
+
+    operations = [
+        # Cancelled rows were unique per patient, doctor and day too, so a
+        # second cancellation of the same appointment day failed.
+        migrations.AlterUniqueTogether(
+            name="booking",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="booking",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("booking_status", "Booked")),
+                fields=("booked_day", "patient", "doctor"),
+                name="unique_booked_patient_day",
+            ),
+        ),
+        migrations.RunPython(cancel_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="booking",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("booking_status", "Booked")),
+                fields=("doctor", "booked_day", "time_slot"),
+                name="unique_booked_time_slot",
+            ),
+        ),
+    ]
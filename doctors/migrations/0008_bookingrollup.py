@@ -0,0 +1,93 @@
+# Generated by Django 4.2.14 on 2026-10-18 13:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def build_rollup(apps, schema_editor):
+    Booking = apps.get_model("doctors", "Booking")
+    BookingRollup = apps.get_model("doctors", "BookingRollup")
+    booked = Q(booking_status="Booked")
+    refunded = ~booked & Q(payment_status__iexact="completed")
+    zero = Value(Decimal("0.00"))
+    rows = (
+        Booking.objects.filter(doctor__isnull=False)
+        .values("doctor_id", "booked_day", "consultation_mode")
+        .annotate(
+            appointments=Count("id", filter=booked),
+            revenue=Coalesce(
+                Sum("amount", filter=booked), zero, output_field=models.DecimalField()
+            ),
+            cancellations=Count("id", filter=~booked),
+            refunds=Count("id", filter=refunded),
+            refund_amount=Coalesce(
+                Sum("amount", filter=refunded),
+                zero,
+                output_field=models.DecimalField(),
+            ),
+        )
+        .order_by()
+    )
+    BookingRollup.objects.bulk_create(
+        [BookingRollup(day=row.pop("booked_day"), **row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("doctors", "0007_booking_unique_booked_time_slot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "consultation_mode",
+                    models.CharField(
+                        choices=[("Offline", "Offline"), ("Online", "Online")],
+                        max_length=10,
+                    ),
+                ),
+                ("appointments", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("cancellations", models.PositiveIntegerField(default=0)),
+                ("refunds", models.PositiveIntegerField(default=0)),
+                (
+                    "refund_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="booking_rollups",
+                        to="doctors.doctor",
+                        to_field="doc_id",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("doctor", "day", "consultation_mode")},
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.14 on 2026-10-18 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("doctors", "0008_bookingrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["-date_of_booking", "-id"], name="booking_booked_on_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["doctor", "booking_status", "-booked_day", "-id"],
+                name="booking_doctor_day_idx",
+            ),
+        ),
+    ]
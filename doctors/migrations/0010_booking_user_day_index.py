@@ -0,0 +1,19 @@
+# Generated by Django 4.2.14 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("doctors", "0009_booking_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["booked_by", "booked_day"], name="booking_user_day_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.14 on 2026-10-18 15:20
+
+from django.db import migrations
+
+# The statements are frozen here; doctors.search only reads and fills the table.
+SCHEMA = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        """
+        CREATE TABLE IF NOT EXISTS doctors_doctorsearch (
+            doctor_id bigint PRIMARY KEY
+                REFERENCES doctors_doctor (customuser_ptr_id) ON DELETE CASCADE,
+            name text NOT NULL,
+            document tsvector NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS doctors_doctorsearch_document ON doctors_doctorsearch USING gin (document)",
+        "CREATE INDEX IF NOT EXISTS doctors_doctorsearch_name_trgm ON doctors_doctorsearch USING gin (name gin_trgm_ops)",
+        """
+        INSERT INTO doctors_doctorsearch (doctor_id, name, document)
+        SELECT d.customuser_ptr_id, d.name,
+            setweight(to_tsvector('simple', d.name), 'A')
+            || setweight(to_tsvector('english', dep.dept_name), 'B')
+            || setweight(to_tsvector('english', COALESCE(d.description, '')), 'C')
+            || setweight(to_tsvector('english', COALESCE(dep.dept_description, '')), 'D')
+        FROM doctors_doctor d
+        JOIN adminapp_department dep ON dep.dept_id = d.department_id
+        ON CONFLICT (doctor_id) DO NOTHING
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS doctors_doctorsearch USING fts5(
+            name, dept_name, description, dept_description,
+            tokenize='porter unicode61', prefix='2 3'
+        )
+        """,
+        """
+        INSERT INTO doctors_doctorsearch
+            (rowid, name, dept_name, description, dept_description)
+        SELECT d.customuser_ptr_id, d.name, dep.dept_name,
+            COALESCE(d.description, ''), COALESCE(dep.dept_description, '')
+        FROM doctors_doctor d
+        JOIN adminapp_department dep ON dep.dept_id = d.department_id
+        """,
+    ],
+}
+
+
+def build_search_index(apps, schema_editor):
+    for statement in SCHEMA.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in SCHEMA:
+        schema_editor.execute("DROP TABLE IF EXISTS doctors_doctorsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("doctors", "0010_booking_user_day_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, remove_search_index),
+    ]
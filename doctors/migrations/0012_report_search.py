@@ -0,0 +1,80 @@
+# Generated by Django 4.2.14 on 2026-10-18 16:05
+
+from django.db import migrations
+
+# The statements are frozen here; doctors.report_search only reads and fills
+# the table.
+SCHEMA = {
+    "postgresql": [
+        """
+        CREATE TABLE IF NOT EXISTS doctors_reportsearch (
+            report_id bigint PRIMARY KEY
+                REFERENCES doctors_report (id) ON DELETE CASCADE,
+            diagnosis tsvector NOT NULL,
+            allergies tsvector NOT NULL,
+            medications tsvector NOT NULL,
+            symptoms tsvector NOT NULL,
+            family_history tsvector NOT NULL,
+            document tsvector NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS doctors_reportsearch_document ON doctors_reportsearch USING gin (document)",
+        """
+        INSERT INTO doctors_reportsearch
+            (report_id, diagnosis, allergies, medications, symptoms,
+             family_history, document)
+        SELECT id, diagnosis, allergies, medications, symptoms, family_history,
+            diagnosis || allergies || medications || symptoms || family_history
+        FROM (
+            SELECT r.id,
+                setweight(to_tsvector('english', COALESCE(NULLIF(r.diagnosis, 'NA'), '')), 'A'),
+                setweight(to_tsvector('english', COALESCE(NULLIF(r.allergies, 'NA'), '')), 'B'),
+                setweight(to_tsvector('english', COALESCE(NULLIF(r.medications, 'NA'), '')), 'B'),
+                setweight(to_tsvector('english', COALESCE(NULLIF(r.symptoms, 'NA'), '')), 'C'),
+                setweight(to_tsvector('english', COALESCE(NULLIF(r.family_history, 'NA'), '')), 'D')
+            FROM doctors_report r
+        ) AS doc (id, diagnosis, allergies, medications, symptoms, family_history)
+        ON CONFLICT (report_id) DO NOTHING
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS doctors_reportsearch USING fts5(
+            diagnosis, allergies, medications, symptoms, family_history,
+            tokenize='porter unicode61', prefix='2 3'
+        )
+        """,
+        """
+        INSERT INTO doctors_reportsearch
+            (rowid, diagnosis, allergies, medications, symptoms, family_history)
+        SELECT r.id,
+            COALESCE(NULLIF(r.diagnosis, 'NA'), ''),
+            COALESCE(NULLIF(r.allergies, 'NA'), ''),
+            COALESCE(NULLIF(r.medications, 'NA'), ''),
+            COALESCE(NULLIF(r.symptoms, 'NA'), ''),
+            COALESCE(NULLIF(r.family_history, 'NA'), '')
+        FROM doctors_report r
+        """,
+    ],
+}
+
+
+def build_report_index(apps, schema_editor):
+    for statement in SCHEMA.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def remove_report_index(apps, schema_editor):
+    if schema_editor.connection.vendor in SCHEMA:
+        schema_editor.execute("DROP TABLE IF EXISTS doctors_reportsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("doctors", "0011_doctor_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(build_report_index, remove_report_index),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.base_user import AbstractBaseUser
 from adminapp.models import Department
 from shortuuid.django_fields import ShortUUIDField
@@ -26,6 +27,31 @@ class TimeSlot(models.Model):
             time = (datetime.combine(date.min, time) + timedelta(minutes=15)).time()
         return slots
 
+    def full_mask(self):
+        return (1 << len(self.generate_slot())) - 1
+
+    def slot_bit(self, time):
+        if not self.startTime <= time < self.endTime:
+            return 0
+        minutes = (time.hour * 60 + time.minute) - (
+            self.startTime.hour * 60 + self.startTime.minute
+        )
+        if minutes % 15 or time.second:
+            return 0
+        return 1 << (minutes // 15)
+
+    def mask_to_slots(self, mask):
+        return [slot for i, slot in enumerate(self.generate_slot()) if mask >> i & 1]
+
+    def free_slots(self, mask):
+        return self.mask_to_slots(self.full_mask() & ~mask)
+
+    def first_free_slot(self, mask):
+        free = self.full_mask() & ~mask
+        if not free:
+            return None
+        return self.generate_slot()[(free & -free).bit_length() - 1]
+
     class Meta:
         abstract = True
 
@@ -185,8 +211,226 @@ class Booking(models.Model):
     def __str__(self):
         return f"Booking for {self.patient} by {self.booked_by} on {self.booked_day}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember where the booking sat in the slot index when it was loaded
+        instance._loaded_slot_key = (
+            instance.__dict__.get("doctor_id"),
+            instance.__dict__.get("booked_day"),
+        )
+        # and which slot it took, to tell live clients only about real changes
+        instance._loaded_slot = (
+            *instance._loaded_slot_key,
+            instance.__dict__.get("time_slot"),
+            instance.__dict__.get("booking_status"),
+        )
+        return instance
+
+    class Meta:
+        constraints = [
+            # only live bookings are unique; a patient may cancel any number
+            models.UniqueConstraint(
+                fields=["booked_day", "patient", "doctor"],
+                condition=models.Q(booking_status="Booked"),
+                name="unique_booked_patient_day",
+            ),
+            models.UniqueConstraint(
+                fields=["doctor", "booked_day", "time_slot"],
+                condition=models.Q(booking_status="Booked"),
+                name="unique_booked_time_slot",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["-date_of_booking", "-id"], name="booking_booked_on_idx"
+            ),
+            models.Index(
+                fields=["doctor", "booking_status", "-booked_day", "-id"],
+                name="booking_doctor_day_idx",
+            ),
+            models.Index(
+                fields=["booked_by", "booked_day"], name="booking_user_day_idx"
+            ),
+        ]
+
+
+class DailyBookedSlots(models.Model):
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        to_field="doc_id",
+        related_name="booked_slots",
+    )
+    booked_day = models.DateField(null=False, blank=False)
+    morning_mask = models.PositiveIntegerField(default=0)
+    evening_mask = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def refresh(cls, doctor_id, booked_day):
+        if not doctor_id or not booked_day:
+            return
+        time_slots = Booking.objects.filter(
+            doctor_id=doctor_id, booked_day=booked_day, booking_status="Booked"
+        ).values_list("time_slot", flat=True)
+        morning, evening = MorningSlot(), EveningSlot()
+        morning_mask = evening_mask = 0
+        for time_slot in time_slots:
+            morning_mask |= morning.slot_bit(time_slot)
+            evening_mask |= evening.slot_bit(time_slot)
+        if morning_mask or evening_mask:
+            cls.objects.update_or_create(
+                doctor_id=doctor_id,
+                booked_day=booked_day,
+                defaults={"morning_mask": morning_mask, "evening_mask": evening_mask},
+            )
+        else:
+            cls.objects.filter(doctor_id=doctor_id, booked_day=booked_day).delete()
+
+    @classmethod
+    def refresh_days(cls, doctor_id, booked_days):
+        masks = {booked_day: [0, 0] for booked_day in booked_days}
+        if not doctor_id or not masks:
+            return
+        morning, evening = MorningSlot(), EveningSlot()
+        for booked_day, time_slot in Booking.objects.filter(
+            doctor_id=doctor_id, booked_day__in=masks, booking_status="Booked"
+        ).values_list("booked_day", "time_slot"):
+            masks[booked_day][0] |= morning.slot_bit(time_slot)
+            masks[booked_day][1] |= evening.slot_bit(time_slot)
+        cls.objects.filter(
+            doctor_id=doctor_id,
+            booked_day__in=[
+                day for day, day_masks in masks.items() if not any(day_masks)
+            ],
+        ).delete()
+        cls.objects.bulk_create(
+            [
+                cls(
+                    doctor_id=doctor_id,
+                    booked_day=day,
+                    morning_mask=morning_mask,
+                    evening_mask=evening_mask,
+                )
+                for day, (morning_mask, evening_mask) in masks.items()
+                if morning_mask or evening_mask
+            ],
+            update_conflicts=True,
+            unique_fields=["doctor", "booked_day"],
+            update_fields=["morning_mask", "evening_mask"],
+        )
+
+    def booked_times(self):
+        morning_slots = MorningSlot().mask_to_slots(self.morning_mask)
+        evening_slots = EveningSlot().mask_to_slots(self.evening_mask)
+        return morning_slots + evening_slots
+
+    def is_taken(self, time_slot):
+        return bool(
+            self.morning_mask & MorningSlot().slot_bit(time_slot)
+            or self.evening_mask & EveningSlot().slot_bit(time_slot)
+        )
+
+    def free_slots(self, slot):
+        if slot == "Morning":
+            return MorningSlot().free_slots(self.morning_mask)
+        return EveningSlot().free_slots(self.evening_mask)
+
+    def first_free_slot(self, slot):
+        if slot == "Morning":
+            return MorningSlot().first_free_slot(self.morning_mask)
+        return EveningSlot().first_free_slot(self.evening_mask)
+
+    def masks(self):
+        return {"morning": self.morning_mask, "evening": self.evening_mask}
+
+    class Meta:
+        unique_together = ("doctor", "booked_day")
+
+
+class BookingRollup(models.Model):
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        to_field="doc_id",
+        related_name="booking_rollups",
+    )
+    day = models.DateField(null=False, blank=False)
+    consultation_mode = models.CharField(
+        max_length=10, choices=Booking.CONSULTATION_CHOICES
+    )
+    appointments = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    refunds = models.PositiveIntegerField(default=0)
+    refund_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    @staticmethod
+    def aggregates():
+        booked = models.Q(booking_status="Booked")
+        refunded = ~booked & models.Q(payment_status__iexact="completed")
+        zero = models.Value(Decimal("0.00"))
+        return {
+            "appointments": models.Count("id", filter=booked),
+            "revenue": Coalesce(
+                models.Sum("amount", filter=booked),
+                zero,
+                output_field=models.DecimalField(),
+            ),
+            "cancellations": models.Count("id", filter=~booked),
+            "refunds": models.Count("id", filter=refunded),
+            "refund_amount": Coalesce(
+                models.Sum("amount", filter=refunded),
+                zero,
+                output_field=models.DecimalField(),
+            ),
+        }
+
+    @classmethod
+    def refresh_days(cls, doctor_id, days):
+        days = set(days)
+        if not doctor_id or not days:
+            return
+        rows = (
+            Booking.objects.filter(doctor_id=doctor_id, booked_day__in=days)
+            .values("booked_day", "consultation_mode")
+            .annotate(**cls.aggregates())
+            .order_by()
+        )
+        rollups = [
+            cls(
+                doctor_id=doctor_id,
+                day=row.pop("booked_day"),
+                consultation_mode=row.pop("consultation_mode"),
+                **row,
+            )
+            for row in rows
+        ]
+        kept = {(rollup.day, rollup.consultation_mode) for rollup in rollups}
+        stale = [
+            pk
+            for pk, day, consultation_mode in cls.objects.filter(
+                doctor_id=doctor_id, day__in=days
+            ).values_list("pk", "day", "consultation_mode")
+            if (day, consultation_mode) not in kept
+        ]
+        if stale:
+            cls.objects.filter(pk__in=stale).delete()
+        cls.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=["doctor", "day", "consultation_mode"],
+            update_fields=[
+                "appointments",
+                "revenue",
+                "cancellations",
+                "refunds",
+                "refund_amount",
+            ],
+        )
+
     class Meta:
-        unique_together = ("booked_day", "patient", "doctor", "booking_status")
+        unique_together = ("doctor", "day", "consultation_mode")
 
 
 class Report(models.Model):
@@ -0,0 +1,235 @@
+"""
+Full-text search over medical reports.
+
+Each report has one row in ``doctors_reportsearch``, kept current by signals.
+On PostgreSQL the row holds a weighted ``tsvector`` per report field plus
+their concatenation under a GIN index; the per-field vectors let a search be
+limited to some fields (e.g. only allergies) while still using the index.
+On SQLite it is an FTS5 table with one column per field, ranked with bm25.
+The table is created by migration ``0012_report_search``.
+
+Results come with highlighted snippets of the fields that matched, from
+``ts_headline`` on PostgreSQL and ``snippet()`` on SQLite, computed only for
+the returned page of reports.
+"""
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from .models import Report
+from .search import SEARCH_CONFIG, search_terms
+
+REPORT_SEARCH_TABLE = "doctors_reportsearch"
+
+# Report fields and their weight in the ranking, most significant first.
+REPORT_FIELDS = {
+    "diagnosis": ("A", 10.0),
+    "allergies": ("B", 5.0),
+    "medications": ("B", 5.0),
+    "symptoms": ("C", 2.0),
+    "family_history": ("D", 1.0),
+}
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+SNIPPET_WORDS = 16
+# Matches are delimited with these in SQL, so the text can be escaped before
+# the HTML highlight tags go in.
+MATCH_START = "\x02"
+MATCH_STOP = "\x03"
+
+
+def _text(field, alias="r"):
+    # "NA" is the models' placeholder for an empty field, not something to find.
+    return f"COALESCE(NULLIF({alias}.{field}, 'NA'), '')"
+
+
+def report_fields(fields):
+    """The report fields to search, all of them if ``fields`` is empty."""
+    if not fields:
+        return list(REPORT_FIELDS)
+    unknown = [field for field in fields if field not in REPORT_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown report fields: {', '.join(unknown)}. "
+            f"Choose from {', '.join(REPORT_FIELDS)}."
+        )
+    return list(fields)
+
+
+def index_reports(report_ids=None):
+    """(Re)index the given reports, or every report when ``report_ids`` is None."""
+    if report_ids is not None:
+        report_ids = list(report_ids)
+        if not report_ids:
+            return
+    where, params = "", []
+    if report_ids is not None:
+        where = f"WHERE r.id IN ({', '.join(['%s'] * len(report_ids))})"
+        params = report_ids
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            vectors = ", ".join(
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', {_text(field)}), '{weight}')"
+                for field, (weight, _) in REPORT_FIELDS.items()
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {REPORT_SEARCH_TABLE}
+                    (report_id, {", ".join(REPORT_FIELDS)}, document)
+                SELECT id, {", ".join(REPORT_FIELDS)},
+                    {" || ".join(REPORT_FIELDS)}
+                FROM (
+                    SELECT r.id, {vectors} FROM {Report._meta.db_table} r {where}
+                ) AS doc (id, {", ".join(REPORT_FIELDS)})
+                ON CONFLICT (report_id) DO UPDATE SET
+                    {", ".join(f"{field} = EXCLUDED.{field}" for field in REPORT_FIELDS)},
+                    document = EXCLUDED.document
+                """,
+                params,
+            )
+        elif connection.vendor == "sqlite":
+            _remove_reports(cursor, report_ids)
+            cursor.execute(
+                f"""
+                INSERT INTO {REPORT_SEARCH_TABLE} (rowid, {", ".join(REPORT_FIELDS)})
+                SELECT r.id, {", ".join(_text(field) for field in REPORT_FIELDS)}
+                FROM {Report._meta.db_table} r {where}
+                """,
+                params,
+            )
+
+
+def remove_reports(report_ids):
+    """Drop the given reports from the SQLite index."""
+    if connection.vendor == "sqlite":
+        # Postgres rows go with the report through the foreign key.
+        with connection.cursor() as cursor:
+            _remove_reports(cursor, list(report_ids))
+
+
+def _remove_reports(cursor, report_ids):
+    if report_ids is None:
+        cursor.execute(f"DELETE FROM {REPORT_SEARCH_TABLE}")
+        return
+    placeholders = ", ".join(["%s"] * len(report_ids))
+    cursor.execute(
+        f"DELETE FROM {REPORT_SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+        report_ids,
+    )
+
+
+def search_reports(query, reports, limit, fields=None):
+    """
+    ``(pk, highlights)`` of the reports in ``reports`` (a queryset) matching
+    ``query`` in ``fields``, best match first, at most ``limit`` of them.
+    ``highlights`` maps each matching field to an HTML-escaped snippet with
+    the matched terms between ``HIGHLIGHT_START`` and ``HIGHLIGHT_STOP``.
+    """
+    terms = search_terms(query)
+    fields = report_fields(fields)
+    if not terms:
+        return []
+    candidates, params = reports.values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            _search_postgres(cursor, terms, fields, candidates, params, limit)
+        elif connection.vendor == "sqlite":
+            _search_sqlite(cursor, terms, fields, candidates, params, limit)
+        else:
+            return _search_fallback(terms, reports, limit, fields)
+        rows = cursor.fetchall()
+    return [
+        (
+            row[0],
+            {
+                field: _highlight(snippet)
+                for field, snippet in zip(fields, row[1:])
+                if snippet and MATCH_START in snippet
+            },
+        )
+        for row in rows
+    ]
+
+
+def _highlight(snippet):
+    """``snippet`` as HTML, escaped, with its matches in highlight tags."""
+    return (
+        escape(snippet)
+        .replace(MATCH_START, HIGHLIGHT_START)
+        .replace(MATCH_STOP, HIGHLIGHT_STOP)
+    )
+
+
+def _search_postgres(cursor, terms, fields, candidates, params, limit):
+    vector = " || ".join(f"s.{field}" for field in fields)
+    restrict = ""
+    if len(fields) < len(REPORT_FIELDS):
+        restrict = f"AND ({vector}) @@ query"
+    options = (
+        f'StartSel="{MATCH_START}", StopSel="{MATCH_STOP}", '
+        f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=2"
+    )
+    headlines = ", ".join(
+        f"ts_headline('{SEARCH_CONFIG}', {_text(field)}, ranked.query, %s)"
+        for field in fields
+    )
+    # Headlines are the expensive part, so they are only built for the page.
+    cursor.execute(
+        f"""
+        SELECT r.id, {headlines}
+        FROM (
+            SELECT s.report_id, query, ts_rank_cd({vector}, query) AS rank
+            FROM {REPORT_SEARCH_TABLE} s, to_tsquery('{SEARCH_CONFIG}', %s) AS query
+            WHERE s.document @@ query {restrict}
+              AND s.report_id IN ({candidates})
+            ORDER BY rank DESC, s.report_id
+            LIMIT %s
+        ) AS ranked
+        JOIN {Report._meta.db_table} r ON r.id = ranked.report_id
+        ORDER BY ranked.rank DESC, r.id
+        """,
+        [
+            *[options] * len(fields),
+            " & ".join(f"{term}:*" for term in terms),
+            *params,
+            limit,
+        ],
+    )
+
+
+def _search_sqlite(cursor, terms, fields, candidates, params, limit):
+    match = " ".join(f'"{term}"*' for term in terms)
+    if len(fields) < len(REPORT_FIELDS):
+        match = f"{{{' '.join(fields)}}} : ({match})"
+    columns = list(REPORT_FIELDS)
+    snippets = ", ".join(
+        f"snippet({REPORT_SEARCH_TABLE}, {columns.index(field)}, "
+        f"'{MATCH_START}', '{MATCH_STOP}', '...', {SNIPPET_WORDS})"
+        for field in fields
+    )
+    weights = ", ".join(str(weight) for _, weight in REPORT_FIELDS.values())
+    # "+rowid" keeps FTS5 from re-running the MATCH once per candidate.
+    cursor.execute(
+        f"""
+        SELECT rowid, {snippets} FROM {REPORT_SEARCH_TABLE}
+        WHERE {REPORT_SEARCH_TABLE} MATCH %s AND +rowid IN ({candidates})
+        ORDER BY bm25({REPORT_SEARCH_TABLE}, {weights}), rowid
+        LIMIT %s
+        """,
+        [match, *params, limit],
+    )
+
+
+def _search_fallback(terms, reports, limit, fields):
+    for term in terms:
+        match = Q()
+        for field in fields:
+            match |= Q(**{f"{field}__icontains": term})
+        reports = reports.filter(match)
+    return [
+        (pk, {})
+        for pk in reports.order_by("-report_date", "-pk").values_list("pk", flat=True)[
+            :limit
+        ]
+    ]
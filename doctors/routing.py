@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import SlotConsumer
+
+websocket_urlpatterns = [
+    path("ws/doctors/<str:doc_id>/slots/", SlotConsumer.as_asgi()),
+]
@@ -0,0 +1,157 @@
+"""
+Full-text doctor search.
+
+Each doctor has one row in ``doctors_doctorsearch``, built from the doctor's
+name and description and their department's name and description, and kept
+current by signals. On PostgreSQL the row holds a weighted ``tsvector`` with
+a GIN index plus the name under a trigram index, so misspelt names still
+match. On SQLite it is an FTS5 table ranked with bm25, so search behaves the
+same locally. Other databases fall back to ``icontains`` filters. The table
+and its indexes are created by migration ``0011_doctor_search``.
+
+Every query term matches as a prefix, for typeahead. A search is one indexed
+query for the ranked ids, with the caller's filters applied inside it.
+"""
+
+import re
+from django.db import connection
+from django.db.models import Q
+from adminapp.models import Department
+from .models import Doctor
+
+SEARCH_TABLE = "doctors_doctorsearch"
+SEARCH_CONFIG = "english"
+MAX_TERMS = 8
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _doctor_documents(doctor_ids):
+    """SELECT of (pk, name, dept_name, description, dept_description) rows."""
+    sql = f"""
+        SELECT d.{Doctor._meta.pk.column}, d.name, dep.dept_name,
+               COALESCE(d.description, ''), COALESCE(dep.dept_description, '')
+        FROM {Doctor._meta.db_table} d
+        JOIN {Department._meta.db_table} dep ON dep.dept_id = d.department_id
+    """
+    if doctor_ids is None:
+        return sql, []
+    placeholders = ", ".join(["%s"] * len(doctor_ids))
+    return f"{sql} WHERE d.{Doctor._meta.pk.column} IN ({placeholders})", list(
+        doctor_ids
+    )
+
+
+def index_doctors(doctor_ids=None):
+    """(Re)index the given doctors, or every doctor when ``doctor_ids`` is None."""
+    if doctor_ids is not None:
+        doctor_ids = list(doctor_ids)
+        if not doctor_ids:
+            return
+    documents, params = _doctor_documents(doctor_ids)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"""
+                INSERT INTO {SEARCH_TABLE} (doctor_id, name, document)
+                SELECT id, name,
+                    setweight(to_tsvector('simple', name), 'A')
+                    || setweight(to_tsvector('{SEARCH_CONFIG}', dept_name), 'B')
+                    || setweight(to_tsvector('{SEARCH_CONFIG}', description), 'C')
+                    || setweight(to_tsvector('{SEARCH_CONFIG}', dept_description), 'D')
+                FROM ({documents}) AS doc (id, name, dept_name, description, dept_description)
+                ON CONFLICT (doctor_id) DO UPDATE
+                    SET name = EXCLUDED.name, document = EXCLUDED.document
+                """,
+                params,
+            )
+        elif connection.vendor == "sqlite":
+            _remove_doctors(cursor, doctor_ids)
+            cursor.execute(
+                f"""
+                INSERT INTO {SEARCH_TABLE}
+                    (rowid, name, dept_name, description, dept_description)
+                {documents}
+                """,
+                params,
+            )
+
+
+def remove_doctors(doctor_ids):
+    """Drop the given doctors from the SQLite index."""
+    if connection.vendor == "sqlite":
+        # Postgres rows go with the doctor through the foreign key.
+        with connection.cursor() as cursor:
+            _remove_doctors(cursor, list(doctor_ids))
+
+
+def _remove_doctors(cursor, doctor_ids):
+    if doctor_ids is None:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        return
+    placeholders = ", ".join(["%s"] * len(doctor_ids))
+    cursor.execute(
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", doctor_ids
+    )
+
+
+def search_doctors(query, doctors, limit):
+    """
+    Primary keys of the doctors in ``doctors`` (a queryset) matching
+    ``query``, best match first, at most ``limit`` of them.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    candidates, params = doctors.values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"""
+                SELECT s.doctor_id
+                FROM {SEARCH_TABLE} s,
+                     to_tsquery('{SEARCH_CONFIG}', %s) AS query,
+                     to_tsquery('simple', %s) AS name_query
+                WHERE (s.document @@ query OR s.document @@ name_query
+                       OR s.name %% %s)
+                  AND s.doctor_id IN ({candidates})
+                ORDER BY ts_rank_cd(s.document, query || name_query)
+                         + similarity(s.name, %s) DESC, s.doctor_id
+                LIMIT %s
+                """,
+                [
+                    " & ".join(f"{term}:*" for term in terms),
+                    " & ".join(f"{term}:*" for term in terms),
+                    query,
+                    *params,
+                    query,
+                    limit,
+                ],
+            )
+        elif connection.vendor == "sqlite":
+            # "+rowid" keeps FTS5 from re-running the MATCH once per candidate.
+            cursor.execute(
+                f"""
+                SELECT rowid FROM {SEARCH_TABLE}
+                WHERE {SEARCH_TABLE} MATCH %s AND +rowid IN ({candidates})
+                ORDER BY bm25({SEARCH_TABLE}, 10.0, 5.0, 2.0, 1.0), rowid
+                LIMIT %s
+                """,
+                [" ".join(f'"{term}"*' for term in terms), *params, limit],
+            )
+        else:
+            return _search_fallback(terms, doctors, limit)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_fallback(terms, doctors, limit):
+    for term in terms:
+        doctors = doctors.filter(
+            Q(name__icontains=term)
+            | Q(description__icontains=term)
+            | Q(department__dept_name__icontains=term)
+            | Q(department__dept_description__icontains=term)
+        )
+    return list(doctors.order_by("name").values_list("pk", flat=True)[:limit])
@@ -16,6 +16,8 @@ from rest_framework_simplejwt.tokens import RefreshToken
 import jwt
 from datetime import datetime, timedelta
 from django.conf import settings
+from heydoc.serializers import SparseFieldsMixin
+from heydoc.values import ValuesSerializer
 
 
 class DoctorRequestSerializer(serializers.ModelSerializer):
@@ -80,13 +82,13 @@ class AvailabilitySerializer(serializers.ModelSerializer):
         fields = ["slot", "day_of_week", "isAvailable", "online_consultation"]
 
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Patient
         fields = "__all__"
 
 
-class BookingSerialzier(serializers.ModelSerializer):
+class BookingSerialzier(SparseFieldsMixin, serializers.ModelSerializer):
     patient = PatientSerializer()
 
     class Meta:
@@ -94,6 +96,10 @@ class BookingSerialzier(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class BookingValuesSerializer(ValuesSerializer):
+    serializer_class = BookingSerialzier
+
+
 class DoctorSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -0,0 +1,216 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from adminapp.models import BlogAdditionalImage, Blogs, Department
+from users.models import CustomUser
+from .models import (
+    Booking,
+    BookingRollup,
+    DailyBookedSlots,
+    Availability,
+    Doctor,
+    LeaveApplication,
+    Notification,
+    Patient,
+    Report,
+)
+from .report_search import REPORT_FIELDS, index_reports, remove_reports
+from .search import index_doctors, remove_doctors
+from .snapshots import BLOG_SCOPE, DIRECTORY_SCOPE, GLOBAL_SCOPE, invalidate_snapshots
+from .utils import push_slot_event
+from .versions import bump_schedule_version
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    DailyBookedSlots.refresh(instance.doctor_id, instance.booked_day)
+    BookingRollup.refresh_days(instance.doctor_id, [instance.booked_day])
+    loaded_key = getattr(instance, "_loaded_slot_key", None)
+    if loaded_key and loaded_key != (instance.doctor_id, instance.booked_day):
+        DailyBookedSlots.refresh(*loaded_key)
+        BookingRollup.refresh_days(loaded_key[0], [loaded_key[1]])
+        invalidate_snapshots(loaded_key[0])
+    invalidate_snapshots(GLOBAL_SCOPE, instance.doctor_id)
+    bump_schedule_version(instance.doctor_id)
+    _push_slot_changes(instance, created)
+    instance._loaded_slot_key = (instance.doctor_id, instance.booked_day)
+    instance._loaded_slot = (
+        *instance._loaded_slot_key,
+        instance.time_slot,
+        instance.booking_status,
+    )
+
+
+def _push_slot_changes(instance, created):
+    """
+    Tell live clients about the slot a saved booking took or gave back,
+    comparing with the slot it held when loaded. Saves that leave the slot
+    and status alone (payment updates and the like) send nothing.
+    """
+    slot = (instance.doctor_id, instance.booked_day, instance.time_slot)
+    taken = slot if instance.booking_status == "Booked" else None
+    loaded = getattr(instance, "_loaded_slot", None)
+    if created:
+        held = None
+    elif loaded is not None:
+        held = loaded[:3] if loaded[3] == "Booked" else None
+    else:
+        # saved without being loaded: assume the status changed
+        held = None if taken else slot
+    if held == taken:
+        return
+    if held:
+        push_slot_event(
+            held[0], "slot_freed", date=str(held[1]), time_slot=str(held[2])
+        )
+    if taken:
+        push_slot_event(
+            taken[0], "slot_taken", date=str(taken[1]), time_slot=str(taken[2])
+        )
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    DailyBookedSlots.refresh(instance.doctor_id, instance.booked_day)
+    BookingRollup.refresh_days(instance.doctor_id, [instance.booked_day])
+    invalidate_snapshots(GLOBAL_SCOPE, instance.doctor_id)
+    bump_schedule_version(instance.doctor_id)
+    if instance.booking_status == "Booked":
+        push_slot_event(
+            instance.doctor_id,
+            "slot_freed",
+            date=str(instance.booked_day),
+            time_slot=str(instance.time_slot),
+        )
+
+
+@receiver(post_save, sender=Availability)
+def availability_saved(sender, instance, **kwargs):
+    bump_schedule_version(instance.doctor_id)
+    push_slot_event(
+        instance.doctor_id,
+        "availability_changed",
+        day_of_week=instance.day_of_week,
+        slot=instance.slot,
+        isAvailable=instance.isAvailable,
+        online_consultation=instance.online_consultation,
+    )
+
+
+@receiver(post_delete, sender=Availability)
+def availability_deleted(sender, instance, **kwargs):
+    bump_schedule_version(instance.doctor_id)
+    push_slot_event(
+        instance.doctor_id,
+        "availability_changed",
+        day_of_week=instance.day_of_week,
+        slot=instance.slot,
+        isAvailable=False,
+        online_consultation=False,
+    )
+
+
+@receiver(post_save, sender=LeaveApplication)
+@receiver(post_delete, sender=LeaveApplication)
+def leave_changed(sender, instance, **kwargs):
+    # leave points at the doctor's primary key, schedules use doc_id
+    for doc_id in Doctor.objects.filter(pk=instance.doctor_id).values_list(
+        "doc_id", flat=True
+    ):
+        bump_schedule_version(doc_id)
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance, **kwargs):
+    invalidate_snapshots(
+        GLOBAL_SCOPE, *instance.doctor.values_list("doc_id", flat=True)
+    )
+
+
+@receiver(pre_delete, sender=Patient)
+def patient_deleting(sender, instance, **kwargs):
+    instance._dashboard_doctors = list(instance.doctor.values_list("doc_id", flat=True))
+
+
+@receiver(post_delete, sender=Patient)
+def patient_deleted(sender, instance, **kwargs):
+    invalidate_snapshots(GLOBAL_SCOPE, *getattr(instance, "_dashboard_doctors", []))
+
+
+@receiver(m2m_changed, sender=Patient.doctor.through)
+def patient_doctors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        invalidate_snapshots(instance.doc_id)
+    elif pk_set is not None:
+        invalidate_snapshots(
+            *Doctor.objects.filter(pk__in=pk_set).values_list("doc_id", flat=True)
+        )
+    else:
+        invalidate_snapshots(*instance.doctor.values_list("doc_id", flat=True))
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def doctor_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_snapshots(GLOBAL_SCOPE, DIRECTORY_SCOPE, instance.doc_id)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def department_changed(sender, instance, **kwargs):
+    invalidate_snapshots(DIRECTORY_SCOPE)
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_search_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {"name", "description", "department"} & set(update_fields):
+        return
+    index_doctors([instance.pk])
+
+
+@receiver(post_delete, sender=Doctor)
+def doctor_search_deleted(sender, instance, **kwargs):
+    remove_doctors([instance.pk])
+
+
+@receiver(post_save, sender=Department)
+def department_search_saved(sender, instance, created, **kwargs):
+    if not created:
+        index_doctors(instance.doctors.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Report)
+def report_search_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(REPORT_FIELDS) & set(update_fields):
+        return
+    index_reports([instance.pk])
+
+
+@receiver(post_delete, sender=Report)
+def report_search_deleted(sender, instance, **kwargs):
+    remove_reports([instance.pk])
+
+
+@receiver(post_save, sender=Blogs)
+@receiver(post_delete, sender=Blogs)
+@receiver(post_save, sender=BlogAdditionalImage)
+@receiver(post_delete, sender=BlogAdditionalImage)
+def blog_changed(sender, instance, **kwargs):
+    invalidate_snapshots(BLOG_SCOPE)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    invalidate_snapshots(GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_snapshots(GLOBAL_SCOPE)
@@ -0,0 +1,109 @@
+"""
+Cached dashboard and directory payloads.
+
+A snapshot is stored under its scope's current generation ("global" for the
+admin dashboard, the doc_id for a doctor's, "directory" for the public
+department directory, "blogs" for the blog feed and articles), an optional
+variant within the scope (e.g. the feed page) and today's date. Invalidating
+a scope bumps its generation once the transaction commits, so a snapshot
+being computed while the data changes is written under the old generation
+and never served again. Only one request recomputes a missing snapshot; the
+others get the previous one while it is rebuilt, or wait for it briefly.
+"""
+
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+GLOBAL_SCOPE = "global"
+DIRECTORY_SCOPE = "directory"
+BLOG_SCOPE = "blogs"
+
+
+def _generation_key(scope):
+    return f"dashboard_generation:{scope}"
+
+
+def _snapshot_key(scope, generation, variant):
+    return f"dashboard:{scope}:{variant}:{generation}:{timezone.localdate()}"
+
+
+def _latest_key(scope, variant):
+    return f"dashboard_latest:{scope}:{variant}"
+
+
+def _lock_key(scope, generation, variant):
+    return f"dashboard_lock:{scope}:{variant}:{generation}"
+
+
+def snapshot_generation(scope):
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def cached_snapshot(scope, compute, variant=""):
+    """
+    Return the snapshot of ``scope`` (and ``variant``), calling ``compute()``
+    to rebuild it when it is missing. ``compute`` must return picklable data.
+    """
+    generation = snapshot_generation(scope)
+    key = _snapshot_key(scope, generation, variant)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    lock = _lock_key(scope, generation, variant)
+    if not cache.add(lock, True, settings.DASHBOARD_REBUILD_TIMEOUT):
+        latest = cache.get(_latest_key(scope, variant))
+        if latest is not None:
+            return latest
+        deadline = time.monotonic() + settings.DASHBOARD_REBUILD_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            snapshot = cache.get(key)
+            if snapshot is not None:
+                return snapshot
+        return compute()
+
+    try:
+        snapshot = compute()
+        cache.set_many(
+            {key: snapshot, _latest_key(scope, variant): snapshot},
+            settings.DASHBOARD_CACHE_TTL,
+        )
+    finally:
+        cache.delete(lock)
+    return snapshot
+
+
+def invalidate_snapshots(*scopes):
+    """Drop the snapshots of ``scopes`` once the current transaction commits."""
+    scopes = [scope for scope in scopes if scope]
+
+    def bump():
+        for scope in scopes:
+            try:
+                cache.incr(_generation_key(scope))
+            except ValueError:
+                cache.set(_generation_key(scope), time.time_ns(), None)
+
+    # robust: a cache outage is logged rather than failing the committed write
+    transaction.on_commit(bump, robust=True)
+
+
+def snapshot_etag(scope):
+    """
+    An ``etag`` function for responses built from ``scope``'s snapshots: the
+    scope's generation, so revalidating needs no database access.
+    """
+
+    def tag(request, *args, **kwargs):
+        return f"{scope}:{snapshot_generation(scope)}"
+
+    return tag
@@ -1,5 +1,5 @@
 from celery.utils.log import get_task_logger
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
 from time import sleep
 from django.core.mail import send_mail
 from celery import shared_task
@@ -14,6 +14,46 @@ def send_mail_task(subject, message, email_from, recipient_list):
     send_mail(subject, message, email_from, recipient_list, fail_silently=False)
 
 
+@shared_task(name="send_mass_mail_task")
+def send_mass_mail_task(messages, email_from=None, chunk_size=None):
+    """
+    Send many ``(recipient, subject, body)`` messages, reusing one SMTP
+    connection for every ``chunk_size`` messages. Messages are handed to the
+    connection one at a time so each result is known: a failed message is
+    reported for its recipient and never resent, and the connection, which
+    may be broken, is replaced before the next message.
+    """
+    chunk_size = chunk_size or settings.MASS_MAIL_CHUNK_SIZE
+    emails = [
+        EmailMessage(subject, body, email_from, [recipient])
+        for recipient, subject, body in messages
+    ]
+    sent = 0
+    failed = []
+    for start in range(0, len(emails), chunk_size):
+        connection = get_connection(fail_silently=False)
+        try:
+            for email in emails[start : start + chunk_size]:
+                try:
+                    connection.open()
+                    sent += connection.send_messages([email]) or 0
+                except Exception as e:
+                    failed.append({"recipient": email.to[0], "error": str(e)})
+                    _close_connection(connection)
+        finally:
+            _close_connection(connection)
+    if failed:
+        logger.warning("%s of %s emails failed", len(failed), len(emails))
+    return {"sent": sent, "failed": failed}
+
+
+def _close_connection(connection):
+    try:
+        connection.close()
+    except Exception:
+        logger.exception("Closing the mail connection failed")
+
+
 @shared_task(name="send_sms_task")
 def send_sms_task(to, body):
     client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
@@ -1,3 +1,1209 @@
-from django.test import TestCase
+import os
+import random
+import sys
+import threading
+import time as clock
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+from urllib.parse import parse_qs, urlparse
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from unittest import mock, skipUnless
+from adminapp.models import CancelBooking, Department
+from heydoc.asgi import application
+from heydoc.pagination import KeysetPagination
+from heydoc.renderers import FastJSONRenderer
+from heydoc.serializers import SparseFieldset
+from users.models import CustomUser
+from .booking import SlotUnavailable, cancel_bookings, create_booking
+from .holds import held_slots, hold_registry, hold_slot, release_hold
+from .models import (
+    Availability,
+    Booking,
+    BookingRollup,
+    DailyBookedSlots,
+    Doctor,
+    MorningSlot,
+    Notification,
+    Patient,
+    Report,
+)
+from .serializer import BookingSerialzier, BookingValuesSerializer
+from .snapshots import GLOBAL_SCOPE, cached_snapshot, invalidate_snapshots
+from .tasks import send_mass_mail_task
 
-# Create your tests here.
+WORKING_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+# Benchmarks that seed large tables run only with BENCHMARKS=1 set.
+benchmark = skipUnless(os.getenv("BENCHMARKS"), "set BENCHMARKS=1 to run benchmarks")
+
+
+def report_benchmark(name, value, unit):
+    """Print a benchmark figure in the test output."""
+    sys.stderr.write(f"\n{name}: {value:,.2f} {unit} ")
+
+
+def best_time(function, runs=5):
+    """The fastest of ``runs`` calls of ``function``, in seconds."""
+    timings = []
+    for _ in range(runs):
+        started = clock.perf_counter()
+        function()
+        timings.append(clock.perf_counter() - started)
+    return min(timings)
+
+
+class ClinicData:
+    """
+    A department with a doctor and a patient, and helpers to add more.
+
+    Mixed into the TestCases of every app; the cache holds schedule versions
+    and snapshots, so it is cleared before each test.
+    """
+
+    @classmethod
+    def create_clinic(cls):
+        cls.today = timezone.now().date()
+        cls.department = cls.create_department("Cardiology")
+        cls.user = CustomUser.objects.create(
+            username="patient", email="patient@example.com", phone="100"
+        )
+        cls.patient = Patient.objects.create(user=cls.user, name="Pat", age=30)
+        cls.doctor = cls.create_doctor("Alice Heart")
+
+    @classmethod
+    def create_department(cls, name):
+        return Department.objects.create(dept_name=name, dept_description=name)
+
+    @classmethod
+    def create_doctor(cls, name, department=None, slot="Morning", **kwargs):
+        """An activated doctor available in ``slot`` from Monday to Saturday."""
+        number = Doctor.objects.count() + 1
+        kwargs.setdefault("account_activated", True)
+        kwargs.setdefault("fee", Decimal("200.00"))
+        # random doc_ids collide now and then across hundreds of doctors
+        kwargs.setdefault("doc_id", f"doc{number:05}")
+        doctor = Doctor.objects.create(
+            username=f"doctor{number}",
+            email=f"doctor{number}@example.com",
+            doc_email=f"doctor{number}@example.com",
+            phone=f"2{number:04}",
+            name=name,
+            department=department or cls.department,
+            **kwargs,
+        )
+        Availability.objects.bulk_create(
+            Availability(
+                doctor=doctor,
+                day_of_week=day,
+                slot=slot,
+                isAvailable=day in WORKING_DAYS,
+            )
+            for day in WORKING_DAYS + ["Sunday"]
+        )
+        return doctor
+
+    @classmethod
+    def create_patient(cls, name, user=None):
+        return Patient.objects.create(user=user or cls.user, name=name, age=40)
+
+    @staticmethod
+    def book(doctor, patient, booked_day, time_slot, **kwargs):
+        kwargs.setdefault("amount", Decimal("200.00"))
+        kwargs.setdefault("payment_mode", "Razor Pay")
+        return Booking.objects.create(
+            doctor=doctor,
+            patient=patient,
+            booked_by=patient.user,
+            booked_day=booked_day,
+            time_slot=time_slot,
+            slot="Morning" if time_slot.hour < 13 else "Evening",
+            **kwargs,
+        )
+
+    @classmethod
+    def seed_bookings(cls, doctor, count):
+        """Bulk-create ``count`` morning bookings, filling one day after another."""
+        slots = MorningSlot().generate_slot()
+        patients = [cls.create_patient(f"Patient {n}") for n in range(len(slots))]
+        Booking.objects.bulk_create(
+            (
+                Booking(
+                    doctor=doctor,
+                    patient=patients[n % len(slots)],
+                    booked_by=cls.user,
+                    booked_day=cls.today + timedelta(days=n // len(slots)),
+                    time_slot=slots[n % len(slots)],
+                    slot="Morning",
+                    amount=Decimal("200.00"),
+                    payment_mode="Razor Pay",
+                )
+                for n in range(count)
+            ),
+            batch_size=5000,
+        )
+
+    def next_working_day(self, after=0):
+        day = self.today + timedelta(days=after + 1)
+        while day.strftime("%A") not in WORKING_DAYS:
+            day += timedelta(days=1)
+        return day
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class SlotHoldTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_holds_on_one_doctor_are_all_registered(self):
+        day = date.today() + timedelta(days=1)
+        slots = MorningSlot().generate_slot()
+        barrier = threading.Barrier(len(slots))
+
+        def hold(time_slot):
+            barrier.wait()
+            hold_slot("doc1", day, time_slot, f"user-{time_slot}")
+
+        threads = [threading.Thread(target=hold, args=(slot,)) for slot in slots]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(held_slots(["doc1"]), {"doc1": {day: set(slots)}})
+
+    def test_released_and_expired_holds_are_not_listed(self):
+        day = date.today() + timedelta(days=1)
+        self.assertTrue(hold_slot("doc1", day, time(9, 0), "user1"))
+        self.assertFalse(hold_slot("doc1", day, time(9, 0), "user2"))
+        self.assertTrue(hold_slot("doc1", day, time(9, 15), "user2"))
+        self.assertTrue(hold_slot("doc1", day, time(9, 30), "user2", ttl=1))
+        release_hold("doc1", day, time(9, 15), "user2")
+
+        self.assertEqual(
+            held_slots(["doc1", "doc2"]), {"doc1": {day: {time(9, 0), time(9, 30)}}}
+        )
+        self.assertEqual(
+            held_slots(["doc1"], exclude_holder="user1"), {"doc1": {day: {time(9, 30)}}}
+        )
+        with mock.patch("doctors.holds.clock.time", return_value=clock.time() + 2):
+            self.assertEqual(
+                list(hold_registry(["doc1"])["doc1"]), [(day.isoformat(), "09:00:00")]
+            )
+
+
+class CreateBookingConcurrencyTests(ClinicData, TransactionTestCase):
+    clients = 50
+    # SQLite refuses concurrent writers; a client retries this many times
+    attempts = 200
+
+    def setUp(self):
+        super().setUp()
+        self.create_clinic()
+
+    def booking(self, patient, day, time_slot):
+        return {
+            "doctor": self.doctor,
+            "patient": patient,
+            "booked_by": patient.user,
+            "booked_day": day,
+            "time_slot": time_slot,
+            "slot": "Morning",
+            "amount": Decimal("200.00"),
+            "payment_mode": "Razor Pay",
+        }
+
+    def race(self, jobs):
+        """
+        Run each client's bookings in its own thread, all starting together.
+        Returns every booking or SlotUnavailable, and the seconds taken.
+        """
+        barrier = threading.Barrier(len(jobs) + 1)
+        results = []
+
+        def client(bookings):
+            barrier.wait()
+            try:
+                for data in bookings:
+                    for _ in range(self.attempts):
+                        try:
+                            results.append(create_booking(data))
+                            break
+                        except SlotUnavailable as e:
+                            results.append(e)
+                            break
+                        except OperationalError as e:
+                            error = e
+                            clock.sleep(random.uniform(0, 0.02))
+                    else:
+                        results.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(job,)) for job in jobs]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = clock.perf_counter()
+        for thread in threads:
+            thread.join()
+        return results, clock.perf_counter() - started
+
+    def test_one_of_many_concurrent_bookings_of_a_slot_wins(self):
+        day = self.next_working_day()
+        patients = [self.create_patient(f"Patient {n}") for n in range(self.clients)]
+
+        results, elapsed = self.race(
+            [[self.booking(patient, day, time(9, 0))] for patient in patients]
+        )
+        report_benchmark(
+            f"{self.clients} clients racing for one slot",
+            len(results) / elapsed,
+            "attempts/s",
+        )
+
+        winners = [result for result in results if isinstance(result, Booking)]
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(
+            [type(result) for result in results if result not in winners],
+            [SlotUnavailable] * (self.clients - 1),
+        )
+        self.assertEqual(
+            list(
+                Booking.objects.filter(booking_status="Booked").values_list(
+                    "id", flat=True
+                )
+            ),
+            [winners[0].id],
+        )
+        self.assertTrue(
+            DailyBookedSlots.objects.get(doctor=self.doctor, booked_day=day).is_taken(
+                time(9, 0)
+            )
+        )
+
+    @skipUnless(
+        connection.vendor == "postgresql",
+        "SQLite serialises writers, so concurrent throughput means nothing there",
+    )
+    def test_booking_throughput_on_one_doctor(self):
+        slots = MorningSlot().generate_slot()
+        per_client = 4
+        patients = [self.create_patient(f"Patient {n}") for n in range(self.clients)]
+        # booking n takes the n-th free slot, so every one of them can succeed
+        jobs = [
+            [
+                self.booking(
+                    patient,
+                    self.today + timedelta(days=1 + n // len(slots)),
+                    slots[n % len(slots)],
+                )
+                for n in range(number, self.clients * per_client, self.clients)
+            ]
+            for number, patient in enumerate(patients)
+        ]
+
+        results, elapsed = self.race(jobs)
+
+        per_second = len(results) / elapsed
+        report_benchmark(
+            f"{self.clients} clients booking one doctor", per_second, "bookings/s"
+        )
+        self.assertEqual(
+            [type(result) for result in results],
+            [Booking] * (self.clients * per_client),
+        )
+        booked = Booking.objects.filter(booking_status="Booked")
+        self.assertEqual(booked.count(), self.clients * per_client)
+        self.assertEqual(
+            sum(
+                bin(day.morning_mask).count("1")
+                for day in DailyBookedSlots.objects.filter(doctor=self.doctor)
+            ),
+            self.clients * per_client,
+        )
+        self.assertGreater(per_second, 20)
+
+
+class SlotEventTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+
+    def events(self, save):
+        with mock.patch("doctors.signals.push_slot_event") as push:
+            save()
+        return [
+            (call.args[1], call.kwargs["date"], call.kwargs["time_slot"])
+            for call in push.call_args_list
+        ]
+
+    def test_events_follow_slot_and_status_changes_only(self):
+        day = self.next_working_day()
+        booking = None
+
+        def create():
+            nonlocal booking
+            booking = self.book(self.doctor, self.patient, day, time(9, 0))
+
+        self.assertEqual(self.events(create), [("slot_taken", str(day), "09:00:00")])
+
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.payment_status = "completed"
+        self.assertEqual(self.events(booking.save), [])
+
+        booking.time_slot = time(9, 15)
+        self.assertEqual(
+            self.events(booking.save),
+            [
+                ("slot_freed", str(day), "09:00:00"),
+                ("slot_taken", str(day), "09:15:00"),
+            ],
+        )
+        self.assertEqual(self.events(booking.save), [])
+
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.booking_status = "cancelled"
+        self.assertEqual(
+            self.events(booking.save), [("slot_freed", str(day), "09:15:00")]
+        )
+
+    def test_push_and_cache_failures_do_not_fail_the_booking(self):
+        day = self.next_working_day()
+        layer_down = mock.patch(
+            "doctors.utils.async_to_sync", side_effect=ConnectionError("layer down")
+        )
+        cache_down = mock.patch.object(
+            cache, "incr", side_effect=ConnectionError("cache down")
+        )
+        with layer_down, cache_down, self.assertLogs("django", "ERROR") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                booking = create_booking(
+                    {
+                        "doctor": self.doctor,
+                        "patient": self.patient,
+                        "booked_by": self.user,
+                        "booked_day": day,
+                        "time_slot": time(9, 0),
+                        "slot": "Morning",
+                        "amount": Decimal("200.00"),
+                        "payment_mode": "Razor Pay",
+                    }
+                )
+
+        self.assertTrue(Booking.objects.filter(pk=booking.pk).exists())
+        self.assertTrue(any("layer down" in line for line in logs.output))
+        self.assertTrue(any("cache down" in line for line in logs.output))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class SlotConsumerTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+
+    def book_and_commit(self, day, time_slot):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.book(self.doctor, self.patient, day, time_slot)
+
+    def cancel_and_commit(self, booking):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.booking_status = "cancelled"
+            booking.save()
+
+    async def test_clients_of_the_doctor_receive_slot_events(self):
+        day = self.next_working_day()
+        communicator = WebsocketCommunicator(
+            application, f"/ws/doctors/{self.doctor.doc_id}/slots/"
+        )
+        other = WebsocketCommunicator(application, "/ws/doctors/doc99999/slots/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        connected, _ = await other.connect()
+        self.assertTrue(connected)
+
+        booking = await sync_to_async(self.book_and_commit)(day, time(9, 0))
+        self.assertEqual(
+            await communicator.receive_json_from(),
+            {
+                "event": "slot_taken",
+                "doc_id": self.doctor.doc_id,
+                "date": str(day),
+                "time_slot": "09:00:00",
+            },
+        )
+        await sync_to_async(self.cancel_and_commit)(booking)
+        event = await communicator.receive_json_from()
+        self.assertEqual(event["event"], "slot_freed")
+
+        self.assertTrue(await other.receive_nothing())
+        await communicator.disconnect()
+        await other.disconnect()
+
+
+class CancelBookingsTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.other_doctor = cls.create_doctor("Bob Bone")
+        cls.patients = [
+            cls.create_patient(
+                f"Patient {n}",
+                user=CustomUser.objects.create(
+                    username=f"user{n}", email=f"user{n}@example.com", phone=f"3{n:04}"
+                ),
+            )
+            for n in range(16)
+        ]
+
+    def bulk_book(self, doctor, days):
+        """One booking per morning slot and day, without the signals."""
+        slots = MorningSlot().generate_slot()
+        Booking.objects.bulk_create(
+            Booking(
+                doctor=doctor,
+                patient=patient,
+                booked_by=patient.user,
+                booked_day=self.today + timedelta(days=day),
+                time_slot=time_slot,
+                slot="Morning",
+                amount=Decimal("200.00"),
+                payment_mode="Razor Pay",
+                payment_status="completed" if day % 2 else "pending",
+            )
+            for day in days
+            for patient, time_slot in zip(self.patients, slots)
+        )
+        DailyBookedSlots.refresh_days(
+            doctor.doc_id, [self.today + timedelta(days=day) for day in days]
+        )
+
+    def test_cancels_future_bookings_of_the_doctor_only(self):
+        self.bulk_book(self.doctor, range(-2, 3))
+        self.bulk_book(self.other_doctor, range(1, 3))
+
+        emails = cancel_bookings(
+            Booking.objects.filter(doctor=self.doctor, booked_day__gt=self.today)
+        )
+
+        self.assertEqual(
+            emails, sorted(patient.user.email for patient in self.patients)
+        )
+        cancelled = Booking.objects.filter(booking_status="cancelled")
+        self.assertEqual(cancelled.count(), 32)
+        self.assertFalse(cancelled.exclude(doctor=self.doctor).exists())
+        self.assertFalse(cancelled.filter(booked_day__lte=self.today).exists())
+        self.assertEqual(
+            dict(CancelBooking.objects.values_list("refund").annotate(Count("id"))),
+            {"Refund Applicable": 16, "No Refund": 16},
+        )
+        self.assertFalse(
+            DailyBookedSlots.objects.filter(
+                doctor=self.doctor, booked_day__gt=self.today
+            )
+            .exclude(morning_mask=0)
+            .exists()
+        )
+
+    def test_cancels_a_patient_who_already_cancelled_that_day(self):
+        day = self.next_working_day()
+        patient = self.patients[0]
+        self.book(self.doctor, patient, day, time(9, 0))
+        cancel_bookings(Booking.objects.filter(doctor=self.doctor))
+        self.book(self.doctor, patient, day, time(9, 30))
+
+        emails = cancel_bookings(Booking.objects.filter(doctor=self.doctor))
+
+        self.assertEqual(emails, [patient.user.email])
+        self.assertEqual(
+            list(Booking.objects.values_list("booking_status", flat=True)),
+            ["cancelled", "cancelled"],
+        )
+        self.assertEqual(CancelBooking.objects.count(), 2)
+
+    def schedule_patch(self, day, **data):
+        return self.client.patch(
+            f"/api/doctors/schedule/{self.doctor.doc_id}/",
+            {"day": day.strftime("%A"), "online_consultation": False, **data},
+            content_type="application/json",
+        )
+
+    def test_schedule_change_cancels_bookings(self):
+        day = self.next_working_day()
+        patient = self.patients[0]
+        self.book(self.doctor, patient, day, time(9, 0), booking_status="cancelled")
+        self.book(self.doctor, patient, day, time(9, 30))
+
+        response = self.schedule_patch(day, slot="Not Available")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            Availability.objects.get(
+                doctor=self.doctor, day_of_week=day.strftime("%A")
+            ).isAvailable
+        )
+        self.assertFalse(Booking.objects.filter(booking_status="Booked").exists())
+
+    def test_failed_cancellation_keeps_the_schedule(self):
+        day = self.next_working_day()
+        self.book(self.doctor, self.patients[0], day, time(9, 0))
+
+        with mock.patch(
+            "doctors.views.cancel_bookings", side_effect=RuntimeError("broken")
+        ):
+            response = self.schedule_patch(day, slot="Not Available")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(
+            Availability.objects.get(
+                doctor=self.doctor, day_of_week=day.strftime("%A")
+            ).isAvailable
+        )
+        self.assertTrue(Booking.objects.filter(booking_status="Booked").exists())
+
+    def test_cancels_five_thousand_bookings_quickly(self):
+        self.bulk_book(self.doctor, range(1, 314))
+        bookings = Booking.objects.filter(doctor=self.doctor, booked_day__gt=self.today)
+        self.assertGreaterEqual(bookings.count(), 5000)
+
+        started = clock.perf_counter()
+        cancel_bookings(bookings)
+        elapsed = clock.perf_counter() - started
+
+        self.assertFalse(bookings.filter(booking_status="Booked").exists())
+        self.assertEqual(CancelBooking.objects.count(), 5008)
+        self.assertLess(elapsed, 1.0)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """A locmem backend that fails for ``fail_for`` and counts connections."""
+
+    fail_for = set()
+    opened = 0
+
+    def open(self):
+        if getattr(self, "is_open", False):
+            return False
+        self.is_open = True
+        type(self).opened += 1
+        return True
+
+    def close(self):
+        self.is_open = False
+
+    def send_messages(self, messages):
+        if not self.is_open:
+            raise AssertionError("sent without an open connection")
+        for message in messages:
+            if message.to[0] in self.fail_for:
+                raise SMTPRecipientsRefused({message.to[0]: (550, b"refused")})
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="doctors.tests.FlakyEmailBackend")
+class SendMassMailTaskTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.opened = 0
+        FlakyEmailBackend.fail_for = set()
+
+    def messages(self, count):
+        return [(f"user{n}@example.com", "Subject", "Body") for n in range(count)]
+
+    def test_failed_message_is_reported_and_not_resent(self):
+        FlakyEmailBackend.fail_for = {"user3@example.com"}
+
+        result = send_mass_mail_task(self.messages(10), "clinic@example.com", 5)
+
+        self.assertEqual(result["sent"], 9)
+        self.assertEqual(
+            [failure["recipient"] for failure in result["failed"]],
+            ["user3@example.com"],
+        )
+        recipients = [email.to[0] for email in mail.outbox]
+        self.assertEqual(len(recipients), len(set(recipients)))
+        self.assertEqual(len(recipients), 9)
+        # one connection per chunk and a new one after the failure
+        self.assertEqual(FlakyEmailBackend.opened, 3)
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_throughput(self):
+        count = 2000
+        started = clock.perf_counter()
+        result = send_mass_mail_task(self.messages(count), "clinic@example.com")
+        per_second = count / (clock.perf_counter() - started)
+
+        self.assertEqual(result, {"sent": count, "failed": []})
+        self.assertEqual(len(mail.outbox), count)
+        self.assertGreater(per_second, 1000)
+
+
+class BookingRollupTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.other_patient = cls.create_patient("Pam")
+
+    def assertRollupMatchesBookings(self):
+        expected = {
+            (
+                row.pop("doctor_id"),
+                row.pop("booked_day"),
+                row.pop("consultation_mode"),
+            ): row
+            for row in Booking.objects.values(
+                "doctor_id", "booked_day", "consultation_mode"
+            )
+            .annotate(**BookingRollup.aggregates())
+            .order_by()
+        }
+        rollups = {
+            (row.pop("doctor_id"), row.pop("day"), row.pop("consultation_mode")): row
+            for row in BookingRollup.objects.values(
+                "doctor_id", "day", "consultation_mode", *BookingRollup.aggregates()
+            )
+        }
+        self.assertEqual(rollups, expected)
+
+    def test_rollup_follows_bookings(self):
+        day = self.next_working_day()
+        booking = self.book(self.doctor, self.patient, day, time(9, 0))
+        self.book(
+            self.doctor,
+            self.other_patient,
+            day,
+            time(9, 15),
+            consultation_mode="Online",
+            payment_status="completed",
+        )
+        self.assertRollupMatchesBookings()
+
+        booking.payment_status = "completed"
+        booking.save()
+        self.assertRollupMatchesBookings()
+
+        booking.booking_status = "cancelled"
+        booking.save()
+        self.assertRollupMatchesBookings()
+
+        booking.booked_day = self.next_working_day(after=3)
+        booking.save()
+        self.assertRollupMatchesBookings()
+
+        cancel_bookings(Booking.objects.filter(doctor=self.doctor))
+        self.assertRollupMatchesBookings()
+
+    def test_rebuild_command(self):
+        self.book(self.doctor, self.patient, self.next_working_day(), time(9, 0))
+        self.book(
+            self.doctor, self.patient, self.today - timedelta(days=40), time(9, 0)
+        )
+        BookingRollup.objects.all().delete()
+
+        call_command("rebuild_booking_rollup", stdout=StringIO())
+
+        self.assertRollupMatchesBookings()
+
+
+class DashBoardViewTests(ClinicData, TestCase):
+    url = "/api/doctors/dashboard/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        params = {"doc_id": self.doctor.doc_id}
+        self.book(self.doctor, self.patient, self.today - timedelta(days=1), time(9, 0))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+
+        for n in range(2, 400):
+            self.book(
+                self.doctor, self.patient, self.today - timedelta(days=n), time(9, 0)
+            )
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.data["total_appointments"], 399)
+        self.assertEqual(response.data["total_earning"]["total"], Decimal("79800.00"))
+
+        # and a cached snapshot needs no query at all
+        with self.assertNumQueries(0):
+            self.client.get(self.url, params)
+
+
+class SnapshotTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.patient.doctor.add(cls.doctor)
+
+    def rebuilt(self, change, *scopes):
+        """The ``scopes`` whose cached snapshot ``change()`` drops."""
+        for scope in scopes:
+            cached_snapshot(scope, lambda: scope)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        computed = []
+        for scope in scopes:
+            cached_snapshot(scope, lambda: computed.append(scope) or scope)
+        return computed
+
+    def test_concurrent_misses_rebuild_once(self):
+        calls, results = [], []
+        barrier = threading.Barrier(8)
+
+        def compute():
+            calls.append(1)
+            clock.sleep(0.2)
+            return {"appointments": len(calls)}
+
+        def request():
+            barrier.wait()
+            results.append(cached_snapshot(GLOBAL_SCOPE, compute))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"appointments": 1}] * 8)
+
+    def test_previous_snapshot_is_served_while_rebuilding(self):
+        cached_snapshot(GLOBAL_SCOPE, lambda: "old")
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_snapshots(GLOBAL_SCOPE)
+        rebuilding, release = threading.Event(), threading.Event()
+
+        def compute():
+            rebuilding.set()
+            release.wait(5)
+            return "new"
+
+        thread = threading.Thread(target=cached_snapshot, args=(GLOBAL_SCOPE, compute))
+        thread.start()
+        rebuilding.wait(5)
+        self.assertEqual(cached_snapshot(GLOBAL_SCOPE, lambda: "again"), "old")
+        release.set()
+        thread.join()
+        self.assertEqual(cached_snapshot(GLOBAL_SCOPE, lambda: "again"), "new")
+
+    def test_bookings_drop_the_admin_and_doctor_dashboards(self):
+        scopes = (GLOBAL_SCOPE, self.doctor.doc_id)
+        booking = None
+
+        def book():
+            nonlocal booking
+            booking = self.book(self.doctor, self.patient, self.today, time(9, 0))
+
+        self.assertEqual(self.rebuilt(book, *scopes), list(scopes))
+        self.assertEqual(self.rebuilt(booking.delete, *scopes), list(scopes))
+
+    def test_patients_drop_the_admin_and_their_doctors_dashboards(self):
+        scopes = (GLOBAL_SCOPE, self.doctor.doc_id)
+        self.assertEqual(self.rebuilt(self.patient.save, *scopes), list(scopes))
+        self.assertEqual(self.rebuilt(self.patient.delete, *scopes), list(scopes))
+
+    def test_notifications_drop_the_admin_dashboard(self):
+        notification = Notification(title="Leave", message="Alice is away")
+        self.assertEqual(self.rebuilt(notification.save, GLOBAL_SCOPE), [GLOBAL_SCOPE])
+        self.assertEqual(
+            self.rebuilt(notification.delete, GLOBAL_SCOPE), [GLOBAL_SCOPE]
+        )
+
+    def test_users_drop_the_admin_dashboard_but_logins_do_not(self):
+        user = CustomUser(username="new", email="new@example.com", phone="300")
+        self.assertEqual(self.rebuilt(user.save, GLOBAL_SCOPE), [GLOBAL_SCOPE])
+
+        def log_in():
+            user.last_login = timezone.now()
+            user.save(update_fields=["last_login"])
+
+        self.assertEqual(self.rebuilt(log_in, GLOBAL_SCOPE), [])
+        self.assertEqual(self.rebuilt(user.delete, GLOBAL_SCOPE), [GLOBAL_SCOPE])
+
+    def test_rebuilding_the_rollup_drops_the_dashboards(self):
+        self.book(self.doctor, self.patient, self.today, time(9, 0))
+        scopes = (GLOBAL_SCOPE, self.doctor.doc_id)
+
+        def rebuild():
+            call_command("rebuild_booking_rollup", stdout=StringIO())
+
+        self.assertEqual(self.rebuilt(rebuild, *scopes), list(scopes))
+
+
+class AppointmentsViewTests(ClinicData, TestCase):
+    url = "/api/doctors/appointments/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        other_doctor = cls.create_doctor("Bob Bone")
+        patients = [cls.create_patient(f"Patient {n}") for n in range(5)]
+        slots = MorningSlot().generate_slot()
+        for day in range(5):
+            booked_day = cls.today + timedelta(days=day)
+            for patient, time_slot in zip(patients, slots):
+                cls.book(cls.doctor, patient, booked_day, time_slot)
+            cls.book(other_doctor, patients[0], booked_day, slots[0])
+            cls.book(
+                cls.doctor,
+                patients[0],
+                booked_day,
+                slots[6],
+                booking_status="cancelled",
+            )
+        cls.expected = list(
+            Booking.objects.filter(doctor=cls.doctor, booking_status="Booked")
+            .order_by("-booked_day", "-id")
+            .values_list("id", flat=True)
+        )
+
+    def walk(self, url, link):
+        pages = []
+        queries = set()
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            queries.add(len(captured))
+            pages.append([row["id"] for row in response.data["appointments"]])
+            last = response.data
+            url = response.data[link]
+        return pages, last, queries
+
+    def test_forward_and_backward_cursors(self):
+        first = f"{self.url}?doc_id={self.doctor.doc_id}&page_size=7"
+        forward, last, queries = self.walk(first, "next")
+
+        self.assertEqual([len(page) for page in forward], [7, 7, 7, 4])
+        self.assertEqual(sum(forward, []), self.expected)
+        self.assertEqual(len(queries), 1)
+
+        backward, first_page, _ = self.walk(last["previous"], "previous")
+        self.assertEqual(backward, forward[-2::-1])
+        self.assertIsNone(first_page["previous"])
+        self.assertIsNotNone(first_page["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            self.url, {"doc_id": self.doctor.doc_id, "cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@benchmark
+class AppointmentsPaginationBenchmark(ClinicData, TestCase):
+    bookings = 100_000
+    page_size = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.seed_bookings(cls.doctor, cls.bookings)
+
+    def appointments(self, values):
+        return values.values(
+            Booking.objects.filter(doctor=self.doctor, booking_status="Booked"),
+            "booked_day",
+            "id",
+        )
+
+    def keyset_page(self, **params):
+        paginator = KeysetPagination(ordering=("-booked_day", "-id"))
+        request = Request(
+            APIRequestFactory().get("/", {"page_size": self.page_size, **params})
+        )
+        values = BookingValuesSerializer()
+        return values.render(
+            paginator.paginate_queryset(self.appointments(values), request)
+        )
+
+    def offset_page(self, offset=0):
+        values = BookingValuesSerializer()
+        rows = self.appointments(values).order_by("-booked_day", "-id")
+        return values.render(rows[offset : offset + self.page_size])
+
+    def test_deep_keyset_pages_cost_what_the_first_does(self):
+        offset = self.bookings - 1000
+        boundary = (
+            Booking.objects.filter(doctor=self.doctor)
+            .order_by("-booked_day", "-id")
+            .values_list("booked_day", "id")[offset - 1]
+        )
+        paginator = KeysetPagination(ordering=("-booked_day", "-id"))
+        paginator.set_positions(
+            Request(APIRequestFactory().get("/")),
+            {"next": [boundary[0].isoformat(), boundary[1]], "previous": None},
+        )
+        cursor = parse_qs(urlparse(paginator.get_links()["next"]).query)["cursor"][0]
+        self.assertEqual(self.keyset_page(cursor=cursor), self.offset_page(offset))
+
+        timings = {
+            "keyset, first page": self.keyset_page,
+            f"keyset, row {offset:,}": lambda: self.keyset_page(cursor=cursor),
+            "OFFSET, first page": self.offset_page,
+            f"OFFSET, row {offset:,}": lambda: self.offset_page(offset),
+        }
+        timings = {name: best_time(page) for name, page in timings.items()}
+        for name, seconds in timings.items():
+            report_benchmark(f"appointments page, {name}", seconds * 1000, "ms")
+
+        keyset_first, keyset_deep, _, offset_deep = timings.values()
+        self.assertLess(keyset_deep * 5, offset_deep)
+        self.assertLess(keyset_deep, keyset_first * 3)
+
+
+class PatientsViewTests(ClinicData, TestCase):
+    url = "/api/doctors/patients/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        other_doctor = cls.create_doctor("Bob Bone")
+        visits = {"Pat": 3, "Ann": 1, "Zed": 3, "Kim": 7}
+        cls.patients = {"Pat": cls.patient}
+        for name in ["Ann", "Zed", "Kim", "Lou", "Max"]:
+            cls.patients[name] = cls.create_patient(name)
+        for n, (name, days_ago) in enumerate(visits.items()):
+            cls.book(
+                cls.doctor,
+                cls.patients[name],
+                cls.today - timedelta(days=days_ago),
+                time(9, 15 * n),
+                payment_status="completed",
+            )
+        # neither a pending nor a cancelled booking is a visit
+        cls.book(cls.doctor, cls.patients["Lou"], cls.today, time(10, 0))
+        cls.book(
+            cls.doctor,
+            cls.patients["Max"],
+            cls.today,
+            time(10, 15),
+            payment_status="completed",
+            booking_status="Cancelled",
+        )
+        for patient in cls.patients.values():
+            patient.doctor.add(cls.doctor)
+        cls.create_patient("Other").doctor.add(other_doctor)
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def names(self, **params):
+        data = self.get(doc_id=self.doctor.doc_id, **params)
+        return [patient["name"] for patient in data["patients"]]
+
+    def test_lists_the_doctors_patients_by_name(self):
+        data = self.get(doc_id=self.doctor.doc_id)
+        self.assertEqual(
+            [patient["name"] for patient in data["patients"]],
+            ["Ann", "Kim", "Lou", "Max", "Pat", "Zed"],
+        )
+        last_appointments = {
+            patient["name"]: patient["last_appointment"] for patient in data["patients"]
+        }
+        self.assertEqual(last_appointments["Kim"], str(self.today - timedelta(days=7)))
+        self.assertIsNone(last_appointments["Lou"])
+        self.assertIsNone(last_appointments["Max"])
+        self.assertEqual(self.names(sort="-name", search="a"), ["Pat", "Max", "Ann"])
+
+    def test_pages_by_last_visit_newest_first(self):
+        url = f"{self.url}?doc_id={self.doctor.doc_id}&sort=-last_visit&page_size=2"
+        pages, queries = [], set()
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                data = self.get(url)
+            queries.add(len(captured))
+            pages.append([patient["name"] for patient in data["patients"]])
+            url = data["next"]
+
+        # ties on the last visit go to the newest patient first
+        self.assertEqual(pages, [["Ann", "Zed"], ["Pat", "Kim"], ["Max", "Lou"]])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            self.names(sort="last_visit"), ["Lou", "Max", "Kim", "Pat", "Zed", "Ann"]
+        )
+
+    def test_invalid_sort_or_doctor_is_a_bad_request(self):
+        response = self.client.get(
+            self.url, {"doc_id": self.doctor.doc_id, "sort": "age"}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {"doc_id": "nobody"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"error": "Doctor matching query does not exist."}
+        )
+
+
+class ReportSearchViewTests(ClinicData, TestCase):
+    url = "/api/doctors/report/search/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.other_doctor = cls.create_doctor("Bob Bone")
+        reports = {
+            "Pat": {
+                "allergies": "<img src=x onerror=alert(1)> penicillin",
+                "diagnosis": "Mild asthma",
+            },
+            "Penny": {"diagnosis": "Penicillin-resistant infection"},
+            "Omar": {"symptoms": "Chest pain after exercise"},
+        }
+        for name, fields in reports.items():
+            patient = cls.patient if name == "Pat" else cls.create_patient(name)
+            patient.doctor.add(cls.doctor)
+            Report.objects.create(patient=patient, doctor=cls.doctor, **fields)
+        other_patient = cls.create_patient("Olga")
+        other_patient.doctor.add(cls.other_doctor)
+        Report.objects.create(
+            patient=other_patient, doctor=cls.other_doctor, allergies="penicillin"
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(
+            self.url, {"doc_id": self.doctor.doc_id, "q": query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [
+            (report["patient_name"], report["highlights"])
+            for report in response.data["reports"]
+        ]
+
+    def test_highlights_are_escaped(self):
+        results = dict(self.search("penicillin", **{"in": "allergies"}))
+
+        self.assertEqual(list(results), ["Pat"])
+        self.assertEqual(
+            results["Pat"]["allergies"],
+            "&lt;img src=x onerror=alert(1)&gt; <mark>penicillin</mark>",
+        )
+
+    def test_ranks_by_field_weight_within_the_doctors_patients(self):
+        results = self.search("penicil")
+
+        self.assertEqual([name for name, _ in results], ["Penny", "Pat"])
+        self.assertEqual(list(results[0][1]), ["diagnosis"])
+        self.assertEqual(
+            self.search("chest pain", **{"in": "symptoms"}),
+            [
+                (
+                    "Omar",
+                    {"symptoms": "<mark>Chest</mark> <mark>pain</mark> after exercise"},
+                )
+            ],
+        )
+        self.assertEqual(self.search("chest", **{"in": "diagnosis"}), [])
+
+    def test_index_follows_report_changes(self):
+        report = Report.objects.get(patient__name="Omar")
+        report.symptoms = "Dizziness"
+        report.save()
+        self.assertEqual(self.search("chest"), [])
+        self.assertEqual([name for name, _ in self.search("dizziness")], ["Omar"])
+
+        report.delete()
+        self.assertEqual(self.search("dizziness"), [])
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector search needs PostgreSQL")
+    def test_headlines_on_postgresql(self):
+        results = dict(self.search("penicillin"))
+
+        self.assertEqual(
+            results["Pat"]["allergies"],
+            "&lt;img src=x onerror=alert(1)&gt; <mark>penicillin</mark>",
+        )
+        self.assertIn("<mark>", results["Penny"]["diagnosis"])
+
+
+class BookingValuesSerializerTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        day = date(2026, 3, 2)
+        cls.book(cls.doctor, cls.patient, day, time(9, 0), razorpay_payment_id="pay_1")
+        cls.book(
+            cls.doctor,
+            cls.create_patient("Pam"),
+            day,
+            time(9, 15),
+            consultation_mode="Online",
+        )
+
+    def assertRendersLikeSerializer(self, sparse=None):
+        bookings = Booking.objects.order_by("id")
+        values = BookingValuesSerializer(sparse=sparse)
+        expected = BookingSerialzier(bookings, many=True, sparse=sparse).data
+        renderer = FastJSONRenderer()
+        self.assertEqual(
+            renderer.render(values.render(values.values(bookings))),
+            renderer.render(expected),
+        )
+
+    def test_renders_like_the_model_serializer(self):
+        self.assertRendersLikeSerializer()
+
+    def test_renders_sparse_fieldsets_like_the_model_serializer(self):
+        self.assertRendersLikeSerializer(
+            SparseFieldset.from_names(["time_slot", "amount", "patient"])
+        )
+        self.assertRendersLikeSerializer(
+            SparseFieldset.from_names(["booked_day", "patient.name", "patient.age"])
+        )
+
+
+@benchmark
+class BookingValuesSerializerBenchmark(ClinicData, TestCase):
+    rows = 10_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.seed_bookings(cls.doctor, cls.rows)
+
+    def test_values_render_faster_than_the_model_serializer(self):
+        renderer = FastJSONRenderer()
+        bookings = Booking.objects.order_by("id")
+        values = BookingValuesSerializer()
+
+        def model_serializer():
+            rows = bookings.select_related("patient", "doctor").prefetch_related(
+                "patient__doctor"
+            )
+            return renderer.render(BookingSerialzier(rows, many=True).data)
+
+        def values_serializer():
+            return renderer.render(values.render(values.values(bookings)))
+
+        self.assertEqual(values_serializer(), model_serializer())
+        model_rate = self.rows / best_time(model_serializer, runs=3)
+        values_rate = self.rows / best_time(values_serializer, runs=3)
+        report_benchmark("bookings, model serializer", model_rate, "rows/s")
+        report_benchmark("bookings, values serializer", values_rate, "rows/s")
+        self.assertGreater(values_rate, model_rate * 2)
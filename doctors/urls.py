@@ -10,6 +10,7 @@ from .views import (
     PatientsView,
     DoctorProfileView,
     ReportView,
+    ReportSearchView,
     LeaveApplicationView,
     DashBoardView,
     AppointmentsView,
@@ -54,6 +55,7 @@ urlpatterns = [
         ReportView.as_view(),
         name="report",
     ),
+    path("report/search/", ReportSearchView.as_view(), name="report_search"),
     path(
         "report/<str:report_id>/",
         ReportView.as_view(),
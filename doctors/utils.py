@@ -0,0 +1,153 @@
+import calendar
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+from .consumers import slot_group
+from .models import (
+    Availability,
+    DailyBookedSlots,
+    LeaveApplication,
+    MorningSlot,
+    EveningSlot,
+)
+from .holds import held_slots
+
+MAX_CALENDAR_DAYS = 60
+
+
+def slot_masks(doctor_ids, start_day, end_day=None, holder=None):
+    """
+    ``{(doc_id, date): {"morning": mask, "evening": mask}}`` of taken slots
+    from ``start_day`` on, counting booked slots and slots held by anyone
+    other than ``holder``.
+    """
+    booked_slots = DailyBookedSlots.objects.filter(
+        doctor_id__in=doctor_ids, booked_day__gte=start_day
+    )
+    if end_day:
+        booked_slots = booked_slots.filter(booked_day__lte=end_day)
+    masks = {
+        (doctor_id, booked_day): {"morning": morning_mask, "evening": evening_mask}
+        for doctor_id, booked_day, morning_mask, evening_mask in booked_slots.values_list(
+            "doctor_id", "booked_day", "morning_mask", "evening_mask"
+        )
+    }
+    morning, evening = MorningSlot(), EveningSlot()
+    for doctor_id, days in held_slots(doctor_ids, exclude_holder=holder).items():
+        for day, time_slots in days.items():
+            if day < start_day or (end_day and day > end_day):
+                continue
+            day_masks = masks.setdefault((doctor_id, day), {"morning": 0, "evening": 0})
+            for time_slot in time_slots:
+                day_masks["morning"] |= morning.slot_bit(time_slot)
+                day_masks["evening"] |= evening.slot_bit(time_slot)
+    return masks
+
+
+def build_calendar(doctor_ids, start_day, days, holder=None):
+    """
+    Free slots per doctor for ``days`` dates starting at ``start_day``.
+
+    Reads availability, the booked-slot index and leave in three queries
+    whatever the number of doctors or dates, hides slots held by anyone
+    other than ``holder``, and returns
+    ``{doc_id: [{"date", "day", "slot", "online_consultation", "free_slots"}]}``
+    with only the dates that still have a free slot.
+    """
+    end_day = start_day + timedelta(days=days - 1)
+    slot_types = {"Morning": MorningSlot(), "Evening": EveningSlot()}
+
+    weekly = defaultdict(dict)
+    for avail in Availability.objects.filter(
+        doctor_id__in=doctor_ids, isAvailable=True, slot__isnull=False
+    ).values("doctor_id", "day_of_week", "slot", "online_consultation"):
+        weekly[avail["doctor_id"]][avail["day_of_week"]] = avail
+
+    masks = slot_masks(doctor_ids, start_day, end_day, holder)
+
+    leaves = defaultdict(list)
+    for doctor_id, leave_start, leave_end in LeaveApplication.objects.filter(
+        doctor__doc_id__in=doctor_ids,
+        leave_start_date__lte=end_day,
+        leave_end_date__gte=start_day,
+    ).values_list("doctor__doc_id", "leave_start_date", "leave_end_date"):
+        leaves[doctor_id].append((leave_start, leave_end))
+
+    now = timezone.localtime()
+    calendars = {}
+    for doctor_id in doctor_ids:
+        entries = []
+        for offset in range(days):
+            day = start_day + timedelta(days=offset)
+            avail = weekly[doctor_id].get(calendar.day_name[day.weekday()])
+            if avail is None:
+                continue
+            if any(start <= day <= end for start, end in leaves[doctor_id]):
+                continue
+            slot = avail["slot"]
+            mask = masks.get((doctor_id, day), {}).get(slot.lower(), 0)
+            free_slots = slot_types[slot].free_slots(mask)
+            if day == now.date():
+                free_slots = [time for time in free_slots if time > now.time()]
+            if free_slots:
+                entries.append(
+                    {
+                        "date": day,
+                        "day": avail["day_of_week"],
+                        "slot": slot,
+                        "online_consultation": avail["online_consultation"],
+                        "free_slots": free_slots,
+                    }
+                )
+        calendars[doctor_id] = entries
+    return calendars
+
+
+def earliest_slots(doctors, start_day, days, limit, consultation_mode=None):
+    """
+    The ``limit`` earliest free slots across ``doctors`` (a queryset), ordered
+    by date and time. Online consultations only consider days on which the
+    doctor takes online appointments.
+    """
+    doctors = {
+        doctor["doc_id"]: doctor for doctor in doctors.values("doc_id", "name", "fee")
+    }
+    calendars = build_calendar(list(doctors), start_day, days)
+    candidates = (
+        (entry["date"], time_slot, doctor_id, entry)
+        for doctor_id, entries in calendars.items()
+        for entry in entries
+        if consultation_mode != "Online" or entry["online_consultation"]
+        for time_slot in entry["free_slots"]
+    )
+    return [
+        {
+            "doc_id": doctor_id,
+            "doc_name": doctors[doctor_id]["name"],
+            "fee": str(doctors[doctor_id]["fee"]),
+            "date": day,
+            "slot": entry["slot"],
+            "time_slot": time_slot,
+            "online_consultation": entry["online_consultation"],
+        }
+        for day, time_slot, doctor_id, entry in heapq.nsmallest(
+            limit, candidates, key=lambda candidate: candidate[:3]
+        )
+    ]
+
+
+def push_slot_event(doc_id, event, **data):
+    """Send ``event`` to the doctor's slot websocket group once the transaction commits."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not doc_id:
+        return
+    message = {"type": "slot.event", "data": {"event": event, "doc_id": doc_id, **data}}
+    # robust: a channel layer outage must not fail a committed booking
+    transaction.on_commit(
+        lambda: async_to_sync(channel_layer.group_send)(slot_group(doc_id), message),
+        robust=True,
+    )
@@ -0,0 +1,71 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# length of an appointment slot, in minutes
+SLOT_MINUTES = 15
+
+
+def _version_key(doc_id):
+    return f"schedule_version:{doc_id}"
+
+
+def schedule_version(doc_id):
+    """Current schedule version of a doctor, started from the clock if unknown."""
+    key = _version_key(doc_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_schedule_version(doc_id):
+    """Invalidate a doctor's schedule ETags once the current transaction commits."""
+    if not doc_id:
+        return
+
+    def bump():
+        try:
+            cache.incr(_version_key(doc_id))
+        except ValueError:
+            cache.set(_version_key(doc_id), time.time_ns(), None)
+
+    # robust: a cache outage is logged rather than failing the committed write
+    transaction.on_commit(bump, robust=True)
+
+
+def slot_boundary():
+    """Start of the current slot; today's earlier slots are in the past."""
+    now = timezone.localtime()
+    return now.replace(
+        minute=now.minute - now.minute % SLOT_MINUTES, second=0, microsecond=0
+    )
+
+
+def schedule_etag(request, *args, **kwargs):
+    """
+    ETag for reads of one doctor's schedule: the schedule version, the start
+    of the current slot, the expiry of the next slot hold to lapse and the
+    query string, so no database access is needed. Holds lapse and slots
+    pass without bumping the version; the tag changes when they do.
+    """
+    # holds bump the schedule version, so they import this module
+    from .holds import hold_registry
+
+    doc_id = kwargs.get("doc_id") or request.query_params.get("doc_id")
+    if not doc_id:
+        return None
+    holds = hold_registry([doc_id]).get(doc_id, {})
+    raw = ":".join(
+        [
+            doc_id,
+            str(schedule_version(doc_id)),
+            slot_boundary().isoformat(),
+            str(min(holds.values(), default="")),
+            request.META.get("QUERY_STRING", ""),
+        ]
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
@@ -10,6 +10,8 @@ from .models import (
     Report,
     LeaveApplication,
     Notification,
+    DailyBookedSlots,
+    BookingRollup,
 )
 from rest_framework import status
 from rest_framework.views import APIView
@@ -30,7 +32,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth.hashers import make_password
 
-from .tasks import send_mail_task, send_sms_task
+from .tasks import send_mail_task, send_mass_mail_task, send_sms_task
 from django.shortcuts import get_object_or_404
 import pyotp
 import calendar
@@ -39,14 +41,24 @@ from adminapp.models import CancelBooking
 from .serializer import (
     PatientSerializer,
     BookingSerialzier,
+    BookingValuesSerializer,
     ReportSerializer,
     LeaveApplicationSerializer,
 )
-from datetime import datetime
-from django.db.models import Sum
-from django.db.models.functions import TruncMonth, TruncYear
+from datetime import date, datetime
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncYear
 
 from rest_framework.permissions import IsAuthenticated
+from .versions import schedule_etag
+from .snapshots import cached_snapshot
+from .report_search import report_fields, search_reports
+from .search import search_terms
+from .booking import cancel_bookings
+from heydoc.conditional import etag
+from heydoc.pagination import KeysetPagination
+from heydoc.serializers import SparseFieldset
 
 # Create your views here.
 
@@ -132,14 +144,14 @@ class DoctorRequestView(APIView):
                 doctor.account_activated = True
                 doctor.save()
                 doctor_req.delete()
-                send_mail_task(subject, accept_msg, email_from, recipient_list)
+                send_mail_task.delay(subject, accept_msg, email_from, recipient_list)
                 return Response(
                     {"message": "Doctor's account activated successfully."},
                     status=status.HTTP_200_OK,
                 )
             elif action == "reject":
                 doctor_req.delete()
-                send_mail_task(subject, reject_msg, email_from, recipient_list)
+                send_mail_task.delay(subject, reject_msg, email_from, recipient_list)
                 return Response(
                     {
                         "message": "Email notification regarding request rejection was successfully sent"
@@ -235,6 +247,7 @@ class ScheduleForm(APIView):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @etag(schedule_etag)
     def post(self, request, doc_id):
 
         try:
@@ -246,12 +259,22 @@ class ScheduleForm(APIView):
                 evening = EveningSlot()
                 morning_slots = morning.generate_slot()
                 evening_slots = evening.generate_slot()
+                booked_slots = DailyBookedSlots.objects.filter(
+                    doctor_id=doc_id, booked_day__gte=now().date()
+                )
+                if request.query_params.get("as_mask") == "true":
+                    booked = {str(day.booked_day): day.masks() for day in booked_slots}
+                else:
+                    booked = {
+                        str(day.booked_day): day.booked_times() for day in booked_slots
+                    }
                 return Response(
                     {
                         "message": "Avalabilty data retrieved successfully!",
                         "availability": serializer.data,
                         "morning_slots": morning_slots,
                         "evening_slots": evening_slots,
+                        "booked_slots": booked,
                     },
                     status=status.HTTP_200_OK,
                 )
@@ -311,138 +334,103 @@ class Schedule(APIView):
         online_consultation = request.data.get("online_consultation")
         print(slot)
         try:
-            day_number = list(calendar.day_name).index(day)
-            django_week_day_number = (day_number + 2) % 7 or 7
-            today = now().date()
-            bookings = None
-            email_from = os.getenv("EMAIL_HOST_USER")
-            online_present_status = Availability.objects.get(
-                doctor_id=doc_id, day_of_week=day
-            )
+            # the availability change and the cancellations commit together
+            with transaction.atomic():
+                day_number = list(calendar.day_name).index(day)
+                django_week_day_number = (day_number + 2) % 7 or 7
+                today = now().date()
+                bookings = None
+                email_from = os.getenv("EMAIL_HOST_USER")
+                online_present_status = Availability.objects.get(
+                    doctor_id=doc_id, day_of_week=day
+                )
 
-            if online_present_status.online_consultation != online_consultation:
-                online_present_status.online_consultation = online_consultation
-                online_present_status.save()
-                if online_consultation == False:
-                    bookings = Booking.objects.filter(
-                        booked_day__week_day=django_week_day_number,
-                        booked_day__gt=today,
-                        consultation_mode="Online",
-                    )
-                    for booking in bookings:
-                        booking.booking_status = "cancelled"
-                        booking.save()
-                        if booking.payment_status == "Completed":
-                            CancelBooking.objects.create(
-                                booking_id=booking.id,
-                                cancelled_by=booking.booked_by,
-                                doctor=booking.doctor,
-                                reason="Doctor Not Available",
-                                refund="Refund Applicable",
+                if online_present_status.online_consultation != online_consultation:
+                    online_present_status.online_consultation = online_consultation
+                    online_present_status.save()
+                    if online_consultation == False:
+                        bookings = Booking.objects.filter(
+                            doctor_id=doc_id,
+                            booked_day__week_day=django_week_day_number,
+                            booked_day__gt=today,
+                            consultation_mode="Online",
+                        )
+                        bookings_emails = cancel_bookings(bookings)
+                        if bookings_emails:
+                            subject = "Your Doctor Appointment Cancelled!"
+                            message = f"Dear Sir/Ma'am,\n We are really sorry to inform you that as the doctor is not available for the booked day.Our Team will contact you shortly and if refund is applicable,you will be refunded ASAP.Sorry for the inconvenience cause.Do visit us again to book the next best available slot.\n Best Regards,\nHeyDoc"
+                            email_from = os.getenv("EMAIL_HOST_USER")
+                            send_mass_mail_task.delay(
+                                [
+                                    (email, subject, message)
+                                    for email in bookings_emails
+                                ],
+                                email_from,
                             )
-                        elif booking.payment_status == "Pending":
-                            CancelBooking.objects.create(
-                                booking_id=booking.id,
-                                cancelled_by=booking.booked_by,
-                                doctor=booking.doctor,
-                                reason="Doctor Not Available",
-                                refund="No Refund",
+                            return Response(
+                                {
+                                    "message": "Availability updated!",
+                                },
+                                status=status.HTTP_200_OK,
                             )
-                    bookings_emails = Booking.objects.filter(
-                        booked_day__week_day=django_week_day_number,
-                        booked_day__gt=today,
-                    ).values_list("booked_by__email", flat=True)
+
+                if slot != "Not Available":
+                    availability = Availability.objects.get(
+                        doctor_id=doc_id, day_of_week=day
+                    )
+                    availability.slot = slot
+                    availability.save()
+
+                    bookings_emails = None
+                    if slot in ("Morning", "Evening"):
+                        bookings_emails = list(
+                            Booking.objects.filter(
+                                doctor_id=doc_id,
+                                booked_day__week_day=django_week_day_number,
+                                booked_day__gt=today,
+                                booking_status="Booked",
+                            )
+                            .exclude(slot=slot)
+                            .values_list("booked_by__email", flat=True)
+                            .distinct()
+                        )
                     if bookings_emails:
-                        subject = "Your Doctor Appointment Cancelled!"
-                        message = f"Dear Sir/Ma'am,\n We are really sorry to inform you that as the doctor is not available for the booked day.Our Team will contact you shortly and if refund is applicable,you will be refunded ASAP.Sorry for the inconvenience cause.Do visit us again to book the next best available slot.\n Best Regards,\nHeyDoc"
-                        email_from = os.getenv("EMAIL_HOST_USER")
-                        send_mail_task(subject, message, email_from, bookings_emails)
-                        return Response(
-                            {
-                                "message": "Availability updated!",
-                            },
-                            status=status.HTTP_200_OK,
+                        subject = "HeyDoc Doctor Appointment Slot Change"
+                        if slot == "Morning":
+                            message = f"Dear User,\n There has been a change in slot for doctor availability.Our Team will call you shortly.If you are not available for evening slot you can cancel the appointment via our website.Sorry for the inconvinience caused.Please do visit us again.\nBest Regards,\nHeyDoc"
+                        else:
+                            message = f"Dear User,\n There has been a change in slot for doctor availability.Our Team will call you shortly.If you are not available for morning slot you can cancel the appointment via our website.Sorry for the inconvinience caused.Please do visit us again.\nBest Regards,\nHeyDoc"
+                        send_mass_mail_task.delay(
+                            [(email, subject, message) for email in bookings_emails],
+                            email_from,
                         )
-
-            if slot != "Not Available":
-                availability = Availability.objects.get(
-                    doctor_id=doc_id, day_of_week=day
-                )
-                availability.slot = slot
-                availability.save()
-
-                if slot == "Morning":
-                    bookings = Booking.objects.filter(
-                        booked_day__week_day=django_week_day_number,
-                        booked_day__gt=today,
-                        slot="Evening",
+                    return Response(
+                        {
+                            "message": "Availability updated!",
+                        },
+                        status=status.HTTP_200_OK,
                     )
-                    bookings_emails = Booking.objects.filter(
-                        booked_day__week_day=django_week_day_number,
-                        booked_day__gt=today,
-                        slot="Evening",
-                    ).values_list("booked_by__email", flat=True)
-                elif slot == "Evening":
+                elif slot == "Not Available":
+                    availability = Availability.objects.get(
+                        doctor_id=doc_id, day_of_week=day
+                    )
+                    availability.isAvailable = False
+                    availability.save()
+
                     bookings = Booking.objects.filter(
+                        doctor_id=doc_id,
                         booked_day__week_day=django_week_day_number,
                         booked_day__gt=today,
-                        slot="Morning",
                     )
-                    bookings_emails = Booking.objects.filter(
-                        booked_day__week_day=django_week_day_number,
-                        booked_day__gt=today,
-                        slot="Morning",
-                    ).values_list("booked_by__email", flat=True)
-                if bookings:
-                    subject = "HeyDoc Doctor Appointment Slot Change"
-                    if slot == "Morning":
-                        message = f"Dear User,\n There has been a change in slot for doctor availability.Our Team will call you shortly.If you are not available for evening slot you can cancel the appointment via our website.Sorry for the inconvinience caused.Please do visit us again.\nBest Regards,\nHeyDoc"
-                    else:
-                        message = f"Dear User,\n There has been a change in slot for doctor availability.Our Team will call you shortly.If you are not available for morning slot you can cancel the appointment via our website.Sorry for the inconvinience caused.Please do visit us again.\nBest Regards,\nHeyDoc"
-                    send_mail_task(subject, message, email_from, bookings_emails)
-                return Response(
-                    {
-                        "message": "Availability updated!",
-                    },
-                    status=status.HTTP_200_OK,
-                )
-            elif slot == "Not Available":
-                availability = Availability.objects.get(
-                    doctor_id=doc_id, day_of_week=day
-                )
-                availability.isAvailable = False
-                availability.save()
-
-                bookings = Booking.objects.filter(
-                    booked_day__week_day=django_week_day_number, booked_day__gt=today
-                )
-                for booking in bookings:
-                    booking.booking_status = "cancelled"
-                    booking.save()
-                    if booking.payment_status == "Completed":
-                        CancelBooking.objects.create(
-                            booking_id=booking.id,
-                            cancelled_by=booking.booked_by,
-                            doctor=booking.doctor,
-                            reason="Doctor Not Available",
-                            refund="Refund Applicable",
-                        )
-                    elif booking.payment_status == "Pending":
-                        CancelBooking.objects.create(
-                            booking_id=booking.id,
-                            cancelled_by=booking.booked_by,
-                            doctor=booking.doctor,
-                            reason="Doctor Not Available",
-                            refund="No Refund",
+                    bookings_emails = cancel_bookings(bookings)
+                    if bookings_emails:
+                        subject = "Your Doctor Appointment Cancelled!"
+                        message = f"Dear Sir/Ma'am,\n We are really sorry to inform you that as the doctor is not available for the booked day.Our Team will contact you shortly and if refund is applicable,you will be refunded ASAP.Sorry for the inconvenience cause.Do visit us again to book the next best available slot.\n Best Regards,\nHeyDoc"
+                        email_from = os.getenv("EMAIL_HOST_USER")
+                        send_mass_mail_task.delay(
+                            [(email, subject, message) for email in bookings_emails],
+                            email_from,
                         )
-                bookings_emails = Booking.objects.filter(
-                    booked_day__week_day=django_week_day_number, booked_day__gt=today
-                ).values_list("booked_by__email", flat=True)
-                if bookings_emails:
-                    subject = "Your Doctor Appointment Cancelled!"
-                    message = f"Dear Sir/Ma'am,\n We are really sorry to inform you that as the doctor is not available for the booked day.Our Team will contact you shortly and if refund is applicable,you will be refunded ASAP.Sorry for the inconvenience cause.Do visit us again to book the next best available slot.\n Best Regards,\nHeyDoc"
-                    email_from = os.getenv("EMAIL_HOST_USER")
-                    send_mail_task(subject, message, email_from, bookings_emails)
                     return Response(
                         {
                             "message": "Availability updated!",
@@ -492,7 +480,7 @@ class OTPVerification(APIView):
                 if doc_email:
                     OTP.objects.create(email=doc_email, otp=otp)
                     email_from = os.getenv("EMAIL_HOST_USER")
-                    send_mail_task(
+                    send_mail_task.delay(
                         "HeyDoc OTP for Password Reset",
                         f"Dear {doctor.name}\n Your Otp for password reset is {otp}.Please do not Share.\nBest Regards,HeyDoc",
                         email_from,
@@ -502,7 +490,7 @@ class OTPVerification(APIView):
                 if doc_phone:
                     doc_phone = "+91" + doc_phone
                     OTP.objects.create(phone=doc_phone, otp=otp)
-                    send_sms_task(
+                    send_sms_task.delay(
                         doc_phone,
                         f"Dear {doctor.name}\n Your Otp for password reset is {otp}.Please do not Share.\nBest Regards,HeyDoc",
                     )
@@ -582,6 +570,14 @@ class ResetPasswordView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+PATIENT_SORTS = {
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    "last_visit": ("last_visit", "id"),
+    "-last_visit": ("-last_visit", "-id"),
+}
+
+
 class PatientsView(APIView):
     permission_class = IsAuthenticated
 
@@ -589,36 +585,47 @@ class PatientsView(APIView):
         try:
             doc_id = request.query_params.get("doc_id")
 
-            doctor = Doctor.objects.get(doc_id=doc_id)
-
-            patients = Patient.objects.filter(doctor=doctor.id)
-            patients_data = []
-
-            for patient in patients:
-
-                latest_appointment = (
-                    Booking.objects.filter(
-                        patient=patient,
-                        payment_status="completed",
-                        booking_status="Booked",
-                    )
-                    .order_by("-booked_day")
-                    .first()
+            sort = request.query_params.get("sort", "name")
+            if sort not in PATIENT_SORTS:
+                return Response(
+                    {"error": f"sort must be one of {', '.join(PATIENT_SORTS)}."},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
 
-                last_appointment_date = (
-                    latest_appointment.booked_day if latest_appointment else None
+            last_appointment = (
+                Booking.objects.filter(
+                    patient=OuterRef("name"),
+                    payment_status="completed",
+                    booking_status="Booked",
                 )
-
-                patient_data = PatientSerializer(patient).data
-                patient_data["last_appointment"] = last_appointment_date
-
-                patients_data.append(patient_data)
+                .order_by("-booked_day")
+                .values("booked_day")[:1]
+            )
+            patients = (
+                Patient.objects.filter(doctor__doc_id=doc_id)
+                .annotate(
+                    last_appointment=Subquery(last_appointment),
+                    last_visit=Coalesce(Subquery(last_appointment), date.min),
+                )
+                .prefetch_related(Prefetch("doctor", Doctor.objects.only("id")))
+            )
+            search = request.query_params.get("search")
+            if search:
+                patients = patients.filter(name__icontains=search)
+
+            paginator = KeysetPagination(ordering=PATIENT_SORTS[sort])
+            patients = paginator.paginate_queryset(patients, request, view=self)
+            if not patients and not Doctor.objects.filter(doc_id=doc_id).exists():
+                raise Doctor.DoesNotExist("Doctor matching query does not exist.")
+            patients_data = PatientSerializer(patients, many=True).data
+            for patient_data, patient in zip(patients_data, patients):
+                patient_data["last_appointment"] = patient.last_appointment
 
             return Response(
                 {
                     "message": "Patient Information successfully retrieved!",
                     "patients": patients_data,
+                    **paginator.get_links(),
                 },
                 status=status.HTTP_200_OK,
             )
@@ -749,6 +756,70 @@ class ReportView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ReportSearchView(APIView):
+    permission_class = IsAuthenticated
+
+    def get(self, request):
+        doc_id = request.query_params.get("doc_id")
+        query = request.query_params.get("q", "")
+        patient_id = request.query_params.get("patient")
+        try:
+            if not doc_id:
+                return Response(
+                    {"error": "Doctor ID is required."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not search_terms(query):
+                return Response(
+                    {"error": "A search term is required."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            limit = int(request.query_params.get("limit", 20))
+            if not 0 < limit <= 50:
+                return Response(
+                    {"error": "limit must be between 1 and 50."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            fields = report_fields(
+                [
+                    field.strip()
+                    for field in request.query_params.get("in", "").split(",")
+                    if field.strip()
+                ]
+            )
+            reports = Report.objects.filter(patient__doctor__doc_id=doc_id)
+            if patient_id:
+                reports = reports.filter(patient=patient_id)
+            ranked = search_reports(query, reports, limit, fields)
+
+            matches = (
+                Report.objects.filter(pk__in=[pk for pk, _ in ranked])
+                .select_related("patient")
+                .in_bulk()
+            )
+            results = []
+            for pk, highlights in ranked:
+                if pk not in matches:
+                    continue
+                report = matches[pk]
+                results.append(
+                    {
+                        **ReportSerializer(report).data,
+                        "patient_name": report.patient.name,
+                        "highlights": highlights,
+                    }
+                )
+            return Response(
+                {
+                    "message": "Reports matching the search retrieved successfully",
+                    "reports": results,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class LeaveApplicationView(APIView):
     permission_class = IsAuthenticated
 
@@ -796,81 +867,69 @@ class DashBoardView(APIView):
         try:
 
             doc_id = request.query_params.get("doc_id")
-            doctor = get_object_or_404(Doctor, doc_id=doc_id)
-            total_patients = Patient.objects.filter(doctor=doctor.id).count()
-            total_earning = Booking.objects.filter(
-                booking_status="Booked", doctor=doc_id
-            ).aggregate(total=Sum("amount"))
-            monthly_earnings = (
-                Booking.objects.filter(booking_status="Booked", doctor=doc_id)
-                .annotate(month=TruncMonth("booked_day"))
-                .values("month")
-                .annotate(total=Sum("amount"))
-                .order_by("month")
-            )
-            current_month_total = (
-                monthly_earnings.order_by("-month").first()["total"]
-                if monthly_earnings
-                else 0
-            )
-            reverse_monthly_earnings = monthly_earnings.order_by("-month")
-            if reverse_monthly_earnings.count() > 1:
-                prev_month_total = monthly_earnings[1]["total"]
-            else:
-                prev_month_total = 0
-
-            yearly_earnings = (
-                Booking.objects.filter(booking_status="Booked", doctor=doc_id)
-                .annotate(year=TruncYear("booked_day"))
-                .values("year")
-                .annotate(total=Sum("amount"))
-                .order_by("year")
-            )
-            current_year_total = (
-                yearly_earnings.order_by("-year").first()["total"]
-                if yearly_earnings
-                else 0
-            )
-            online_consultation_earning = Booking.objects.filter(
-                booking_status="Booked", consultation_mode="Online", doctor=doc_id
-            ).aggregate(total=Sum("amount"))
-
-            offline_consultation_earning = Booking.objects.filter(
-                booking_status="Booked", consultation_mode="Offline", doctor=doc_id
-            ).aggregate(total=Sum("amount"))
-
-            total_appointments = Booking.objects.filter(
-                booking_status="Booked", doctor=doc_id
-            ).count()
-            todays_appointments = Booking.objects.filter(
-                payment_status="completed",
-                booking_status="Booked",
-                booked_day=datetime.now().date(),
-                doctor=doc_id,
-            )
-            serializer = BookingSerialzier(todays_appointments, many=True)
-            monthly_difference = current_month_total - prev_month_total
-
             return Response(
-                {
-                    "total_patients": total_patients,
-                    "total_earning": total_earning,
-                    "yearly_earnings": yearly_earnings,
-                    "monthly_earnings": monthly_earnings,
-                    "total_appointments": total_appointments,
-                    "total_patients": total_patients,
-                    "current_year_total": current_year_total,
-                    "current_month_total": current_month_total,
-                    "online_consultation_earning": online_consultation_earning,
-                    "offline_consultation_earning": offline_consultation_earning,
-                    "todays_appointment": serializer.data,
-                    "monthly_difference": monthly_difference,
-                },
+                cached_snapshot(doc_id, lambda: self.snapshot(doc_id)),
                 status=status.HTTP_200_OK,
             )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def snapshot(self, doc_id):
+        doctor = get_object_or_404(Doctor, doc_id=doc_id)
+        total_patients = Patient.objects.filter(doctor=doctor.id).count()
+        rollups = BookingRollup.objects.filter(doctor=doc_id, appointments__gt=0)
+        total_earning = rollups.aggregate(total=Sum("revenue"))
+        monthly_earnings = list(
+            rollups.annotate(month=TruncMonth("day"))
+            .values("month")
+            .annotate(total=Sum("revenue"))
+            .order_by("month")
+        )
+        monthly_totals = [month["total"] for month in monthly_earnings]
+        current_month_total = monthly_totals[-1] if monthly_totals else 0
+        prev_month_total = monthly_totals[-2] if len(monthly_totals) > 1 else 0
+
+        yearly_earnings = list(
+            rollups.annotate(year=TruncYear("day"))
+            .values("year")
+            .annotate(total=Sum("revenue"))
+            .order_by("year")
+        )
+        yearly_totals = [year["total"] for year in yearly_earnings]
+        current_year_total = yearly_totals[-1] if yearly_totals else 0
+        online_consultation_earning = rollups.filter(
+            consultation_mode="Online"
+        ).aggregate(total=Sum("revenue"))
+
+        offline_consultation_earning = rollups.filter(
+            consultation_mode="Offline"
+        ).aggregate(total=Sum("revenue"))
+
+        total_appointments = rollups.aggregate(total=Sum("appointments"))["total"] or 0
+        todays_appointments = Booking.objects.filter(
+            payment_status="completed",
+            booking_status="Booked",
+            booked_day=datetime.now().date(),
+            doctor=doc_id,
+        )
+        serializer = BookingSerialzier(todays_appointments, many=True)
+        monthly_difference = current_month_total - prev_month_total
+
+        return {
+            "total_patients": total_patients,
+            "total_earning": total_earning,
+            "yearly_earnings": yearly_earnings,
+            "monthly_earnings": monthly_earnings,
+            "total_appointments": total_appointments,
+            "total_patients": total_patients,
+            "current_year_total": current_year_total,
+            "current_month_total": current_month_total,
+            "online_consultation_earning": online_consultation_earning,
+            "offline_consultation_earning": offline_consultation_earning,
+            "todays_appointment": list(serializer.data),
+            "monthly_difference": monthly_difference,
+        }
+
 
 class AppointmentsView(APIView):
     permission_class = IsAuthenticated
@@ -879,14 +938,24 @@ class AppointmentsView(APIView):
 
         doc_id = request.query_params.get("doc_id")
         try:
-            all_appointments = Booking.objects.filter(
-                doctor__doc_id=doc_id, booking_status="Booked"
-            ).order_by("-booked_day")
+            values = BookingValuesSerializer(
+                sparse=SparseFieldset.from_request(request)
+            )
+            paginator = KeysetPagination(ordering=("-booked_day", "-id"))
+            appointments = paginator.paginate_queryset(
+                values.values(
+                    Booking.objects.filter(doctor_id=doc_id, booking_status="Booked"),
+                    "booked_day",
+                    "id",
+                ),
+                request,
+                view=self,
+            )
 
-            appointments = BookingSerialzier(all_appointments, many=True)
             return Response(
                 {
-                    "appointments": appointments.data,
+                    "appointments": values.render(appointments),
+                    **paginator.get_links(),
                 },
                 status=status.HTTP_200_OK,
             )
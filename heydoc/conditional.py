@@ -0,0 +1,41 @@
+from functools import wraps
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def etag(etag_func):
+    """
+    Conditional GET for APIView handlers.
+
+    ``etag_func(request, *args, **kwargs)`` must be cheap (no ORM access);
+    when it matches the client's If-None-Match the handler is skipped and a
+    304 is returned. Successful responses carry the ETag header, suffixed
+    with the response format unless it is JSON.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def inner(self, request, *args, **kwargs):
+            tag = etag_func(request, *args, **kwargs)
+            if tag is None:
+                return handler(self, request, *args, **kwargs)
+            renderer = getattr(request, "accepted_renderer", None)
+            if renderer is not None and renderer.format != "json":
+                tag = f"{tag}:{renderer.format}"
+            tag = quote_etag(tag)
+            if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+            if if_none_match:
+                etags = parse_etags(if_none_match)
+                if "*" in etags or tag in etags:
+                    return Response(
+                        status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag}
+                    )
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response["ETag"] = tag
+            return response
+
+        return inner
+
+    return decorator
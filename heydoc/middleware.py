@@ -0,0 +1,18 @@
+from django.utils.cache import patch_vary_headers
+
+
+class VaryOnAcceptMiddleware:
+    """
+    Mark API responses as varying on Accept, since the same URL may be
+    rendered as JSON, MessagePack or the browsable API, so shared caches
+    keep one copy per format.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(response, "accepted_renderer", None) is not None:
+            patch_vary_headers(response, ["Accept"])
+        return response
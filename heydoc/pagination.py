@@ -0,0 +1,145 @@
+"""
+Keyset (seek) pagination.
+
+Pages are cut with a WHERE on the last row seen instead of an OFFSET, so
+with an index matching ``ordering`` every page costs the same as the first.
+The last ordering field must be unique (normally ``id``) to keep the order
+total. Cursors are opaque base64 tokens holding the boundary row's values.
+"""
+
+import base64
+import json
+from functools import reduce
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("-id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering:
+            self.ordering = tuple(ordering)
+        if page_size:
+            self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["r"])
+        ordering = self._flipped() if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(ordering, cursor["p"]))
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self._position(rows[-1])
+            if cursor and (has_more or not reverse):
+                self.previous_position = self._position(rows[0])
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_positions(self):
+        """The page's boundary rows, for ``set_positions`` on a later request."""
+        return {"next": self.next_position, "previous": self.previous_position}
+
+    def set_positions(self, request, positions):
+        """Restore a page's boundaries, e.g. from a cache, to link it for ``request``."""
+        self.request = request
+        self.next_position = positions["next"]
+        self.previous_position = positions["previous"]
+
+    def get_links(self):
+        return {
+            "next": self.encode_cursor(self.next_position, False),
+            "previous": self.encode_cursor(self.previous_position, True),
+        }
+
+    def get_paginated_response(self, data):
+        return Response({**self.get_links(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def encode_cursor(self, position, reverse):
+        if position is None:
+            return None
+        token = base64.urlsafe_b64encode(
+            json.dumps({"p": position, "r": int(reverse)}).encode()
+        ).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+            if len(cursor["p"]) != len(self.ordering):
+                raise ValueError
+            return cursor
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _flipped(self):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def _position(self, row):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            position.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return position
+
+    def _after(self, ordering, position):
+        """
+        Rows strictly after ``position`` in ``ordering``. The leading
+        inclusive bound on the first field lets the index range-scan.
+        """
+        names = [field.lstrip("-") for field in ordering]
+        lookups = ["lt" if field.startswith("-") else "gt" for field in ordering]
+        clauses = [
+            Q(
+                **dict(zip(names[:index], position[:index])),
+                **{f"{names[index]}__{lookups[index]}": position[index]},
+            )
+            for index in range(len(ordering))
+        ]
+        bound = Q(**{f"{names[0]}__{lookups[0]}e": position[0]})
+        return bound & reduce(lambda left, right: left | right, clauses)
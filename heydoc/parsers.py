@@ -0,0 +1,56 @@
+"""
+Request parsers: JSON with orjson, and MessagePack.
+
+``FastJSONParser`` returns what DRF's ``JSONParser`` returns. Bodies orjson
+rejects (e.g. NaN when ``STRICT_JSON`` is off) are parsed again by DRF's
+parser, which also produces its usual error for invalid JSON. Without
+orjson, for non-UTF-8 bodies and for bodies with 19 or more consecutive
+digits, which may hold an integer orjson would turn into a float, DRF's
+parser is used.
+
+``MessagePackParser`` reads ``application/msgpack`` bodies into the same
+data JSON would give, with timestamps as aware datetimes.
+"""
+
+import codecs
+import io
+import msgpack
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from .renderers import FastJSONRenderer, MessagePackRenderer, orjson
+
+# Every digit becomes "0" and every other byte a space, so a run of 19
+# digits is found with a plain substring search.
+DIGIT_RUNS = bytes(48 if 48 <= byte <= 57 else 32 for byte in range(256))
+LONG_NUMBER = b"0" * 19
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if LONG_NUMBER in body.translate(DIGIT_RUNS):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, timestamp=3)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(
+                f"MessagePack parse error - {str(exc) or type(exc).__name__}"
+            )
@@ -0,0 +1,158 @@
+"""
+Sparse fieldsets for list endpoints.
+
+``?fields=name,doc_id,department.dept_name`` keeps only the listed fields,
+with dotted names selecting fields of nested serializers, and
+``?expand=patient`` renders a listed nested serializer in full instead of
+as its key. Without ``?fields`` the serializers render as before.
+
+The same ``SparseFieldset`` narrows the queryset with ``only()``,
+``select_related()`` and ``prefetch_related()`` so unrequested columns and
+joins are never fetched::
+
+    sparse = SparseFieldset.from_request(request)
+    bookings = sparse.project(Booking.objects.all(), BookingSerializer)
+    BookingSerializer(bookings, many=True, sparse=sparse).data
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _tree(names):
+    tree = {}
+    for name in names:
+        node = tree
+        for part in name.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _split(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+class SparseFieldset:
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand or {}
+
+    @classmethod
+    def from_names(cls, fields=None, expand=()):
+        return cls(_tree(fields) if fields else None, _tree(expand))
+
+    @classmethod
+    def from_request(cls, request):
+        return cls.from_names(
+            _split(request.query_params.get("fields")),
+            _split(request.query_params.get("expand")),
+        )
+
+    def expanded(self, name):
+        return self.fields is None or name in self.expand or bool(self.fields.get(name))
+
+    def nested(self, name):
+        """The fieldset of the nested serializer under ``name``."""
+        fields = self.fields.get(name) if self.fields is not None else None
+        return SparseFieldset(fields or None, self.expand.get(name))
+
+    def prune(self, serializer, fields):
+        """Drop unrequested fields and collapse unexpanded nested serializers."""
+        if self.fields is None:
+            requested = list(fields)
+        else:
+            unknown = [name for name in self.fields if name not in fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+            requested = list(self.fields)
+        model = getattr(getattr(serializer, "Meta", None), "model", None)
+        for name in list(fields):
+            if name not in requested:
+                fields.pop(name)
+                continue
+            field = fields[name]
+            nested = getattr(field, "child", field)
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if self.expanded(name):
+                nested.sparse = self.nested(name)
+            elif model is not None:
+                fields[name] = self._collapsed(model, field.source or name)
+        return fields
+
+    def _collapsed(self, model, source):
+        model_field = model._meta.get_field(source)
+        if model_field.many_to_many or model_field.one_to_many:
+            return serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+        return serializers.ReadOnlyField(source=model_field.attname)
+
+    def project(self, queryset, serializer_class, required=()):
+        """
+        Narrow ``queryset`` to what ``serializer_class`` renders with this
+        fieldset, plus the ``required`` model fields (e.g. the ordering).
+        """
+        only, related, prefetch = self._projection(
+            serializer_class(sparse=self), queryset.model
+        )
+        if only is not None:
+            queryset = queryset.only(*only, *required)
+        # select_related() without arguments would join every non-null
+        # foreign key.
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def _projection(self, serializer, model, prefix=""):
+        """
+        ``(only, select_related, prefetch_related)`` lookups for
+        ``serializer``. ``only`` is None when a field reads something that is
+        not a model field, in which case every column is loaded.
+        """
+        only, related, prefetch = [model._meta.pk.name], [], []
+        for field in serializer.fields.values():
+            source = field.source
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                only = None
+                continue
+            path = prefix + model_field.name
+            nested = getattr(field, "child", field)
+            if model_field.many_to_many or model_field.one_to_many:
+                remote = model_field.related_model
+                if isinstance(nested, SparseFieldsMixin):
+                    queryset = nested.sparse.project(remote.objects.all(), type(nested))
+                elif isinstance(nested, serializers.BaseSerializer):
+                    queryset = remote.objects.all()
+                else:
+                    queryset = remote.objects.only(remote._meta.pk.name)
+                prefetch.append(Prefetch(path, queryset=queryset))
+                continue
+            if only is not None:
+                only.append(model_field.name)
+            if not model_field.is_relation or source == model_field.attname:
+                continue
+            related.append(path)
+            if isinstance(nested, SparseFieldsMixin):
+                nested_only, nested_related, nested_prefetch = self._projection(
+                    nested, model_field.related_model, f"{path}__"
+                )
+                if only is not None and nested_only is not None:
+                    only += [f"{model_field.name}__{name}" for name in nested_only]
+                related += nested_related
+                prefetch += nested_prefetch
+        return only, related, prefetch
+
+
+class SparseFieldsMixin:
+    """Serializer mixin applying a ``SparseFieldset`` passed as ``sparse=``."""
+
+    def __init__(self, *args, sparse=None, **kwargs):
+        self.sparse = sparse or SparseFieldset()
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        return self.sparse.prune(self, super().get_fields())
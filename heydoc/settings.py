@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "heydoc.middleware.VaryOnAcceptMiddleware",
 ]
 
 ROOT_URLCONF = "heydoc.urls"
@@ -147,6 +149,17 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "heydoc.renderers.FastJSONRenderer",
+        "heydoc.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "heydoc.parsers.FastJSONParser",
+        "heydoc.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SIMPLE_JWT = {
@@ -168,6 +181,7 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
+MASS_MAIL_CHUNK_SIZE = 50
 
 
 # CELERY
@@ -181,6 +195,41 @@ CELERY_TIMEZONE = "Asia/kolkata"
 CELERY_BROKER_CONNECTION_RETRY = True
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 
+# CACHE
+# The test suite runs without Redis, and its cache.clear() calls must not
+# flush a developer's Redis database.
+TESTING = sys.argv[1:2] == ["test"]
+
+if TESTING:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL", "redis://localhost:6379/1"),
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
+
+# seconds a patient keeps a slot while paying
+SLOT_HOLD_TTL = 300
+
+# seconds dashboard snapshots are kept, and the longest a rebuild may take
+DASHBOARD_CACHE_TTL = 300
+DASHBOARD_REBUILD_TIMEOUT = 5
+
+# seconds browsers and proxies may reuse the public department directory
+DIRECTORY_CACHE_MAX_AGE = 60
+
+# seconds browsers and proxies may reuse the public blog feed and articles
+BLOG_CACHE_MAX_AGE = 60
+
 # auth0-python
 AUTH0_DOMAIN = "your-auth0-domain"
 API_IDENTIFIER = "your-api-identifier"
@@ -213,14 +262,21 @@ CORS_ALLOW_ALL_ORIGINS = False
 ASGI_APPLICATION = "heydoc.asgi.application"
 
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {
-            "hosts": [("127.0.0.1", 6380)],
+if TESTING:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [os.getenv("CHANNEL_LAYER_URL", "redis://127.0.0.1:6380")],
+            },
+        },
+    }
 
 AUTHENTICATION_BACKENDS = ("django.contrib.auth.backends.ModelBackend",)
 STATICFILES_DIRS = [
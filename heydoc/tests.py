@@ -0,0 +1,160 @@
+import io
+import json
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+import msgpack
+from doctors.tests import benchmark, best_time, report_benchmark
+from .parsers import FastJSONParser, MessagePackParser
+from .renderers import FastJSONRenderer, MessagePackRenderer
+
+PAYLOAD = {
+    "id": 7,
+    "fee": Decimal("200.50"),
+    "rating": 4.5,
+    "active": True,
+    "image": None,
+    "booked_day": date(2026, 3, 2),
+    "time_slot": time(9, 15, 0, 500),
+    "created": datetime(2026, 3, 2, 9, 15, 5, 123456, tzinfo=timezone.utc),
+    "updated": datetime(2026, 3, 2, 9, 15, tzinfo=timezone(timedelta(hours=5.5))),
+    "duration": timedelta(minutes=15),
+    "token": uuid.UUID(int=5),
+    "message": gettext_lazy("Booked"),
+    "note": "Dr. Zo\u00eb\u2028line\u2029para \U0001f489",
+    "reference": 2**63 - 1,
+    "counts": {1: "one", "two": [1, 2.0, "3"]},
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertRendersLikeDRF(self, data, accepted_media_type=None, **attrs):
+        fast, drf = FastJSONRenderer(), JSONRenderer()
+        for renderer in (fast, drf):
+            for name, value in attrs.items():
+                setattr(renderer, name, value)
+        self.assertEqual(
+            fast.render(data, accepted_media_type),
+            drf.render(data, accepted_media_type),
+        )
+
+    def test_renders_the_same_bytes_as_drf(self):
+        self.assertRendersLikeDRF(PAYLOAD)
+        self.assertRendersLikeDRF([PAYLOAD, {"nested": [PAYLOAD]}])
+        self.assertRendersLikeDRF(None)
+        self.assertRendersLikeDRF("")
+
+    def test_integers_orjson_cannot_encode_fall_back_to_drf(self):
+        self.assertRendersLikeDRF({"reference": 2**64, "negative": -(2**70)})
+
+    def test_escapes_line_and_paragraph_separators(self):
+        rendered = FastJSONRenderer().render({"note": "a\u2028b\u2029c"})
+        self.assertEqual(rendered, b'{"note":"a\\u2028b\\u2029c"}')
+
+    def test_indented_ascii_and_non_compact_output_fall_back_to_drf(self):
+        self.assertRendersLikeDRF(PAYLOAD, "application/json; indent=4")
+        self.assertRendersLikeDRF(PAYLOAD, ensure_ascii=True)
+        self.assertRendersLikeDRF(PAYLOAD, compact=False)
+
+
+@benchmark
+class FastJSONRendererBenchmark(SimpleTestCase):
+    rows = 10_000
+
+    def test_renders_faster_than_drf(self):
+        # one page of booking rows as the values serializers render them
+        data = [
+            {
+                "id": n,
+                "booked_day": date(2026, 3, 2) + timedelta(days=n // 20),
+                "time_slot": time(9, 15 * (n % 4)),
+                "amount": Decimal("200.00"),
+                "booking_status": "Booked",
+                "consultation_mode": "Offline",
+                "patient": {"id": n % 20, "name": f"Patient {n % 20}", "age": 40},
+            }
+            for n in range(self.rows)
+        ]
+        fast, drf = FastJSONRenderer(), JSONRenderer()
+        self.assertEqual(fast.render(data), drf.render(data))
+        fast_rate = self.rows / best_time(lambda: fast.render(data))
+        drf_rate = self.rows / best_time(lambda: drf.render(data))
+        report_benchmark("JSONRenderer", drf_rate, "rows/s")
+        report_benchmark("FastJSONRenderer", fast_rate, "rows/s")
+        self.assertGreater(fast_rate, drf_rate * 2)
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), "application/json")
+
+    def assertParsesLikeDRF(self, body):
+        expected = self.parse(JSONParser(), body)
+        parsed = self.parse(FastJSONParser(), body)
+        self.assertEqual(parsed, expected)
+        self.assertEqual(repr(parsed), repr(expected))
+
+    def test_parses_like_drf(self):
+        self.assertParsesLikeDRF(FastJSONRenderer().render(PAYLOAD))
+        self.assertParsesLikeDRF(
+            '{"note": "caf\\u00e9 \\u2028 \\ud83d\\udc89"}'.encode()
+        )
+        self.assertParsesLikeDRF(b'[1, 2.5, -0.0, 1e3, true, null, ""]')
+
+    def test_long_integers_stay_integers(self):
+        for number in (
+            b"9223372036854775807",
+            b"18446744073709551616",
+            b"-123456789012345678901234567890",
+            b"1234567890123456789.5",
+        ):
+            with self.subTest(number=number):
+                self.assertParsesLikeDRF(b'{"amount": ' + number + b"}")
+        amount = self.parse(FastJSONParser(), b'{"amount": 18446744073709551616}')
+        self.assertEqual(amount, {"amount": 2**64})
+
+    def test_invalid_json_raises_drf_parse_error(self):
+        for body in (b'{"amount": }', b"", b"\xff"):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as raised:
+                    self.parse(FastJSONParser(), body)
+                self.assertEqual(str(raised.exception), str(expected.exception))
+
+
+class MessagePackTests(SimpleTestCase):
+    def test_renders_the_data_json_renders(self):
+        # MessagePack keeps integer keys, which JSON turns into strings.
+        data = {name: value for name, value in PAYLOAD.items() if name != "counts"}
+        packed = MessagePackRenderer().render(data)
+        self.assertEqual(
+            msgpack.unpackb(packed, raw=False),
+            json.loads(FastJSONRenderer().render(data)),
+        )
+        self.assertEqual(MessagePackRenderer().render(None), b"")
+
+    def test_parses_what_it_renders(self):
+        data = {"patient": "Pat", "amount": "200.50", "slots": ["09:00", "09:15"]}
+        parsed = MessagePackParser().parse(
+            io.BytesIO(MessagePackRenderer().render(data))
+        )
+        self.assertEqual(parsed, data)
+
+    def test_timestamps_are_parsed_as_aware_datetimes(self):
+        created = datetime(2026, 3, 2, 9, 15, tzinfo=timezone.utc)
+        parsed = MessagePackParser().parse(
+            io.BytesIO(msgpack.packb({"created": created}, datetime=True))
+        )
+        self.assertEqual(parsed, {"created": created})
+
+    def test_invalid_body_raises_parse_error(self):
+        for body in (b"\xc1", b"\x92\x01", b""):
+            with self.subTest(body=body):
+                with self.assertRaisesMessage(ParseError, "MessagePack parse error"):
+                    MessagePackParser().parse(io.BytesIO(body))
@@ -0,0 +1,207 @@
+"""
+Read-only serializers rendering ``.values()`` rows.
+
+A ``ValuesSerializer`` reproduces the output of a DRF serializer without
+building model instances or running the field machinery per row. The
+fields, their order and their formatting are taken from the DRF serializer
+(including a ``SparseFieldset``), nested serializers become joins in the
+same ``.values()`` query, and many-to-many fields are read with one query
+per field for the whole page::
+
+    values = BookingValuesSerializer(sparse=sparse)
+    rows = values.values(Booking.objects.filter(...))
+    values.render(rows)
+
+Whatever a DRF serializer adds in a custom ``to_representation`` has to be
+declared on its ``ValuesSerializer`` with ``sources`` and ``exclude``.
+"""
+
+from collections import defaultdict
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import ManyRelatedField
+from rest_framework.settings import api_settings
+
+# DRF fields whose output is the database value itself.
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+)
+
+
+class ValuesSerializer:
+    # the DRF serializer whose output is reproduced
+    serializer_class = None
+    # output field -> values() lookup, for fields a custom to_representation replaces
+    sources = {}
+    # output fields a custom to_representation drops
+    exclude = ()
+    # nested field -> ValuesSerializer subclass rendering it
+    nested = {}
+
+    def __init__(self, sparse=None, context=None, serializer=None, prefix=""):
+        self.context = context or {}
+        if serializer is None:
+            kwargs = {"sparse": sparse} if sparse is not None else {}
+            serializer = self.serializer_class(context=self.context, **kwargs)
+        self.model = serializer.Meta.model
+        self.prefix = prefix
+        self.lookups = []
+        self.entries = []
+        for name, field in serializer.fields.items():
+            if not field.write_only and name not in self.exclude:
+                self.entries.append(self._entry(name, field))
+
+    def values(self, queryset, *required):
+        """``queryset`` as ``.values()`` rows, with the ``required`` lookups too."""
+        return queryset.values(*dict.fromkeys([*self.lookups, *required]))
+
+    def render(self, rows):
+        """The serializer output for ``rows`` from ``values()``."""
+        rows = list(rows)
+        related = {
+            entry: self._many_related(entry, rows) for entry in self._many_entries()
+        }
+        return [self._represent(row, related) for row in rows]
+
+    def _lookup(self, lookup):
+        lookup = self.prefix + lookup
+        self.lookups.append(lookup)
+        return lookup
+
+    def _model_field(self, name, field):
+        try:
+            return self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__}.{name} does not read a field of "
+                f"{self.model.__name__}; declare it in sources."
+            )
+
+    def _entry(self, name, field):
+        if name in self.sources:
+            return name, "value", self._lookup(self.sources[name]), None
+        model_field = self._model_field(name, field)
+        if isinstance(field, ManyRelatedField):
+            return name, "many", self._lookup("pk"), model_field
+        if isinstance(field, serializers.ListSerializer):
+            raise ImproperlyConfigured(
+                f"{type(self).__name__}.{name}: nested lists are not supported."
+            )
+        if isinstance(field, serializers.BaseSerializer):
+            nested_class = self.nested.get(name, ValuesSerializer)
+            nested = nested_class(
+                context=self.context,
+                serializer=field,
+                prefix=f"{self.prefix}{model_field.name}__",
+            )
+            self.lookups += nested.lookups
+            return name, "nested", self._lookup(model_field.attname), nested
+        lookup, converter = self._read(field, model_field)
+        return name, "value", self._lookup(lookup), converter
+
+    def _read(self, field, model_field):
+        """
+        The ``values()`` lookup of ``field`` and a function formatting a
+        non-null value as ``field`` would, or None when it is used as is.
+        """
+        if not model_field.is_relation:
+            return model_field.name, self._converter(field, model_field)
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            lookup = model_field.attname
+            if not model_field.target_field.primary_key:
+                lookup = f"{model_field.name}__pk"
+            converter = field.pk_field.to_representation if field.pk_field else None
+            return lookup, converter
+        if isinstance(field, serializers.SlugRelatedField):
+            if field.slug_field == model_field.target_field.name:
+                return model_field.attname, None
+            return f"{model_field.name}__{field.slug_field}", None
+        if isinstance(field, serializers.ReadOnlyField):
+            return model_field.attname, None
+        raise ImproperlyConfigured(
+            f"{type(self).__name__}.{field.field_name}: {type(field).__name__} "
+            "is not supported; declare it in sources."
+        )
+
+    def _converter(self, field, model_field):
+        if isinstance(field, serializers.FileField):
+            return self._file_converter(field, model_field)
+        if isinstance(field, (serializers.DateField, serializers.TimeField)):
+            default = (
+                api_settings.DATE_FORMAT
+                if isinstance(field, serializers.DateField)
+                else api_settings.TIME_FORMAT
+            )
+            output_format = getattr(field, "format", default)
+            if output_format is None:
+                return None
+            if output_format.lower() == ISO_8601:
+                return _isoformat
+        if isinstance(field, IDENTITY_FIELDS):
+            return None
+        return field.to_representation
+
+    def _file_converter(self, field, model_field):
+        storage = model_field.storage
+        request = self.context.get("request")
+        if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+            return lambda name: name or None
+
+        def url(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return url
+
+    def _many_entries(self):
+        for entry in self.entries:
+            if entry[1] == "many":
+                yield entry
+            elif entry[1] == "nested":
+                yield from entry[3]._many_entries()
+
+    def _many_related(self, entry, rows):
+        """Related primary keys of a many-to-many field, by owner pk."""
+        _, _, owner_lookup, model_field = entry
+        owners = {row[owner_lookup] for row in rows} - {None}
+        related = defaultdict(list)
+        if not owners:
+            return related
+        through = model_field.remote_field.through
+        owner = model_field.m2m_field_name()
+        target = model_field.m2m_reverse_field_name()
+        ordering = [
+            f"-{target}__{field[1:]}" if field.startswith("-") else f"{target}__{field}"
+            for field in model_field.related_model._meta.ordering
+        ] or ["pk"]
+        pairs = (
+            through.objects.filter(**{f"{owner}__in": owners})
+            .order_by(*ordering)
+            .values_list(owner, target)
+        )
+        for owner_pk, target_pk in pairs:
+            related[owner_pk].append(target_pk)
+        return related
+
+    def _represent(self, row, related):
+        ret = {}
+        for name, kind, key, payload in self.entries:
+            value = row[key]
+            if kind == "many":
+                ret[name] = related[(name, kind, key, payload)].get(value, [])
+            elif value is None:
+                ret[name] = None
+            elif kind == "nested":
+                ret[name] = payload._represent(row, related)
+            else:
+                ret[name] = value if payload is None else payload(value)
+        return ret
+
+
+def _isoformat(value):
+    return value.isoformat()
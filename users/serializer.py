@@ -8,6 +8,8 @@ from doctors.models import Doctor, Booking, Patient
 from adminapp.serializer import DepartmentSerializer
 from doctors.serializer import AvailabilitySerializer
 from adminapp.models import Department
+from heydoc.serializers import SparseFieldsMixin
+from heydoc.values import ValuesSerializer
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -50,7 +52,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
-class DoctorsViewSerializer(serializers.ModelSerializer):
+class DoctorsViewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer()
 
     class Meta:
@@ -66,6 +68,10 @@ class DoctorsViewSerializer(serializers.ModelSerializer):
         ]
 
 
+class DoctorsViewValuesSerializer(ValuesSerializer):
+    serializer_class = DoctorsViewSerializer
+
+
 class DoctorRecieptSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
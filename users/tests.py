@@ -1,3 +1,651 @@
+import gzip
+import json
+import random
+from datetime import time, timedelta
+from decimal import Decimal
+from time import sleep
+from unittest import mock, skipUnless
+import msgpack
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from doctors.holds import hold_slot
+from doctors.search import _search_fallback, search_doctors
+from doctors.models import (
+    Availability,
+    Booking,
+    DailyBookedSlots,
+    Doctor,
+    LeaveApplication,
+    MorningSlot,
+)
+from doctors.tests import ClinicData, benchmark, best_time, report_benchmark
+from doctors.utils import build_calendar, earliest_slots
+from heydoc.renderers import FastJSONRenderer
+from heydoc.serializers import SparseFieldset
+from .models import CustomUser
+from .serializer import DoctorsViewSerializer, DoctorsViewValuesSerializer
 
-# Create your tests here.
+
+class BookingViewTests(ClinicData, TestCase):
+    url = "/api/users/booking/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.other_doctor = cls.create_doctor("Bob Bone")
+        cls.other_patient = cls.create_patient("Pam")
+
+    def test_lists_future_booked_slots_of_the_doctor(self):
+        day = self.next_working_day()
+        self.book(self.doctor, self.patient, day, time(9, 30))
+        self.book(self.doctor, self.other_patient, day, time(9, 0))
+        self.book(
+            self.doctor, self.patient, day, time(10, 0), booking_status="cancelled"
+        )
+        self.book(self.doctor, self.patient, self.today - timedelta(days=3), time(9, 0))
+        self.book(self.other_doctor, self.patient, day, time(11, 0))
+
+        response = self.client.get(self.url, {"doc_id": self.doctor.doc_id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["slots"], {str(day): [time(9, 0), time(9, 30)]})
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        params = {"doc_id": self.doctor.doc_id}
+        self.book(self.doctor, self.patient, self.next_working_day(), time(9, 0))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, params)
+
+        # Past bookings of this doctor and any booking of other doctors must
+        # not be read, however many there are.
+        for n in range(120):
+            self.book(
+                self.doctor,
+                self.patient,
+                self.today - timedelta(days=n + 1),
+                time(9, 0),
+            )
+            self.book(
+                self.other_doctor,
+                self.patient,
+                self.today + timedelta(days=n),
+                time(9, 0),
+            )
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(self.url, params)
+        self.assertEqual(len(response.data["slots"]), 1)
+
+
+@benchmark
+class BookingViewBenchmark(ClinicData, TestCase):
+    url = "/api/users/booking/"
+    scales = (1_000, 10_000, 100_000, 1_000_000)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.doctors = [cls.doctor]
+        cls.doctors += [cls.create_doctor(f"Doctor {n}") for n in range(49)]
+        cls.slots = MorningSlot().generate_slot()
+        cls.patients = [cls.create_patient(f"Patient {n}") for n in cls.slots]
+        cls.book(cls.doctor, cls.patient, cls.today + timedelta(days=1), time(9, 0))
+        cls.book(cls.doctor, cls.patient, cls.today + timedelta(days=2), time(9, 30))
+
+    def add_bookings(self, start, stop):
+        """
+        Bookings ``start`` to ``stop`` of a full morning for every doctor on
+        one day after another: past days for the benchmarked doctor, past and
+        upcoming days for the others.
+        """
+        full_mask = MorningSlot().full_mask()
+        bookings, days = [], []
+        for n in range(start, stop):
+            wave, slot = divmod(n, len(self.slots))
+            wave, doctor = divmod(wave, len(self.doctors))
+            doctor = self.doctors[doctor]
+            ahead = doctor != self.doctor and wave % 2
+            offset = timedelta(days=wave + 3)
+            booked_day = self.today + offset if ahead else self.today - offset
+            if slot == 0:
+                days.append(
+                    DailyBookedSlots(
+                        doctor=doctor, booked_day=booked_day, morning_mask=full_mask
+                    )
+                )
+            bookings.append(
+                Booking(
+                    doctor=doctor,
+                    patient=self.patients[slot],
+                    booked_by=self.user,
+                    booked_day=booked_day,
+                    time_slot=self.slots[slot],
+                    slot="Morning",
+                    amount=Decimal("200.00"),
+                    payment_mode="Razor Pay",
+                )
+            )
+        Booking.objects.bulk_create(bookings, batch_size=5000)
+        DailyBookedSlots.objects.bulk_create(days, batch_size=5000)
+
+    def test_latency_does_not_grow_with_bookings(self):
+        params = {"doc_id": self.doctor.doc_id}
+        seeded, timings, queries, slots = 0, {}, set(), []
+        for scale in self.scales:
+            self.add_bookings(seeded, scale)
+            seeded = scale
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(self.url, params)
+            queries.add(len(captured))
+            slots.append(response.data["slots"])
+            timings[scale] = best_time(lambda: self.client.get(self.url, params))
+            report_benchmark(
+                f"BookingView, {scale:,} bookings", timings[scale] * 1000, "ms"
+            )
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(slots, [slots[0]] * len(self.scales))
+        self.assertLess(timings[self.scales[-1]], timings[self.scales[0]] * 2)
+
+
+class AvailabilityCalendarViewTests(ClinicData, TestCase):
+    url = "/api/users/availability_calendar/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+
+    def test_booked_slots_and_leave_are_not_free(self):
+        day = self.next_working_day()
+        leave_day = self.next_working_day(after=(day - self.today).days)
+        self.book(self.doctor, self.patient, day, time(9, 15))
+        LeaveApplication.objects.create(
+            doctor=self.doctor,
+            leave_start_date=leave_day,
+            leave_end_date=leave_day,
+            reason="Conference",
+        )
+
+        calendar = build_calendar([self.doctor.doc_id], day, 7)[self.doctor.doc_id]
+
+        dates = [entry["date"] for entry in calendar]
+        self.assertEqual(dates[0], day)
+        self.assertNotIn(leave_day, dates)
+        self.assertEqual(len(dates), 5)
+        self.assertEqual(calendar[0]["free_slots"][:2], [time(9, 0), time(9, 30)])
+        self.assertEqual(len(calendar[1]["free_slots"]), 16)
+
+    def test_query_count_does_not_depend_on_the_number_of_days(self):
+        params = {"doc_id": self.doctor.doc_id, "days": 7}
+        self.book(self.doctor, self.patient, self.next_working_day(), time(9, 0))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(self.url, {**params, "days": 60})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.data["calendar"]), 45)
+
+
+class EarliestSlotsViewTests(ClinicData, TestCase):
+    url = "/api/users/earliest_slots/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.other_doctor = cls.create_doctor("Bob Bone")
+
+    def test_earliest_free_slots_across_the_department(self):
+        day = self.next_working_day()
+        self.book(self.doctor, self.patient, day, time(9, 0))
+        doctors = Doctor.objects.filter(department=self.department)
+
+        slots = earliest_slots(doctors, day, 7, 3)
+
+        self.assertEqual(
+            [(slot["doc_id"], slot["date"], slot["time_slot"]) for slot in slots],
+            [
+                (self.other_doctor.doc_id, day, time(9, 0)),
+                *sorted(
+                    [
+                        (self.doctor.doc_id, day, time(9, 15)),
+                        (self.other_doctor.doc_id, day, time(9, 15)),
+                    ]
+                ),
+            ],
+        )
+
+    def test_online_consultations_only_use_online_days(self):
+        day = self.next_working_day()
+        Availability.objects.filter(
+            doctor=self.other_doctor, day_of_week=day.strftime("%A")
+        ).update(online_consultation=True)
+        doctors = Doctor.objects.filter(department=self.department)
+
+        slots = earliest_slots(doctors, day, 7, 20, "Online")
+
+        self.assertEqual(
+            {(slot["doc_id"], slot["date"]) for slot in slots},
+            {(self.other_doctor.doc_id, day)},
+        )
+
+    def test_query_count_does_not_grow_with_doctors(self):
+        department = self.create_department("Neurology")
+        self.create_doctor("Nora Nerve", department)
+        params = {"department": department.dept_id, "limit": 20}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+
+        for n in range(300):
+            doctor = self.create_doctor(f"Neuro {n}", department)
+            self.book(doctor, self.patient, self.next_working_day(), time(9, 0))
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["slots"]), 20)
+
+
+class ScheduleETagTests(ClinicData, TestCase):
+    url = "/api/users/booking/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+
+    def test_lapsed_hold_changes_the_etag(self):
+        day = self.next_working_day()
+        params = {"doc_id": self.doctor.doc_id}
+        with self.captureOnCommitCallbacks(execute=True):
+            hold_slot(self.doctor.doc_id, day, time(9, 0), "someone", ttl=1)
+        response = self.client.get(self.url, params)
+        etag = response["ETag"]
+        self.assertEqual(response.data["slots"], {str(day): [time(9, 0)]})
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        sleep(1.1)
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["slots"], {})
+
+    def test_leave_changes_the_etag(self):
+        url = "/api/users/availability_calendar/"
+        params = {"doc_id": self.doctor.doc_id, "days": 14}
+        response = self.client.get(url, params)
+        etag, entries = response["ETag"], len(response.data["calendar"])
+        leave_day = self.next_working_day(after=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            leave = LeaveApplication.objects.create(
+                doctor=self.doctor,
+                leave_start_date=leave_day,
+                leave_end_date=leave_day,
+                reason="Conference",
+            )
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["calendar"]), entries - 1)
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.delete()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["calendar"]), entries)
+
+    def test_removed_availability_changes_the_etag(self):
+        params = {"doc_id": self.doctor.doc_id}
+        etag = self.client.get(self.url, params)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Availability.objects.filter(
+                doctor=self.doctor, day_of_week="Monday"
+            ).delete()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Monday", response.data["days_available"])
+
+    def test_etag_changes_when_a_slot_starts(self):
+        params = {"doc_id": self.doctor.doc_id}
+        start = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0)
+        etags = []
+        for minutes in (0, 14, 15):
+            with mock.patch(
+                "django.utils.timezone.now",
+                return_value=start + timedelta(minutes=minutes, seconds=30),
+            ):
+                etags.append(self.client.get(self.url, params)["ETag"])
+
+        self.assertEqual(etags[0], etags[1])
+        self.assertNotEqual(etags[1], etags[2])
+
+
+class DepartmentsViewTests(ClinicData, TestCase):
+    url = "/api/users/departments/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        for n in range(3):
+            department = cls.create_department(f"Department {n}")
+            for m in range(10):
+                cls.create_doctor(f"Doctor {n}-{m}", department)
+
+    def test_directory_is_two_queries_then_cached(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data["departments"]), 4)
+        self.assertEqual(len(response.data["doctors"]), 31)
+        self.assertEqual(
+            sorted(
+                len(department["doctors"])
+                for department in response.data["departments"]
+            ),
+            [1, 10, 10, 10],
+        )
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_doctor_changes_refresh_the_directory(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.name = "Alice Aorta"
+            self.doctor.save()
+
+        response = self.client.get(self.url)
+
+        self.assertIn(
+            "Alice Aorta", [doctor["name"] for doctor in response.data["doctors"]]
+        )
+
+
+class DoctorSearchViewTests(ClinicData, TestCase):
+    url = "/api/users/doctors/search/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.doctor.description = "Interventional cardiologist"
+        cls.doctor.save()
+        neurology = cls.create_department("Neurology")
+        cls.neurologist = cls.create_doctor(
+            "Nora Nerve", neurology, description="Treats heart-related strokes"
+        )
+        cls.create_doctor("Ian Inactive", account_activated=False)
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [doctor["name"] for doctor in response.data["doctors"]]
+
+    def test_ranks_name_and_department_above_description(self):
+        self.assertEqual(self.search("cardio"), ["Alice Heart"])
+        self.assertEqual(self.search("heart"), ["Alice Heart", "Nora Nerve"])
+        self.assertEqual(self.search("nora neuro"), ["Nora Nerve"])
+        self.assertEqual(self.search("heart", department="Neurology"), ["Nora Nerve"])
+
+    def test_index_follows_doctor_changes(self):
+        self.neurologist.name = "Nora Brain"
+        self.neurologist.save()
+        self.assertEqual(self.search("brain"), ["Nora Brain"])
+        self.assertEqual(self.search("nerve"), [])
+
+    @skipUnless(connection.vendor == "postgresql", "trigram matching needs pg_trgm")
+    def test_misspelt_names_match_on_postgresql(self):
+        self.assertEqual(self.search("Alise Hart"), ["Alice Heart"])
+
+
+@benchmark
+class DoctorSearchBenchmark(ClinicData, TestCase):
+    doctors = 10_000
+    url = "/api/users/doctors/search/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        chance = random.Random(20)
+        first = ["Alice", "Bob", "Chen", "Dana", "Emil", "Farah", "Gita", "Hugo"]
+        last = ["Heart", "Bone", "Nerve", "Skin", "Lung", "Kidney", "Eye", "Blood"]
+        specialities = [
+            "Interventional cardiology and heart failure",
+            "Sports injuries and joint replacement",
+            "Stroke, epilepsy and migraine",
+            "Eczema, acne and skin allergies",
+            "Asthma and sleep apnoea",
+        ]
+        departments = [cls.department] + [
+            cls.create_department(name)
+            for name in ("Orthopaedics", "Neurology", "Dermatology", "Pulmonology")
+        ]
+        for n in range(cls.doctors - 1):
+            cls.create_doctor(
+                f"{chance.choice(first)} {chance.choice(last)} {n}",
+                chance.choice(departments),
+                description=chance.choice(specialities),
+            )
+
+    def test_search_latency(self):
+        queries = {
+            "common term": {"q": "heart"},
+            "name prefix": {"q": "farah kid"},
+            "with filters": {"q": "migraine", "department": "Neurology"},
+        }
+        for name, params in queries.items():
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["doctors"]), 20)
+            seconds = best_time(lambda: self.client.get(self.url, params))
+            report_benchmark(f"doctor search, {name}", seconds * 1000, "ms")
+            self.assertLess(seconds, 0.1)
+
+        doctors = Doctor.objects.filter(active=True, account_activated=True)
+        indexed = best_time(lambda: search_doctors("farah kid", doctors, 20))
+        scanned = best_time(lambda: _search_fallback(["farah", "kid"], doctors, 20))
+        report_benchmark("doctor search, name prefix, index", indexed * 1000, "ms")
+        report_benchmark("doctor search, name prefix, scan", scanned * 1000, "ms")
+        self.assertLess(indexed, scanned)
+
+
+class DoctorsViewValuesSerializerTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.doctor.doc_image = "doc_images/alice.jpg"
+        cls.doctor.is_HOD = True
+        cls.doctor.save()
+        cls.create_doctor("Bob Bone", description="Orthopaedics")
+
+    def assertRendersLikeSerializer(self, sparse=None):
+        doctors = Doctor.objects.order_by("doc_id")
+        values = DoctorsViewValuesSerializer(sparse=sparse)
+        expected = DoctorsViewSerializer(doctors, many=True, sparse=sparse).data
+        renderer = FastJSONRenderer()
+        self.assertEqual(
+            renderer.render(values.render(values.values(doctors))),
+            renderer.render(expected),
+        )
+
+    def test_renders_like_the_model_serializer(self):
+        self.assertRendersLikeSerializer()
+
+    def test_renders_sparse_fieldsets_like_the_model_serializer(self):
+        self.assertRendersLikeSerializer(
+            SparseFieldset.from_names(["name", "fee", "department"])
+        )
+        self.assertRendersLikeSerializer(
+            SparseFieldset.from_names(["doc_image", "department.dept_name"])
+        )
+
+
+class AppointmentsListViewTests(ClinicData, TestCase):
+    url = "/api/users/appointment_list/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        other_patient = cls.create_patient("Pam")
+        day = cls.today + timedelta(days=1)
+        cls.upcoming = [
+            cls.book(cls.doctor, cls.patient, cls.today, time(11, 0)),
+            cls.book(cls.doctor, other_patient, day, time(9, 0)),
+            cls.book(cls.doctor, cls.patient, day, time(10, 0)),
+            cls.book(
+                cls.doctor,
+                cls.patient,
+                day + timedelta(days=1),
+                time(9, 0),
+                booking_status="Cancelled",
+            ),
+        ]
+        past = cls.today - timedelta(days=1)
+        history = [
+            cls.book(cls.doctor, cls.patient, past, time(9, 0)),
+            cls.book(cls.doctor, other_patient, past, time(9, 30)),
+        ]
+        history += [
+            cls.book(cls.doctor, cls.patient, past - timedelta(days=n), time(9, 0))
+            for n in range(1, 6)
+        ]
+        cls.history = sorted(
+            history, key=lambda booking: (booking.booked_day, booking.id), reverse=True
+        )
+        stranger = CustomUser.objects.create(
+            username="stranger", email="stranger@example.com", phone="300"
+        )
+        cls.book(cls.doctor, cls.create_patient("Sam", stranger), day, time(11, 0))
+        cls.book(cls.doctor, cls.create_patient("Sue", stranger), past, time(11, 0))
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_lists_upcoming_appointments_in_order(self):
+        with self.assertNumQueries(1):
+            data = self.get(user=self.user.id)
+        self.assertEqual(
+            [row["id"] for row in data["data"]],
+            [booking.id for booking in self.upcoming],
+        )
+        self.assertNotIn("next", data)
+        self.assertEqual(
+            data["data"][0]["doctor_info"],
+            {"doc_name": "Alice Heart", "department": "Cardiology"},
+        )
+        self.assertEqual(data["data"][-1]["booking_status"], "Cancelled")
+
+    def test_pages_through_the_history_newest_first(self):
+        url = f"{self.url}?user={self.user.id}&history=true&page_size=3"
+        pages, queries = [], set()
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                data = self.get(url)
+            queries.add(len(captured))
+            pages.append([row["id"] for row in data["data"]])
+            url = data["next"]
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), [booking.id for booking in self.history])
+        self.assertEqual(queries, {1})
+
+        previous = self.get(data["previous"])
+        self.assertEqual([row["id"] for row in previous["data"]], pages[1])
+
+    def test_requires_a_user_with_bookings(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "User parameter is required"})
+
+        nobody = CustomUser.objects.create(
+            username="nobody", email="nobody@example.com", phone="400"
+        )
+        response = self.client.get(self.url, {"user": nobody.id})
+        self.assertEqual(response.status_code, 404)
+
+
+class MessagePackViewTests(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        cls.user.set_password("secret")
+        cls.user.save()
+
+    def test_renders_msgpack_when_accepted(self):
+        url = "/api/users/departments/"
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertIn("Accept", response["Vary"])
+
+        data = msgpack.unpackb(response.content, raw=False)
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("Accept", response["Vary"])
+        self.assertEqual(data, json.loads(response.content))
+
+    def test_parses_msgpack_bodies(self):
+        response = self.client.post(
+            "/api/users/login/",
+            msgpack.packb({"email": "patient@example.com", "password": "secret"}),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(data["data"]["user"]["user_id"], self.user.id)
+
+    def test_invalid_msgpack_body_is_a_bad_request(self):
+        response = self.client.post(
+            "/api/users/login/", b"\xc1", content_type="application/msgpack"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("MessagePack parse error", response.json()["detail"])
+
+
+@benchmark
+class MessagePackBenchmark(ClinicData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_clinic()
+        for n in range(200):
+            cls.create_doctor(f"Doctor {n}", description="General medicine")
+        cls.seed_bookings(cls.doctor, 500)
+
+    def test_msgpack_is_smaller_than_json_and_decodes_as_fast(self):
+        views = {
+            "BookingView": ("/api/users/booking/", {"doc_id": self.doctor.doc_id}),
+            "AppointmentsListView": (
+                "/api/users/appointment_list/",
+                {"user": self.user.id},
+            ),
+            "DoctorsView": ("/api/users/doctors/", {}),
+        }
+        for name, (url, params) in views.items():
+            with self.subTest(view=name):
+                body = self.client.get(url, params, HTTP_ACCEPT="application/json")
+                packed = self.client.get(url, params, HTTP_ACCEPT="application/msgpack")
+                body, packed = body.content, packed.content
+                self.assertEqual(msgpack.unpackb(packed, raw=False), json.loads(body))
+
+                report_benchmark(f"{name}, JSON", len(body), "bytes")
+                report_benchmark(f"{name}, MessagePack", len(packed), "bytes")
+                for label, content in (("JSON", body), ("MessagePack", packed)):
+                    size = len(gzip.compress(content))
+                    report_benchmark(f"{name}, {label} gzipped", size, "bytes")
+                json_decode = best_time(lambda: json.loads(body), runs=20)
+                packed_decode = best_time(
+                    lambda: msgpack.unpackb(packed, raw=False), runs=20
+                )
+                report_benchmark(f"{name}, JSON decode", json_decode * 1000, "ms")
+                report_benchmark(
+                    f"{name}, MessagePack decode", packed_decode * 1000, "ms"
+                )
+                self.assertLess(len(packed), len(body))
@@ -1,16 +1,23 @@
 from django.urls import path
 from users import views
 
-
 urlpatterns = [
     path("register/", views.Register.as_view(), name="register"),
     path("login/", views.LoginView.as_view(), name="login"),
     path("logout/", views.LogoutView.as_view(), name="login"),
     path("doctors/", views.DoctorsView.as_view(), name="doctors"),
+    path("doctors/search/", views.DoctorSearchView.as_view(), name="doctor_search"),
     path("booking/", views.BookingView.as_view(), name="booking"),
+    path(
+        "availability_calendar/",
+        views.AvailabilityCalendarView.as_view(),
+        name="availability_calendar",
+    ),
+    path("earliest_slots/", views.EarliestSlotsView.as_view(), name="earliest_slots"),
     path("patient_form/", views.PatientForm.as_view(), name="patient_form"),
     path("profile/", views.ProfileView.as_view(), name="profile"),
     path("checkout/", views.CheckoutView.as_view(), name="checkout"),
+    path("slot_hold/", views.SlotHoldView.as_view(), name="slot_hold"),
     path(
         "appointment_list/",
         views.AppointmentsListView.as_view(),
@@ -5,6 +5,7 @@ from .models import CustomUser, OTP
 from .serializer import (
     CustomUserSerializer,
     DoctorsViewSerializer,
+    DoctorsViewValuesSerializer,
     PatientFormSerializer,
 )
 from rest_framework import status
@@ -29,6 +30,7 @@ from doctors.models import (
     Booking,
     Report,
     Notification,
+    DailyBookedSlots,
 )
 from adminapp.serializer import DoctorSerializer, DepartmentSerializer
 from doctors.serializer import AvailabilitySerializer, ReportSerializer
@@ -41,10 +43,26 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from adminapp.models import Department
 from doctors.tasks import send_mail_task, send_sms_task
+from doctors.utils import (
+    build_calendar,
+    earliest_slots,
+    slot_masks,
+    MAX_CALENDAR_DAYS,
+)
+from doctors.holds import hold_slot, release_hold
+from doctors.booking import create_booking, SlotUnavailable
+from doctors.search import search_doctors, search_terms
+from doctors.versions import schedule_etag
+from heydoc.conditional import etag
+from heydoc.pagination import KeysetPagination
+from heydoc.serializers import SparseFieldset
+from doctors.snapshots import DIRECTORY_SCOPE, cached_snapshot
+from django.utils.cache import patch_cache_control
 import os
 from datetime import datetime
 from collections import defaultdict
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import Exists, OuterRef, Q
 
 
 # Create your views here.
@@ -135,28 +153,97 @@ class DoctorsView(APIView):
     def get(self, request):
         try:
 
-            doctors = Doctor.objects.select_related("department").filter(
-                active=True, department__is_active=True, account_activated=True
+            values = DoctorsViewValuesSerializer(
+                sparse=SparseFieldset.from_request(request)
+            )
+            doctors = values.values(
+                Doctor.objects.filter(
+                    active=True, department__is_active=True, account_activated=True
+                )
             )
-            serializer = DoctorsViewSerializer(doctors, many=True)
             departments = Department.objects.all().values_list("dept_name", flat=True)
 
             return Response(
                 {
                     "message": "Doctors Information Successfully retrieved!",
-                    "doctors": serializer.data,
+                    "doctors": values.render(doctors),
                     "departments": departments,
                 },
                 status=status.HTTP_200_OK,
             )
 
-        except TokenError as e:
+        except (TokenError, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DoctorSearchView(APIView):
+    permission_class = IsAuthenticated
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        department = request.query_params.get("department")
+        min_fee = request.query_params.get("min_fee")
+        max_fee = request.query_params.get("max_fee")
+        try:
+            if not search_terms(query):
+                return Response(
+                    {"error": "A search term is required."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            limit = int(request.query_params.get("limit", 20))
+            if not 0 < limit <= 50:
+                return Response(
+                    {"error": "limit must be between 1 and 50."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            doctors = Doctor.objects.filter(
+                active=True, department__is_active=True, account_activated=True
+            )
+            if department:
+                doctors = doctors.filter(
+                    Q(department__dept_id=department)
+                    | Q(department__dept_name__iexact=department)
+                )
+            if min_fee:
+                doctors = doctors.filter(fee__gte=min_fee)
+            if max_fee:
+                doctors = doctors.filter(fee__lte=max_fee)
+            if request.query_params.get("online", "").lower() == "true":
+                doctors = doctors.filter(
+                    Exists(
+                        Availability.objects.filter(
+                            doctor=OuterRef("doc_id"),
+                            isAvailable=True,
+                            online_consultation=True,
+                        )
+                    )
+                )
+            ranked = search_doctors(query, doctors, limit)
+
+            sparse = SparseFieldset.from_request(request)
+            matches = sparse.project(
+                Doctor.objects.filter(pk__in=ranked), DoctorsViewSerializer
+            ).in_bulk()
+            serializer = DoctorsViewSerializer(
+                [matches[pk] for pk in ranked if pk in matches],
+                many=True,
+                sparse=sparse,
+            )
+            return Response(
+                {
+                    "message": "Doctors matching the search retrieved successfully",
+                    "doctors": serializer.data,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class BookingView(APIView):
     permission_class = IsAuthenticated
 
+    @etag(schedule_etag)
     def get(self, request):
         doc_id = request.query_params.get("doc_id")
         print(f"doc_id :{doc_id}")
@@ -172,17 +259,20 @@ class BookingView(APIView):
             slots = []
             all_slots = []
             time_slot = "Not Available"
-            booked_slots = Booking.objects.filter(booking_status="Booked").values(
-                "booked_day", "time_slot"
+            masks = slot_masks(
+                [doc_id],
+                timezone.now().date(),
+                holder=request.query_params.get("user"),
             )
 
-            slots = defaultdict(list)
-
-            for booking in booked_slots:
-                day = str(booking["booked_day"])
-                slots[day].append(booking["time_slot"])
-
-            slots = dict(slots)
+            if request.query_params.get("as_mask") == "true":
+                slots = {str(day): day_masks for (_, day), day_masks in masks.items()}
+            else:
+                slots = {
+                    str(day): MorningSlot().mask_to_slots(day_masks["morning"])
+                    + EveningSlot().mask_to_slots(day_masks["evening"])
+                    for (_, day), day_masks in masks.items()
+                }
             morning_slots = []
             evening_slots = []
 
@@ -216,6 +306,89 @@ class BookingView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AvailabilityCalendarView(APIView):
+    permission_class = IsAuthenticated
+
+    @etag(schedule_etag)
+    def get(self, request):
+        doc_id = request.query_params.get("doc_id")
+        try:
+            if not doc_id:
+                return Response(
+                    {"error": "Doctor ID is required."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            days = int(request.query_params.get("days", 14))
+            if not 0 < days <= MAX_CALENDAR_DAYS:
+                return Response(
+                    {"error": f"days must be between 1 and {MAX_CALENDAR_DAYS}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            calendar = build_calendar(
+                [doc_id],
+                timezone.now().date(),
+                days,
+                holder=request.query_params.get("user"),
+            )
+            return Response(
+                {
+                    "message": "Availability calendar retrieved successfully",
+                    "doc_id": doc_id,
+                    "calendar": calendar[doc_id],
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class EarliestSlotsView(APIView):
+    permission_class = IsAuthenticated
+
+    def get(self, request):
+        department = request.query_params.get("department")
+        consultation_mode = request.query_params.get("consultation_mode")
+        max_fee = request.query_params.get("max_fee")
+        try:
+            if not department:
+                return Response(
+                    {"error": "Department is required."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            days = int(request.query_params.get("days", 14))
+            limit = int(request.query_params.get("limit", 10))
+            if not 0 < days <= MAX_CALENDAR_DAYS or not 0 < limit <= 100:
+                return Response(
+                    {
+                        "error": f"days must be between 1 and {MAX_CALENDAR_DAYS} and limit between 1 and 100."
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            department = get_object_or_404(
+                Department,
+                Q(dept_id=department) | Q(dept_name__iexact=department),
+                is_active=True,
+            )
+            doctors = Doctor.objects.filter(
+                department=department, active=True, account_activated=True
+            )
+            if max_fee:
+                doctors = doctors.filter(fee__lte=max_fee)
+            slots = earliest_slots(
+                doctors, timezone.now().date(), days, limit, consultation_mode
+            )
+            return Response(
+                {
+                    "message": "Earliest available slots retrieved successfully",
+                    "department": department.dept_name,
+                    "slots": slots,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class PatientForm(APIView):
     permission_class = IsAuthenticated
 
@@ -303,23 +476,30 @@ class CheckoutView(APIView):
 
             doctor = get_object_or_404(Doctor, doc_id=doc_id)
 
+            if not hold_slot(doc_id, booked_day, time, booked_by):
+                return Response(
+                    {"error": "This slot is being booked by someone else."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
             serializer = BookingSerializer(data=request.data)
             if serializer.is_valid():
 
                 serializer.validated_data["slot"] = slot
                 serializer.validated_data["consultation_mode"] = consultation_mode
-                serializer.save()
-                if payment_status.lower() == "completed":
-                    patient = get_object_or_404(Patient, name=patient_name)
-                    if not patient.doctor.filter(id=doctor.id).exists():
-                        patient.doctor.add(doctor.id)
-                        print("doctor added")
-                        patient.save()
+                try:
+                    serializer.instance = create_booking(serializer.validated_data)
+                except SlotUnavailable as e:
+                    return Response(
+                        {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                finally:
+                    release_hold(doc_id, booked_day, time, booked_by)
 
                 subject = "Doctor Apointment Done successfully"
                 message = f"Dear {patient_name},Booking for Dr. {doctor.name} done successfully on {booked_day} at {time_slot}.Thank you for choosing us.Best Regards,Heydoc"
                 email_from = os.getenv("EMAIL_HOST_USER")
-                email_to = CustomUser.objects.get(id=booked_by).email
+                email_to = [serializer.instance.booked_by.email]
                 send_mail_task.delay(subject, message, email_from, email_to)
                 return Response(
                     {
@@ -333,6 +513,7 @@ class CheckoutView(APIView):
                     status=status.HTTP_201_CREATED,
                 )
             else:
+                release_hold(doc_id, booked_day, time, booked_by)
                 return Response(
                     {"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
                 )
@@ -341,6 +522,65 @@ class CheckoutView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class SlotHoldView(APIView):
+    permission_class = IsAuthenticated
+
+    def post(self, request):
+        doc_id = request.data.get("doctor")
+        booked_day = request.data.get("booked_day")
+        time_slot = request.data.get("time_slot")
+        booked_by = request.data.get("booked_by")
+        try:
+            if not all([doc_id, booked_day, time_slot, booked_by]):
+                return Response(
+                    {
+                        "error": "doctor, booked_day, time_slot and booked_by are required."
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            time = datetime.strptime(time_slot, "%H:%M:%S").time()
+            booked_slots = DailyBookedSlots.objects.filter(
+                doctor_id=doc_id, booked_day=booked_day
+            ).first()
+            if booked_slots and booked_slots.is_taken(time):
+                return Response(
+                    {
+                        "error": "This slot is already booked. Please choose another slot."
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not hold_slot(doc_id, booked_day, time, booked_by):
+                return Response(
+                    {"error": "This slot is being booked by someone else."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return Response(
+                {
+                    "message": "Slot held successfully",
+                    "expires_in": settings.SLOT_HOLD_TTL,
+                },
+                status=status.HTTP_201_CREATED,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def delete(self, request):
+        try:
+            time = datetime.strptime(request.data.get("time_slot"), "%H:%M:%S").time()
+            release_hold(
+                request.data.get("doctor"),
+                request.data.get("booked_day"),
+                time,
+                request.data.get("booked_by"),
+            )
+            return Response(
+                {"message": "Slot hold released"},
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class AppointmentsListView(APIView):
     permission_class = IsAuthenticated
 
@@ -353,45 +593,67 @@ class AppointmentsListView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            bookings = Booking.objects.filter(booked_by_id=user_id)
-            if not bookings.exists():
-                return Response(
-                    {"error": "No bookings found for this user"},
-                    status=status.HTTP_404_NOT_FOUND,
+            today = timezone.now().date()
+            bookings = Booking.objects.filter(booked_by_id=user_id).values(
+                "id",
+                "time_slot",
+                "booked_day",
+                "patient_id",
+                "doctor_id",
+                "doctor__name",
+                "doctor__department__dept_name",
+                "amount",
+                "payment_status",
+                "booking_status",
+                "consultation_mode",
+            )
+            links = {}
+            if request.query_params.get("history", "").lower() == "true":
+                paginator = KeysetPagination(ordering=("-booked_day", "-id"))
+                bookings = paginator.paginate_queryset(
+                    bookings.filter(booked_day__lt=today), request, view=self
+                )
+                links = paginator.get_links()
+            else:
+                bookings = bookings.filter(booked_day__gte=today).order_by(
+                    "booked_day", "time_slot", "id"
                 )
 
-            booking_data = []
-
-            for booking in bookings:
-
-                doctor_info = None
-
-                if booking.booked_day >= timezone.now().date():
-                    doctor = booking.doctor
-                    if doctor:
-                        doctor_info = {
-                            "doc_name": doctor.name,
-                            "department": doctor.department.dept_name,
-                        }
-
-                    booking_data.append(
+            booking_data = [
+                {
+                    "id": booking["id"],
+                    "time_slot": booking["time_slot"],
+                    "booked_day": booking["booked_day"],
+                    "patient": booking["patient_id"],
+                    "doctor_info": (
                         {
-                            "id": booking.id,
-                            "time_slot": booking.time_slot,
-                            "booked_day": booking.booked_day,
-                            "patient": booking.patient.name,
-                            "doctor_info": doctor_info,
-                            "amount": booking.amount,
-                            "payment_status": booking.payment_status,
-                            "booking_status": booking.booking_status,
-                            "consultation_mode": booking.consultation_mode,
+                            "doc_name": booking["doctor__name"],
+                            "department": booking["doctor__department__dept_name"],
                         }
-                    )
+                        if booking["doctor_id"]
+                        else None
+                    ),
+                    "amount": booking["amount"],
+                    "payment_status": booking["payment_status"],
+                    "booking_status": booking["booking_status"],
+                    "consultation_mode": booking["consultation_mode"],
+                }
+                for booking in bookings
+            ]
+            if (
+                not booking_data
+                and not Booking.objects.filter(booked_by_id=user_id).exists()
+            ):
+                return Response(
+                    {"error": "No bookings found for this user"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
 
             return Response(
                 {
                     "message": "Appointments retrieved successfully!",
                     "data": booking_data,
+                    **links,
                 },
                 status=status.HTTP_200_OK,
             )
@@ -520,7 +782,7 @@ class OTPVerification(APIView):
                 if email:
                     OTP.objects.create(email=email, otp=otp)
                     email_from = os.getenv("EMAIL_HOST_USER")
-                    send_mail_task(
+                    send_mail_task.delay(
                         "HeyDoc OTP for Password Reset",
                         f"Dear {user.username}\n Your Otp for password reset is {otp}.Please do not Share.\nBest Regards,HeyDoc",
                         email_from,
@@ -530,7 +792,7 @@ class OTPVerification(APIView):
                 if phone:
                     phone = "+91" + phone
                     OTP.objects.create(phone=phone, otp=otp)
-                    send_sms_task(
+                    send_sms_task.delay(
                         phone,
                         f"Dear {user.username}\n Your Otp for password reset is {otp}.Please do not Share.\nBest Regards,HeyDoc",
                     )
@@ -637,21 +899,37 @@ class DepartmentsView(APIView):
 
     def get(self, request):
         try:
-            departments = Department.objects.all()
-            serializer = DepartmentSerializer(departments, many=True)
-            doctors = Doctor.objects.all()
-            doctor_serializer = DoctorSerializer(doctors, many=True)
-
-            return Response(
-                {
-                    "message": "Departments retrieved",
-                    "departments": serializer.data,
-                    "doctors": doctor_serializer.data,
-                }
+            response = Response(cached_snapshot(DIRECTORY_SCOPE, self.directory))
+            patch_cache_control(
+                response, public=True, max_age=settings.DIRECTORY_CACHE_MAX_AGE
             )
+            return response
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def directory(self):
+        departments = DepartmentSerializer(Department.objects.all(), many=True).data
+        sparse = SparseFieldset.from_names(
+            [
+                name
+                for name in DoctorSerializer().fields
+                if name not in ("groups", "user_permissions")
+            ]
+        )
+        doctors = sparse.project(Doctor.objects.all(), DoctorSerializer)
+        doctor_serializer = DoctorSerializer(doctors, many=True, sparse=sparse)
+        doctors_by_department = defaultdict(list)
+        for doctor in doctors:
+            doctors_by_department[doctor.department_id].append(doctor.doc_id)
+        for department in departments:
+            department["doctors"] = doctors_by_department[department["dept_id"]]
+
+        return {
+            "message": "Departments retrieved",
+            "departments": list(departments),
+            "doctors": list(doctor_serializer.data),
+        }
+
 
 class Reciepts(APIView):
     permission_class = IsAuthenticated